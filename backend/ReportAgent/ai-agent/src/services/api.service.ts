@@ -1,5 +1,8 @@
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
 
+// Conversation id returned by the server; follow-up messages reuse its context
+let conversationSessionId: string | undefined;
+
 // Send Message
 export const sendMessage = async (message: string) => {
   try {
@@ -8,10 +11,12 @@ export const sendMessage = async (message: string) => {
       headers: {
         "Content-Type": "application/json",
       },
-      body: JSON.stringify({ message }),
+      body: JSON.stringify({ message, session_id: conversationSessionId }),
     });
 
-    return await response.json();
+    const data = await response.json();
+    if (data.session_id) conversationSessionId = data.session_id;
+    return data;
   } catch (error) {
     console.error("API Error:", error);
     return {
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark: LLMService intent classification, old substring chain vs the
+precompiled IntentMatcher.
+
+    python benchmarks/bench_intent_matcher.py [--repeat 2000]
+
+Only classification and parameter extraction are timed; the image-generation
+branch's filter-selection LLM call is not part of either side.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat.services.intent_matcher import (  # noqa: E402
+    INTENT_MATCHER, TRAINING_KEYWORDS, IMAGE_KEYWORDS, NFT_KEYWORDS
+)
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_messages.txt")
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip() and not line.startswith("#")]
+
+
+def _legacy_address(text):
+    for word in text.split():
+        if word.startswith('0x') and len(word) == 42:
+            return word
+    return None
+
+
+def legacy_classify(user_input):
+    """The pre-matcher parse_intent chain, minus the LLM filter call."""
+    lower_input = user_input.lower()
+    if any(k in lower_input for k in TRAINING_KEYWORDS):
+        return ("training", "nft" in lower_input)
+    if any(k in lower_input for k in IMAGE_KEYWORDS):
+        return ("image_generation", None)
+    if any(k in lower_input for k in NFT_KEYWORDS):
+        return ("nft", _legacy_address(user_input))
+    address = _legacy_address(user_input)
+    if address:
+        return ("wallet", address)
+    return ("unknown", None)
+
+
+def matcher_classify(user_input):
+    match = INTENT_MATCHER.match(user_input)
+    if match.kind == "training":
+        return (match.kind, match.mentions_nft)
+    return (match.kind, match.address)
+
+
+def bench(fn, messages, repeat, rounds=5):
+    """Best-of-N rounds, in microseconds per message."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for message in messages:
+                fn(message)
+        best = min(best, time.perf_counter() - start)
+    return best / (repeat * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--corpus", default=CORPUS)
+    args = parser.parse_args()
+
+    messages = load_corpus(args.corpus)
+    mismatches = [m for m in messages if legacy_classify(m) != matcher_classify(m)]
+    if mismatches:
+        print("Classification mismatch:")
+        for m in mismatches:
+            print(f"  {m!r}: legacy={legacy_classify(m)} matcher={matcher_classify(m)}")
+        sys.exit(1)
+
+    legacy_us = bench(legacy_classify, messages, args.repeat)
+    matcher_us = bench(matcher_classify, messages, args.repeat)
+    print(f"messages: {len(messages)}  repeat: {args.repeat}")
+    print(f"legacy chain : {legacy_us:.2f} us/message")
+    print(f"IntentMatcher: {matcher_us:.2f} us/message  ({legacy_us / matcher_us:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Throughput benchmark: generate_llm_response under concurrent callers, against
+a local stand-in LLM server, with and without the LLMDispatcher.
+
+    python benchmarks/bench_llm_dispatch.py [--callers 32] [--requests 8] [--slots 4]
+
+The stand-in server models a GPU backend: `--slots` completions run at once,
+each takes `--latency` seconds; a batched /v1/completions call occupies one
+slot for latency + `--per-prompt` seconds per extra prompt.
+
+Modes:
+  direct  no dispatcher (every caller posts to AGENT_URL)
+  window  LLM_MAX_CONCURRENCY=<slots> (bounded in-flight window)
+  batch   window + LLM_BATCH_URL (micro-batching)
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_server(slots, latency, per_prompt):
+    gate = threading.BoundedSemaphore(slots)
+    stats = {"calls": 0, "prompts": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; without this, delayed ACKs add ~40 ms per call
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompts = body["prompt"] if isinstance(body["prompt"], list) else [body["prompt"]]
+            with gate:
+                time.sleep(latency + per_prompt * (len(prompts) - 1))
+            stats["calls"] += 1
+            stats["prompts"] += len(prompts)
+            if self.path.startswith("/v1/completions"):
+                out = {"choices": [{"index": i, "text": f"echo:{p}"} for i, p in enumerate(prompts)]}
+            else:
+                out = {"response": f"echo:{prompts[0]}"}
+            data = json.dumps(out).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def run_mode(mode, base_url, slots, callers, per_caller):
+    os.environ["AGENT_URL"] = f"{base_url}/api/generate"
+    os.environ["LLM_CACHE_TTL"] = "0"
+    os.environ["LLM_MAX_CONCURRENCY"] = "0" if mode == "direct" else str(slots)
+    os.environ["LLM_BATCH_URL"] = f"{base_url}/v1/completions" if mode == "batch" else ""
+
+    from chat.services.llm_service import LLMService
+    service = LLMService()
+    latencies = []
+    errors = []
+
+    def caller(n):
+        for i in range(per_caller):
+            start = time.perf_counter()
+            text = service.generate_llm_response(f"{mode} caller {n} request {i}")
+            latencies.append(time.perf_counter() - start)
+            if not text:
+                errors.append(n)
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(callers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=8, help="requests per caller")
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-prompt", type=float, default=0.002)
+    parser.add_argument("--modes", default="direct,window,batch")
+    args = parser.parse_args()
+
+    server, stats = make_server(args.slots, args.latency, args.per_prompt)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"callers: {args.callers} x {args.requests}  backend slots: {args.slots}  latency: {args.latency * 1000:.0f} ms")
+    for mode in args.modes.split(","):
+        calls_before = stats["calls"]
+        r = run_mode(mode, base_url, args.slots, args.callers, args.requests)
+        print(f"{mode:7s}: {r['throughput']:7.1f} req/s  p50 {r['p50']:6.0f} ms  p95 {r['p95']:6.0f} ms  "
+              f"upstream calls {stats['calls'] - calls_before}  errors {r['errors']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Startup benchmark: time for a fresh process to run django.setup() and import
+the URLconf (and with it chat.views), plus the outbound connections opened on
+the way. With the lazy service registry both should be near zero work: no
+Web3 chain-id probe, no BLIP-2/SAM/FLUX load.
+
+    python benchmarks/bench_startup.py [--runs 5] [--warm orchestrator]
+
+--warm sets WARM_UP_SERVICES for the child to measure an opt-in warm start.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, socket, sys, time
+connections = []
+_connect = socket.socket.connect
+def connect(self, address):
+    connections.append(str(address))
+    return _connect(self, address)
+socket.socket.connect = connect
+
+start = time.perf_counter()
+import django
+django.setup()
+import wallet_chat.urls  # noqa: F401  (imports chat.urls -> chat.views)
+elapsed = time.perf_counter() - start
+
+from chat.services.registry import SERVICES
+loaded = [name for name in ("wallet", "nft", "llm", "image", "orchestrator", "trainer", "model_manager")
+          if SERVICES.is_loaded(name)]
+print(json.dumps({"seconds": elapsed, "connections": connections, "loaded": loaded}))
+"""
+
+
+def run_once(warm):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="wallet_chat.settings")
+    env.pop("WARM_UP_SERVICES", None)
+    if warm:
+        env["WARM_UP_SERVICES"] = warm
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm", default="", help="comma separated service names or 'all'")
+    args = parser.parse_args()
+
+    results = [run_once(args.warm) for _ in range(args.runs)]
+    seconds = [r["seconds"] for r in results]
+    print(f"runs: {args.runs}  warm-up: {args.warm or 'none'}")
+    print(f"setup + URLconf import: median {statistics.median(seconds) * 1000:.0f} ms, "
+          f"min {min(seconds) * 1000:.0f} ms")
+    print(f"outbound connections: {len(results[-1]['connections'])} {results[-1]['connections']}")
+    print(f"services built: {results[-1]['loaded'] or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ChatConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chat'
+
+    def ready(self):
+        # Services are lazy; WARM_UP_SERVICES opts into building them at startup
+        from .services.registry import warm_up_from_env
+        warm_up_from_env()
+        # LLM_PREWARM loads MODEL_NAME on the LLM backend(s) in the background
+        from .services.model_keepalive import prewarm_from_env
+        prewarm_from_env()
@@ -1,30 +1,58 @@
 # command_orchestrator.py
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
 import logging
 from .command_types import CommandType 
-from ..services.wallet_service import WalletService
-from ..services.nft_service import NFTService
-from ..services.llm_service import LLMService
-from ..services.image_service import ImageService
-import requests
-import json
+from ..services.registry import get_service
+from ..services.tracing import traced, span
+from ..services.semantic_cache import get_semantic_cache
+from ..services.conversation_store import get_conversation_store
+from ..services.http_client import get_async_client, get_http_session, async_timeout
 logger = logging.getLogger(__name__)
 
+# Between the answers of a multi-request message
+RESPONSE_SEPARATOR = "\n\n---\n\n"
+
 class CommandOrchestrator:
     """
     Orchestrates command processing and service interactions
     """
     
-    def __init__(self):
-        self.wallet_service = WalletService()
-        self.nft_service = NFTService()
-        self.llm_service = LLMService()
-        self.image_service = ImageService()
+    # Services come from the shared registry and are built on first use
+    @property
+    def wallet_service(self):
+        return get_service("wallet")
+
+    @property
+    def nft_service(self):
+        return get_service("nft")
+
+    @property
+    def llm_service(self):
+        return get_service("llm")
+
+    @property
+    def image_service(self):
+        return get_service("image")
 
-    def process_input(self, user_input: str) -> str:
+    def warm_up(self):
+        for service in (self.wallet_service, self.nft_service, self.llm_service, self.image_service):
+            service.warm_up()
+
+    @traced()
+    def process_input(self, user_input: str, session_id: Optional[str] = None) -> str:
+        """
+        session_id (optional) ties direct LLM questions into one conversation,
+        see ConversationStore.
+        """
         try:
             logger.info(f"Processing input: {user_input}")
-            intent = self.llm_service.parse_intent(user_input)
+            intents = self.llm_service.parse_intents(user_input)
+            if len(intents) > 1:
+                return self._route_commands(intents)
+            intent = intents[0]
             command_type = intent["command_type"]
             params = intent["params"]
             logger.info(f"Detected command type: {command_type}")
@@ -33,32 +61,184 @@ class CommandOrchestrator:
             # If command type is "unknown", send directly to LLM
             if command_type == "unknown":
                 logger.info("Command type is unknown, forwarding directly to LLM")
-                return self._handle_direct_llm_query(user_input)
+                return self._handle_direct_llm_query(user_input, session_id)
                 
             return self._route_command(command_type, params)
         except Exception as e:
             logger.error(f"Error in process_input: {str(e)}", exc_info=True)
             return f"An error occurred while processing your request: {str(e)}"
 
-    def _handle_direct_llm_query(self, user_input: str) -> str:
+    @traced()
+    async def aprocess_input(self, user_input: str, session_id: Optional[str] = None) -> str:
+        """
+        Async variant of process_input, used by the async send_message view.
+        """
+        try:
+            logger.info(f"Processing input (async): {user_input}")
+            intents = await self.llm_service.aparse_intents(user_input)
+            if len(intents) > 1:
+                return RESPONSE_SEPARATOR.join(await asyncio.gather(
+                    *(self._aroute_command(i["command_type"], i["params"]) for i in intents)
+                ))
+            intent = intents[0]
+            command_type = intent["command_type"]
+            params = intent["params"]
+            logger.info(f"Detected command type: {command_type}")
+
+            if command_type == "unknown":
+                return await self._ahandle_direct_llm_query(user_input, session_id)
+
+            return await self._aroute_command(command_type, params)
+        except Exception as e:
+            logger.error(f"Error in aprocess_input: {str(e)}", exc_info=True)
+            return f"An error occurred while processing your request: {str(e)}"
+
+    async def astream_input(self, user_input: str) -> AsyncIterator[str]:
+        """
+        Streaming variant of aprocess_input. Direct LLM queries and the wallet
+        deep analysis are streamed token by token; every other command yields
+        its full response as a single chunk.
+        """
+        try:
+            logger.info(f"Processing input (stream): {user_input}")
+            intents = await self.llm_service.aparse_intents(user_input)
+            if len(intents) > 1:
+                # All handlers start now; answers are sent in message order as they complete
+                tasks = [
+                    asyncio.ensure_future(self._aroute_command(i["command_type"], i["params"]))
+                    for i in intents
+                ]
+                try:
+                    for n, task in enumerate(tasks):
+                        yield (RESPONSE_SEPARATOR if n else "") + await task
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                return
+            intent = intents[0]
+            command_type = intent["command_type"]
+            params = intent["params"]
+            logger.info(f"Detected command type: {command_type}")
+
+            if command_type == "unknown":
+                cached = self._semantic_lookup(user_input)
+                if cached:
+                    yield cached
+                    return
+                chunks = []
+                async for chunk in self.llm_service.astream_llm_response(user_input):
+                    chunks.append(chunk)
+                    yield chunk
+                if not chunks:
+                    yield "I'm sorry, I couldn't generate a response to your question. Please try again."
+                else:
+                    self._semantic_store(user_input, "".join(chunks))
+            elif command_type == "wallet_analysis" and params.get("address"):
+                async for chunk in self.wallet_service.astream_wallet_analysis(params["address"]):
+                    yield chunk
+            else:
+                yield await self._aroute_command(command_type, params)
+        except Exception as e:
+            logger.error(f"Error in astream_input: {str(e)}", exc_info=True)
+            yield f"An error occurred while processing your request: {str(e)}"
+
+    @traced()
+    def _handle_direct_llm_query(self, user_input: str, session_id: Optional[str] = None) -> str:
         """
         Forward unknown queries directly to the LLM service
         """
         try:
             logger.info(f"Sending direct query to LLM: {user_input[:50]}...")
-            
+
+            store = get_conversation_store() if session_id else None
+            if store is not None:
+                return self._conversation_turn(store, session_id, user_input)
+
+            # Paraphrases of a recently answered question reuse its answer
+            cached = self._semantic_lookup(user_input)
+            if cached:
+                return cached
+
             # Generate a response through the LLM service
             response = self.llm_service.generate_llm_response(user_input)
             
             if not response:
                 return "I'm sorry, I couldn't generate a response to your question. Please try again."
-                
+
+            self._semantic_store(user_input, response)
             return response
             
         except Exception as e:
             logger.error(f"Error in direct LLM query: {str(e)}", exc_info=True)
             return f"An error occurred while generating a response: {str(e)}"
 
+    @traced()
+    async def _ahandle_direct_llm_query(self, user_input: str, session_id: Optional[str] = None) -> str:
+        try:
+            store = get_conversation_store() if session_id else None
+            if store is not None:
+                return await self._aconversation_turn(store, session_id, user_input)
+            cached = self._semantic_lookup(user_input)
+            if cached:
+                return cached
+            response = await self.llm_service.agenerate_llm_response(user_input)
+            if not response:
+                return "I'm sorry, I couldn't generate a response to your question. Please try again."
+            self._semantic_store(user_input, response)
+            return response
+        except Exception as e:
+            logger.error(f"Error in direct LLM query: {str(e)}", exc_info=True)
+            return f"An error occurred while generating a response: {str(e)}"
+
+    def _conversation_turn(self, store, session_id: str, user_input: str) -> str:
+        """
+        A turn of a multi-turn chat: the first question may still be answered
+        by the semantic cache; follow-ups carry the session's context.
+        """
+        first_turn = store.get(session_id) is None
+        prompt, context = store.build_turn(session_id, user_input)
+        cached = self._semantic_lookup(user_input) if first_turn else None
+        if cached:
+            store.record(session_id, user_input, cached)
+            return cached
+        result = self.llm_service.generate_llm_turn(prompt, context)
+        if not result or not result["response"]:
+            return "I'm sorry, I couldn't generate a response to your question. Please try again."
+        store.record(session_id, user_input, result["response"], result["context"])
+        return result["response"]
+
+    async def _aconversation_turn(self, store, session_id: str, user_input: str) -> str:
+        first_turn = store.get(session_id) is None
+        prompt, context = store.build_turn(session_id, user_input)
+        cached = self._semantic_lookup(user_input) if first_turn else None
+        if cached:
+            store.record(session_id, user_input, cached)
+            return cached
+        result = await self.llm_service.agenerate_llm_turn(prompt, context)
+        if not result or not result["response"]:
+            return "I'm sorry, I couldn't generate a response to your question. Please try again."
+        store.record(session_id, user_input, result["response"], result["context"])
+        return result["response"]
+
+    @staticmethod
+    def _semantic_lookup(user_input: str) -> Optional[str]:
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is None:
+            return None
+        with span("semantic_cache.lookup") as s:
+            hit = semantic_cache.lookup(user_input)
+            s.attrs["hit"] = hit is not None
+        if hit:
+            logger.info(f"Semantic cache hit ({hit['score']:.3f}) for: {user_input[:50]}")
+            return hit["answer"]
+        return None
+
+    @staticmethod
+    def _semantic_store(user_input: str, response: str):
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None:
+            semantic_cache.store(user_input, response)
+
     def _handle_image_training_upload(self, params: Dict[str, Any]) -> str:
         """
         Return an HTML form & JS for uploading local images only
@@ -134,6 +314,20 @@ class CommandOrchestrator:
         return forms_html
 
 
+    @traced()
+    def _route_commands(self, intents: List[Dict[str, Any]]) -> str:
+        """
+        Runs the handlers of a multi-request message in parallel threads (each
+        with the caller's context: trace span, request deadline) and joins the
+        answers in message order.
+        """
+        with ThreadPoolExecutor(max_workers=len(intents), thread_name_prefix="multi-intent") as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._route_command, i["command_type"], i["params"])
+                for i in intents
+            ]
+            return RESPONSE_SEPARATOR.join(f.result() for f in futures)
+
     def _route_command(self, command_type: str, params: Dict[str, Any]) -> str:
         try:
             if command_type == "wallet_analysis":
@@ -152,6 +346,21 @@ class CommandOrchestrator:
             logger.error(f"Error routing command {command_type}: {str(e)}", exc_info=True)
             return f"Error processing command: {str(e)}"
 
+    @traced()
+    async def _aroute_command(self, command_type: str, params: Dict[str, Any]) -> str:
+        try:
+            if command_type == "wallet_analysis":
+                return await self._ahandle_wallet_analysis(params)
+            elif command_type == "nft_analysis":
+                return await self._ahandle_nft_analysis(params)
+            elif command_type == "image_generation":
+                return await self._ahandle_image_generation(params)
+            # Form handlers are pure string builders, no I/O
+            return self._route_command(command_type, params)
+        except Exception as e:
+            logger.error(f"Error routing command {command_type}: {str(e)}", exc_info=True)
+            return f"Error processing command: {str(e)}"
+
     def _handle_wallet_analysis(self, params: Dict[str, Any]) -> str:
         """Handle wallet analysis command"""
         address = params.get("address")
@@ -166,38 +375,80 @@ class CommandOrchestrator:
             return f"Generated image:\n\n![Generated Image]({result['data'].get('mediaUrl', '')})"
         return f"Error generating image: {result.get('message', 'Unknown error')}"
 
+    async def _ahandle_wallet_analysis(self, params: Dict[str, Any]) -> str:
+        address = params.get("address")
+        if not address:
+            return "Please provide a wallet address for analysis"
+        return await self.wallet_service.aanalyze_wallet(address)
+
+    async def _ahandle_image_generation(self, params: Dict[str, Any]) -> str:
+        result = await self.image_service.agenerate_image(params)
+        if result["status"] == "success":
+            return f"Generated image:\n\n![Generated Image]({result['data'].get('mediaUrl', '')})"
+        return f"Error generating image: {result.get('message', 'Unknown error')}"
+
     def _handle_image_training(self, params: Dict[str, Any]) -> str:
         """Handle image training command"""
         # Show the form even if character_name is missing
         return self._handle_image_training_request()
 
+    @traced()
     def _fetch_nft_metadata_from_uri(self, uri: str) -> Dict[str, Any]:
         try:
             # Replace api-ai-alpha.playarts.ai with localhost:5001
             internal_uri = uri.replace('https://api-ai-alpha.playarts.ai', 'http://localhost:5001')
             
-            response = requests.get(internal_uri, timeout=10)
+            response = get_http_session("metadata").get(internal_uri, timeout=10)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Error fetching metadata from {uri}: {str(e)}")
+            return {}
+
+    @traced()
+    async def _afetch_nft_metadata_from_uri(self, uri: str) -> Dict[str, Any]:
+        try:
+            internal_uri = uri.replace('https://api-ai-alpha.playarts.ai', 'http://localhost:5001')
+            response = await get_async_client().get(internal_uri, timeout=async_timeout("metadata"))
             response.raise_for_status()
             return response.json()
         except Exception as e:
             print(f"Error fetching metadata from {uri}: {str(e)}")
             return {}
 
+    @traced()
     def _format_nft_response(self, nfts: list) -> str:
         """
         Format NFT analysis response with fetched metadata
         """
+        # Fetch metadata from tokenURI
+        metadata_list = [
+            self._fetch_nft_metadata_from_uri(nft['token_uri']) if nft.get('token_uri') else {}
+            for nft in nfts
+        ]
+        return self._render_nft_response(nfts, metadata_list)
+
+    @traced()
+    async def _aformat_nft_response(self, nfts: list) -> str:
+        """
+        Async variant of _format_nft_response; tokenURI fetches run concurrently.
+        """
+        async def fetch(nft: Dict[str, Any]) -> Dict[str, Any]:
+            if token_uri := nft.get('token_uri'):
+                return await self._afetch_nft_metadata_from_uri(token_uri)
+            return {}
+
+        metadata_list = await asyncio.gather(*(fetch(nft) for nft in nfts))
+        return self._render_nft_response(nfts, metadata_list)
+
+    @traced()
+    def _render_nft_response(self, nfts: list, metadata_list: List[Dict[str, Any]]) -> str:
         if not nfts:
             return "No NFT metadata available"
             
         response_parts = ["### NFT Analysis Results\n"]
         
-        for nft in nfts:
-            # Fetch metadata from tokenURI
-            metadata = {}
-            if token_uri := nft.get('token_uri'):
-                metadata = self._fetch_nft_metadata_from_uri(token_uri)
-            
+        for nft, metadata in zip(nfts, metadata_list):
             # Combine fetched metadata with existing NFT data
             nft_data = {
                 'name': metadata.get('name', 'Unnamed NFT'),
@@ -378,4 +629,29 @@ class CommandOrchestrator:
                 
         except Exception as e:
             logger.error(f"Error in NFT analysis: {str(e)}", exc_info=True)
-            return f"Error analyzing NFTs: {str(e)}"
\ No newline at end of file
+            return f"Error analyzing NFTs: {str(e)}"
+
+    async def _ahandle_nft_analysis(self, params: Dict[str, Any]) -> str:
+        """
+        Async variant of _handle_nft_analysis
+        """
+        try:
+            address = params.get("address")
+
+            if address:
+                network = params.get("network", "arbitrum")
+                nft_response = await self.nft_service.aget_nfts(address, network)
+
+                if nft_response["status"] == "error":
+                    return f"Error fetching NFTs: {nft_response['message']}"
+
+                nfts = nft_response["data"]["nfts"]
+                if not nfts:
+                    return f"No NFTs found for address {address}"
+                return await self._aformat_nft_response(nfts)
+
+            return await self.nft_service.aprocess_nft_analysis()
+
+        except Exception as e:
+            logger.error(f"Error in NFT analysis: {str(e)}", exc_info=True)
+            return f"Error analyzing NFTs: {str(e)}"
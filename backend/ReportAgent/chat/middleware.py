@@ -0,0 +1,49 @@
+# middleware.py
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import JsonResponse
+
+from .services.resilience import CircuitOpenError, DeadlineExceeded, deadline, request_deadline_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class RequestDeadlineMiddleware:
+    """
+    Gives every request a deadline (REQUEST_DEADLINE_SECONDS) that all upstream
+    calls made while handling it are capped at, so a degraded Alchemy / RPC /
+    LLM can't hold a worker for the sum of every per-call timeout.
+
+    Streaming responses are produced after the view returns, outside this
+    deadline; the SSE views (send_message_stream, analyze_wallets) open a
+    fresh REQUEST_DEADLINE_SECONDS deadline inside their event generators.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with deadline(request_deadline_seconds()):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with deadline(request_deadline_seconds()):
+            return await self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DeadlineExceeded):
+            logger.warning(f"Deadline exceeded for {request.path}: {exception}")
+            return JsonResponse({'status': 'error', 'error': 'Upstream services are too slow right now, please retry.'}, status=504)
+        if isinstance(exception, CircuitOpenError):
+            logger.warning(f"Upstream unavailable for {request.path}: {exception}")
+            return JsonResponse({'status': 'error', 'error': 'An upstream service is unavailable, please retry shortly.'}, status=503)
+        return None
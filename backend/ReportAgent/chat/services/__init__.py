@@ -1,6 +1,18 @@
-from .base_service import BaseService
-from .llm_service import LLMService
-from .wallet_service import WalletService
-from .nft_service import NFTService
+import importlib
 
-__all__ = ['BaseService', 'LLMService', 'WalletService', 'NFTService']
\ No newline at end of file
+# Re-exports are resolved on first access so importing a submodule (e.g. the
+# registry from views) does not pull in web3 at startup.
+_EXPORTS = {
+    'BaseService': '.base_service',
+    'LLMService': '.llm_service',
+    'WalletService': '.wallet_service',
+    'NFTService': '.nft_service',
+}
+
+__all__ = ['BaseService', 'LLMService', 'WalletService', 'NFTService']
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
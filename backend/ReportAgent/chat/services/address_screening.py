@@ -0,0 +1,188 @@
+# address_screening.py
+import os
+import re
+import time
+import logging
+import binascii
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_RE = re.compile(rb'0x[0-9a-fA-F]{40}(?![0-9a-fA-F])')
+QUERY_RE = re.compile(r'0x[0-9a-fA-F]{40}')
+FEED_EXTENSIONS = ('.txt', '.csv', '.json')
+
+# Always screened, also without any feed configured
+BUILTIN_FLAGGED = (
+    "0xbaa44c7e27e125118d10c43ae6c9f0f5e094e144",
+    "0x46705dfff24256421a05d056c29e81bdc09723b8",
+)
+
+
+def _to_keys(addresses: Iterable[str]) -> np.ndarray:
+    """0x-addresses -> sorted unique 20-byte keys ('S20')."""
+    hexes = [a[2:] for a in addresses if len(a) == 42]
+    if not hexes:
+        return np.empty(0, dtype='S20')
+    return np.unique(np.frombuffer(binascii.unhexlify(''.join(hexes)), dtype='S20'))
+
+
+def _contains(keys: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    if not len(keys):
+        return np.zeros(len(queries), dtype=bool)
+    pos = np.searchsorted(keys, queries)
+    return keys[np.minimum(pos, len(keys) - 1)] == queries
+
+
+class ScreeningFeed:
+    """
+    One flagged-address list (sanctions, phishing, ...) from a local file:
+    every 0x-address in it, whatever the format (plain list, CSV, JSON).
+
+    Compiled once into a sorted array of 20-byte keys saved next to the feed
+    (<feed>.idx.npy) and memory-mapped, so millions of entries cost only the
+    pages a lookup touches; lookups are binary searches.
+    """
+
+    def __init__(self, name: str, path: Optional[str] = None, keys: Optional[np.ndarray] = None):
+        self.name = name
+        self.path = path
+        self.mtime = os.path.getmtime(path) if path else 0.0
+        self.keys = keys if keys is not None else self._load(path)
+
+    @staticmethod
+    def _load(path: str) -> np.ndarray:
+        cache = f"{path}.idx.npy"
+        if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+            try:
+                return np.load(cache, mmap_mode='r')
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring screening index {cache}: {str(e)}")
+        with open(path, 'rb') as f:
+            found = ADDRESS_RE.findall(f.read())
+        keys = _to_keys([a.decode('ascii') for a in found])
+        try:
+            np.save(cache, keys)
+            return np.load(cache, mmap_mode='r')
+        except OSError:
+            # Read-only feed directory: keep the compiled index in memory
+            return keys
+
+    def changed(self) -> bool:
+        try:
+            return bool(self.path) and os.path.getmtime(self.path) != self.mtime
+        except OSError:
+            return True
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class AddressScreening:
+    """
+    Screens addresses against the built-in list plus the feeds in `sources`
+    (files, or directories of .txt/.csv/.json feeds). Feeds are re-read when
+    their file changes, checked at most every `reload_interval` seconds; the
+    swap is atomic, lookups never see a half-loaded feed.
+    """
+
+    def __init__(self, sources: List[str], reload_interval: float = 60.0):
+        self.sources = sources
+        self.reload_interval = reload_interval
+        self.feeds: Tuple[ScreeningFeed, ...] = ()
+        self.loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.counters = {"screened": 0, "flagged": 0, "reloads": 0}
+        self.reload()
+
+    def _feed_paths(self) -> List[str]:
+        paths = []
+        for source in self.sources:
+            if os.path.isdir(source):
+                paths.extend(
+                    os.path.join(source, name) for name in sorted(os.listdir(source))
+                    if name.endswith(FEED_EXTENSIONS)
+                )
+            elif os.path.isfile(source):
+                paths.append(source)
+            else:
+                logger.warning(f"Screening feed not found: {source}")
+        return paths
+
+    def reload(self):
+        current = {feed.path: feed for feed in self.feeds if feed.path}
+        feeds = [ScreeningFeed("builtin", keys=_to_keys(BUILTIN_FLAGGED))]
+        for path in self._feed_paths():
+            feed = current.get(path)
+            if feed is None or feed.changed():
+                try:
+                    feed = ScreeningFeed(os.path.splitext(os.path.basename(path))[0], path)
+                except OSError as e:
+                    logger.error(f"Could not load screening feed {path}: {str(e)}")
+                    continue
+                logger.info(f"Loaded screening feed {feed.name}: {len(feed)} addresses")
+            feeds.append(feed)
+        self.feeds = tuple(feeds)
+        self.loaded_at = time.time()
+        self.counters["reloads"] += 1
+
+    def _maybe_reload(self):
+        if self.reload_interval <= 0 or time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = time.monotonic()
+            known = {feed.path for feed in self.feeds if feed.path}
+            if any(feed.changed() for feed in self.feeds) or set(self._feed_paths()) != known:
+                self.reload()
+
+    def screen(self, addresses: Iterable[str]) -> Dict[str, List[str]]:
+        """{address: [feed names]} for the flagged ones among `addresses` (lowercase 0x-hex)."""
+        self._maybe_reload()
+        candidates = sorted({a for a in addresses if a and QUERY_RE.fullmatch(a)})
+        if not candidates:
+            return {}
+        queries = np.frombuffer(binascii.unhexlify(''.join(a[2:] for a in candidates)), dtype='S20')
+        flagged: Dict[str, List[str]] = {}
+        for feed in self.feeds:
+            for i in np.flatnonzero(_contains(feed.keys, queries)):
+                flagged.setdefault(candidates[i], []).append(feed.name)
+        self.counters["screened"] += len(candidates)
+        self.counters["flagged"] += len(flagged)
+        return flagged
+
+    def is_flagged(self, address: str) -> bool:
+        return bool(self.screen([address.lower()]))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "loaded_at": self.loaded_at,
+            "feeds": {feed.name: len(feed) for feed in self.feeds},
+        }
+
+
+_screening: Optional[AddressScreening] = None
+_screening_lock = threading.Lock()
+
+
+def get_address_screening() -> AddressScreening:
+    """
+    SCREENING_FEEDS (comma-separated feed files or directories) and
+    SCREENING_RELOAD_SECONDS (how often feed files are checked for changes,
+    default 60, 0 = never).
+    """
+    global _screening
+    if _screening is None:
+        with _screening_lock:
+            if _screening is None:
+                _screening = AddressScreening(
+                    [s.strip() for s in os.getenv('SCREENING_FEEDS', '').split(',') if s.strip()],
+                    reload_interval=float(os.getenv('SCREENING_RELOAD_SECONDS', '60')),
+                )
+    return _screening
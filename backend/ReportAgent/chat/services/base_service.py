@@ -1,12 +1,27 @@
 # base_service.py
 import os
 import json
+import time
+import asyncio
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dotenv import load_dotenv
 from web3 import Web3
 import requests
-from typing import Dict, Any, Optional, List
+import httpx
+from typing import Dict, Any, Optional, List, Iterator, AsyncIterator, Tuple, Union
 from abc import ABC, abstractmethod
+from .http_client import get_async_client, get_http_session, async_timeout
+from .llm_cache import get_llm_cache, LLMResponseCache
+from .single_flight import single_flight
+from .tracing import traced, span
+from .llm_dispatcher import get_llm_dispatcher, llm_batch_url
+from .llm_pool import get_llm_pool, llm_backend_urls
+from .resilience import DeadlineExceeded, CircuitOpenError, remaining
+from .model_keepalive import note_llm_traffic
+from .transfer_record import Transfer, TransferList, parse_transfers, transfer_value
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +29,26 @@ class BaseService(ABC):
     def __init__(self):
         load_dotenv()
         self.rpc_url = os.getenv('RPC_URL')
-        self.agent_url = os.getenv('AGENT_URL')
+        # AGENT_URLS (comma-separated) spreads completions over several backends, see llm_pool
+        self.agent_url = (llm_backend_urls() or [None])[0]
         self.bearer_token = os.getenv('BEARER_TOKEN')
         self.model = os.getenv('MODEL_NAME', 'phi4')
-        
-        self.web3 = Web3(Web3.HTTPProvider(self.rpc_url))
+        self.keep_alive = os.getenv('LLM_KEEP_ALIVE')
+        self._web3: Optional[Web3] = None
+
+    def _web3_endpoint(self) -> Optional[str]:
+        return self.rpc_url
+
+    @property
+    def web3(self) -> Web3:
+        """Web3 client, created on first use."""
+        if self._web3 is None:
+            self._web3 = Web3(Web3.HTTPProvider(self._web3_endpoint(), session=get_http_session("rpc")))
+        return self._web3
+
+    def warm_up(self):
+        """Opt-in startup hook (see registry.warm_up_from_env)."""
+        self.web3
         
     def _get_headers(self) -> Dict[str, str]:
         headers = {"Content-Type": "application/json"}
@@ -26,29 +56,103 @@ class BaseService(ABC):
             headers["Authorization"] = f"Bearer {self.bearer_token}"
         return headers
         
-    def generate_llm_response(self, prompt: str) -> Optional[str]:
+    def _build_llm_payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "temperature": 0.7,
+            "max_tokens": 1500
+        }
+        if self.keep_alive:
+            # Ollama: keep the model loaded this long after the request
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _cached_llm_response(self, payload: Dict[str, Any], use_cache: bool):
+        """Returns (cache, key, cached response) for a payload; cache is None when disabled."""
+        cache = get_llm_cache() if use_cache else None
+        if cache is None:
+            return None, None, None
+        key = cache.make_key(payload)
+        return cache, key, cache.get(key)
+
+    async def _acached_llm_response(self, payload: Dict[str, Any], use_cache: bool):
+        """_cached_llm_response without blocking the event loop on SQLite."""
+        cache = get_llm_cache() if use_cache else None
+        if cache is None:
+            return None, None, None
+        key = cache.make_key(payload)
+        return cache, key, await cache.aget(key)
+
+    def _llm_flight_key(self, prompt: str, use_cache: bool = True):
+        # Identical prompts in flight share one completion, unless the caller opted out of caching
+        return ("llm", LLMResponseCache.make_key(self._build_llm_payload(prompt))) if use_cache else None
+
+    @traced()
+    @single_flight(lambda self, prompt, use_cache=True: self._llm_flight_key(prompt, use_cache))
+    def generate_llm_response(self, prompt: str, use_cache: bool = True) -> Optional[str]:
+        """
+        use_cache=False skips the response cache (e.g. when a fresh sample is wanted).
+        With LLM_MAX_CONCURRENCY / LLM_BATCH_URL set the request goes through the
+        shared LLMDispatcher instead of straight to the backend.
+        """
+        if not self.agent_url:
+            logger.error("LLM agent URL not configured")
+            return None
+
+        payload = self._build_llm_payload(prompt)
+        cache, cache_key, cached = self._cached_llm_response(payload, use_cache)
+        if cached is not None:
+            logger.info("LLM response served from cache")
+            return cached
+
+        dispatcher = get_llm_dispatcher()
+        if dispatcher is not None:
             try:
-                if not self.agent_url:
-                    logger.error("LLM agent URL not configured")
-                    return None
+                response = dispatcher.call(payload, self._send_llm_payload, *self._llm_batch_sender(payload))
+            except DeadlineExceeded as e:
+                logger.error(str(e))
+                response = None
+        else:
+            response = self._send_llm_payload(payload)
+
+        if cache is not None and response:
+            cache.set(cache_key, response)
+        return response
 
-                logger.info(f"LLM request to: {self.agent_url}")
+    def _llm_batch_sender(self, payload: Dict[str, Any]):
+        """(send_batch, batch_key) for the dispatcher, or (None, None) without a batch endpoint."""
+        if not llm_batch_url():
+            return None, None
+        return self._post_llm_batch, (self.model, payload["temperature"], payload["max_tokens"])
+
+    def _send_llm_payload(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Single completion: over the backend pool (balanced, hedged) when configured."""
+        pool = get_llm_pool()
+        if pool is not None:
+            return pool.call(lambda url: self._post_llm_payload(payload, url))
+        return self._post_llm_payload(payload)
+
+    def _post_llm_payload(self, payload: Dict[str, Any], url: Optional[str] = None) -> Optional[str]:
+        result = self._post_llm_request(payload, url)
+        return result.get("response") if result else None
+
+    @traced()
+    def _post_llm_request(self, payload: Dict[str, Any], url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+            """The backend's JSON reply ("response", plus Ollama's "context"), or None on failure."""
+            url = url or self.agent_url
+            note_llm_traffic()
+            try:
+                logger.info(f"LLM request to: {url}")
                 logger.debug(f"Using model: {self.model}")
                 logger.debug(f"Headers: {self._get_headers()}")
                 # Don't log the full prompt but log its length
-                logger.debug(f"Prompt length: {len(prompt)}")
-
-                payload = {
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "temperature": 0.7,
-                    "max_tokens": 1500
-                }
+                logger.debug(f"Prompt length: {len(payload['prompt'])}")
                 logger.debug(f"Request payload (without prompt): {json.dumps({k:v for k,v in payload.items() if k != 'prompt'})}")
 
-                response = requests.post(
-                    self.agent_url,
+                response = get_http_session("llm").post(
+                    url,
                     json=payload,
                     headers=self._get_headers(),
                     verify=False,
@@ -75,7 +179,7 @@ class BaseService(ABC):
                     return None
                 
                 logger.info("Successfully received LLM response")
-                return result.get("response")
+                return result
                 
             except requests.exceptions.Timeout:
                 logger.error("LLM request timed out")
@@ -87,130 +191,511 @@ class BaseService(ABC):
                 logger.error(f"Unexpected error in LLM request: {str(e)}")
                 logger.exception("Full traceback:")
                 return None
-        
-    def get_transfer_value(self, tx: Dict) -> float:
+
+    @traced()
+    def _post_llm_batch(self, payloads: List[Dict[str, Any]]) -> Optional[List[Optional[str]]]:
         """
-        Extracts a 'direct' value (ETH or ERC-20) from a single transfer.
+        One OpenAI-style completions call for several prompts (same model and
+        sampling params). Returns None on failure so the dispatcher falls back
+        to single requests.
         """
+        note_llm_traffic()
+        first = payloads[0]
+        body = {
+            "model": first["model"],
+            "prompt": [p["prompt"] for p in payloads],
+            "temperature": first["temperature"],
+            "max_tokens": first["max_tokens"]
+        }
         try:
-            def hex_to_eth(hex_value: str) -> float:
-                if not hex_value:
-                    return 0.0
-                try:
-                    if hex_value.startswith('0x'):
-                        wei = int(hex_value, 16)
-                        return float(wei) / 1e18
-                    return 0.0
-                except ValueError:
-                    return 0.0
-
-            # 1. Direct value field
-            if 'value' in tx:
-                val = tx['value']
-                if isinstance(val, str):
-                    if val.startswith('0x'):
-                        return hex_to_eth(val)
-                    else:
-                        try:
-                            return float(val)
-                        except:
-                            pass
-                elif isinstance(val, (int, float)):
-                    return float(val)
-
-            # 2. rawContract.value
-            if 'rawContract' in tx and 'value' in tx['rawContract']:
-                raw_val = tx['rawContract']['value']
-                if isinstance(raw_val, str):
-                    return hex_to_eth(raw_val)
-                elif isinstance(raw_val, (int, float)):
-                    return float(raw_val) / 1e18
-
-            # 3. metadata.value
-            metadata = tx.get('metadata', {})
-            if 'value' in metadata:
-                try:
-                    return float(metadata['value'])
-                except (ValueError, TypeError):
-                    pass
-
-            # 4. erc20 token transfer value (Alchemy response format)
-            if 'erc20Metadata' in tx:
-                erc20 = tx['erc20Metadata']
-                if isinstance(erc20, dict):
-                    raw_val = erc20.get('value')
-                    decimals = erc20.get('decimals', 18)
-                    if raw_val and raw_val.isdigit():
-                        return float(raw_val) / (10 ** int(decimals))
-            
-            # 5. external transfer's ETH value
-            if tx.get('category') == 'external' and tx.get('asset') == 'ETH':
-                raw_val = tx.get('value')
-                if isinstance(raw_val, str):
-                    try:
-                        return float(raw_val)
-                    except ValueError:
-                        pass
-                elif isinstance(raw_val, (int, float)):
-                    return float(raw_val)
-
-            return 0.0
+            response = get_http_session("llm").post(
+                llm_batch_url(), json=body, headers=self._get_headers(), verify=False, timeout=120
+            )
+            if response.status_code != 200:
+                logger.error(f"LLM batch error status: {response.status_code}")
+                return None
+            choices = response.json().get("choices", [])
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"LLM batch request failed: {str(e)}")
+            return None
+
+        results: List[Optional[str]] = [None] * len(payloads)
+        for i, choice in enumerate(choices):
+            index = choice.get("index", i)
+            if 0 <= index < len(results):
+                results[index] = choice.get("text")
+        logger.info(f"Batched LLM request: {len(payloads)} prompts")
+        return results
+
+    @traced()
+    def generate_llm_turn(self, prompt: str, context: Optional[List[int]] = None) -> Optional[Dict[str, Any]]:
+        """
+        One conversation turn: sends `prompt` with the previous turn's Ollama
+        `context`, so the backend only prefills the new message. Returns
+        {"response", "context"} (context is None if the backend has none).
+        Not cached or coalesced: the answer depends on the session.
+        """
+        if not self.agent_url:
+            logger.error("LLM agent URL not configured")
+            return None
+        payload = self._build_llm_payload(prompt)
+        if context:
+            payload["context"] = context
+        dispatcher = get_llm_dispatcher()
+        try:
+            if dispatcher is not None:
+                result = dispatcher.call(payload, self._send_llm_request)
+            else:
+                result = self._send_llm_request(payload)
+        except DeadlineExceeded as e:
+            logger.error(str(e))
+            return None
+        if not result:
+            return None
+        return {"response": result.get("response"), "context": result.get("context")}
+
+    def _send_llm_request(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        pool = get_llm_pool()
+        if pool is not None:
+            return pool.call(lambda url: self._post_llm_request(payload, url))
+        return self._post_llm_request(payload)
+
+    @traced()
+    async def agenerate_llm_turn(self, prompt: str, context: Optional[List[int]] = None) -> Optional[Dict[str, Any]]:
+        """Async variant of generate_llm_turn"""
+        if not self.agent_url:
+            logger.error("LLM agent URL not configured")
+            return None
+        payload = self._build_llm_payload(prompt)
+        if context:
+            payload["context"] = context
+        dispatcher = get_llm_dispatcher()
+        if dispatcher is not None:
+            left = remaining()
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.wrap_future(dispatcher.submit(payload, self._send_llm_request)),
+                    timeout=None if left is None else max(left, 0)
+                )
+            except asyncio.TimeoutError:
+                logger.error("Request deadline exceeded waiting for an LLM slot")
+                return None
+        else:
+            pool = get_llm_pool()
+            if pool is not None:
+                result = await pool.acall(lambda url: self._apost_llm_request(payload, url))
+            else:
+                result = await self._apost_llm_request(payload, self.agent_url)
+        if not result:
+            return None
+        return {"response": result.get("response"), "context": result.get("context")}
+
+    @traced()
+    @single_flight(lambda self, prompt, use_cache=True: self._llm_flight_key(prompt, use_cache))
+    async def agenerate_llm_response(self, prompt: str, use_cache: bool = True) -> Optional[str]:
+        """
+        Async variant of generate_llm_response. Uses the loop-bound httpx client
+        so the request does not hold a worker thread while the model runs.
+        """
+        try:
+            if not self.agent_url:
+                logger.error("LLM agent URL not configured")
+                return None
+
+            payload = self._build_llm_payload(prompt)
+            cache, cache_key, cached = await self._acached_llm_response(payload, use_cache)
+            if cached is not None:
+                logger.info("LLM response served from cache")
+                return cached
+
+            dispatcher = get_llm_dispatcher()
+            if dispatcher is not None:
+                # Shares the dispatcher's concurrency window / batches with the threaded path
+                left = remaining()
+                text = await asyncio.wait_for(
+                    asyncio.wrap_future(
+                        dispatcher.submit(payload, self._send_llm_payload, *self._llm_batch_sender(payload))
+                    ),
+                    timeout=None if left is None else max(left, 0)
+                )
+                if cache is not None and text:
+                    await cache.aset(cache_key, text)
+                return text
+
+            pool = get_llm_pool()
+            if pool is not None:
+                text = await pool.acall(lambda url: self._apost_llm_payload(payload, url))
+            else:
+                text = await self._apost_llm_payload(payload, self.agent_url)
+            if cache is not None and text:
+                await cache.aset(cache_key, text)
+            return text
 
         except Exception as e:
-            print(f"Error extracting value from tx: {str(e)}, tx data: {json.dumps(tx)[:200]}...")
-            return 0.0
+            logger.error(f"Unexpected error in async LLM request: {str(e)}")
+            logger.exception("Full traceback:")
+            return None
 
-    def fetch_all_transfers(self, 
-                          params: Dict[str, Any], 
-                          endpoint: str, 
-                          headers: Dict[str, str],
-                          max_txs: int = 1000) -> List[Dict[str, Any]]:
+    async def _apost_llm_payload(self, payload: Dict[str, Any], url: str) -> Optional[str]:
+        result = await self._apost_llm_request(payload, url)
+        return result.get("response") if result else None
+
+    @traced()
+    async def _apost_llm_request(self, payload: Dict[str, Any], url: str) -> Optional[Dict[str, Any]]:
+        note_llm_traffic()
+        try:
+            logger.info(f"Async LLM request to: {url}")
+            logger.debug(f"Prompt length: {len(payload['prompt'])}")
+
+            response = await get_async_client(verify=False).post(
+                url,
+                json=payload,
+                headers=self._get_headers(),
+                timeout=60
+            )
+
+            logger.info(f"LLM response status: {response.status_code}")
+
+            if response.status_code != 200:
+                logger.error(f"LLM API error status: {response.status_code}")
+                logger.error(f"LLM API error response: {response.text}")
+                return None
+
+            try:
+                result = response.json()
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse JSON response: {str(e)}")
+                logger.error(f"Raw response: {response.text[:500]}")
+                return None
+
+            if "response" not in result:
+                logger.error(f"Unexpected response format. Available keys: {list(result.keys())}")
+                return None
+
+            logger.info("Successfully received LLM response")
+            return result
+
+        except httpx.TimeoutException:
+            logger.error("LLM request timed out")
+            return None
+        except httpx.HTTPError as e:
+            logger.error(f"LLM request failed: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in async LLM request: {str(e)}")
+            logger.exception("Full traceback:")
+            return None
+
+    def _llm_stream_target(self):
+        """(url, tracking context) for a streamed completion: least-loaded pool backend, else AGENT_URL."""
+        note_llm_traffic()
+        pool = get_llm_pool()
+        backend = pool.pick() if pool is not None else None
+        if backend is None:
+            return self.agent_url, nullcontext({})
+        return backend.url, pool.track(backend, record_latency=False)
+
+    @staticmethod
+    def _parse_stream_line(line) -> Optional[Dict[str, Any]]:
+        """One NDJSON line of a streamed completion ({"response": "...", "done": bool})."""
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed stream line: {str(line)[:200]}")
+            return None
+
+    def stream_llm_response(self, prompt: str) -> Iterator[str]:
         """
-        Uses Alchemy's AssetTransfers API to fetch all transaction information via pagination.
-        max_txs: 최대 몇 건까지 트랜잭션을 수집할 것인지 설정
+        Streams the completion as text chunks as soon as the backend emits them.
+        Yields nothing on error (callers treat an empty stream like a None response).
         """
-        transfers = []
-        page_key = None
+        if not self.agent_url:
+            logger.error("LLM agent URL not configured")
+            return
 
+        url, tracking = self._llm_stream_target()
         try:
-            while True:
-                if page_key:
-                    params["pageKey"] = page_key
-
-                payload = {
-                    "id": 1,
-                    "jsonrpc": "2.0",
-                    "method": "alchemy_getAssetTransfers",
-                    "params": [params]
-                }
-
-                response = requests.post(endpoint, json=payload, headers=headers)
+            with tracking as outcome, get_http_session("llm").post(
+                url,
+                json=self._build_llm_payload(prompt, stream=True),
+                headers=self._get_headers(),
+                verify=False,
+                timeout=60,
+                stream=True
+            ) as response:
                 if response.status_code != 200:
-                    print(f"API Error: Status code {response.status_code}")
-                    print(f"Response text: {response.text}")
-                    break
+                    logger.error(f"LLM stream error status: {response.status_code}")
+                    return
+                outcome["ok"] = True
+                for line in response.iter_lines():
+                    chunk = self._parse_stream_line(line)
+                    if not chunk:
+                        continue
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+        except requests.exceptions.RequestException as e:
+            logger.error(f"LLM stream request failed: {str(e)}")
 
-                data = response.json()
-                if "error" in data:
-                    print(f"API returned error: {data['error']}")
-                    break
+    async def astream_llm_response(self, prompt: str) -> AsyncIterator[str]:
+        """Async variant of stream_llm_response"""
+        if not self.agent_url:
+            logger.error("LLM agent URL not configured")
+            return
 
-                new_transfers = data.get("result", {}).get("transfers", [])
-                transfers.extend(new_transfers)
+        url, tracking = self._llm_stream_target()
+        try:
+            with tracking as outcome:
+                async with get_async_client(verify=False).stream(
+                    "POST",
+                    url,
+                    json=self._build_llm_payload(prompt, stream=True),
+                    headers=self._get_headers(),
+                    timeout=60
+                ) as response:
+                    if response.status_code != 200:
+                        logger.error(f"LLM stream error status: {response.status_code}")
+                        return
+                    outcome["ok"] = True
+                    async for line in response.aiter_lines():
+                        chunk = self._parse_stream_line(line)
+                        if not chunk:
+                            continue
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            break
+        except httpx.HTTPError as e:
+            logger.error(f"LLM stream request failed: {str(e)}")
 
-                # 만약 현재까지 누적된 트랜잭션이 max_txs보다 크면, 더 이상 가져오지 않고 중단
-                if len(transfers) >= max_txs:
-                    print(f"Reached the maximum limit of {max_txs} transactions. Stopping pagination.")
-                    break
+    @traced()
+    async def arpc_call(self, method: str, params: List[Any], endpoint: Optional[str] = None) -> Any:
+        """
+        Minimal async JSON-RPC call against the node (Web3's HTTPProvider is blocking).
+        """
+        payload = {"id": 1, "jsonrpc": "2.0", "method": method, "params": params}
+        response = await get_async_client().post(endpoint or self.rpc_url, json=payload, timeout=async_timeout("rpc"))
+        response.raise_for_status()
+        data = response.json()
+        if "error" in data:
+            raise ValueError(f"RPC error in {method}: {data['error']}")
+        return data.get("result")
 
-                page_key = data.get("result", {}).get("pageKey")
-                if not page_key:
-                    # 다음 페이지가 없으면 중단
-                    break
+    def get_transfer_value(self, tx: Union[Dict, Transfer]) -> float:
+        """
+        Extracts a 'direct' value (ETH or ERC-20) from a single transfer
+        (decoded once for Transfer records).
+        """
+        if isinstance(tx, Transfer):
+            return tx.value
+        return transfer_value(tx)
 
-            # 실제로는 max_txs를 초과해서 담겼을 수도 있으니 마지막에 슬라이싱
-            return transfers[:max_txs]
+    def _fetch_transfer_page(self, params: Dict[str, Any], endpoint: str, headers: Dict[str, str],
+                             page_key: Optional[str], fetched: int,
+                             timeout: Optional[float]) -> Tuple[Optional[List[Transfer]], Optional[str]]:
+        """One alchemy_getAssetTransfers page: (transfers, next page key), (None, None) on an API error."""
+        payload = {
+            "id": 1,
+            "jsonrpc": "2.0",
+            "method": "alchemy_getAssetTransfers",
+            "params": [dict(params, pageKey=page_key) if page_key else params]
+        }
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        with span("alchemy.getAssetTransfers", fetched=fetched):
+            response = get_http_session("rpc").post(endpoint, json=payload, headers=headers, **kwargs)
+        if response.status_code != 200:
+            print(f"API Error: Status code {response.status_code}")
+            print(f"Response text: {response.text}")
+            return None, None
 
-        except Exception as e:
-            print(f"Error in fetch_all_transfers: {str(e)}")
-            return []
\ No newline at end of file
+        data = response.json()
+        if "error" in data:
+            print(f"API returned error: {data['error']}")
+            return None, None
+        result = data.get("result", {})
+        return parse_transfers(result.get("transfers", [])), result.get("pageKey")
+
+    async def _afetch_transfer_page(self, params: Dict[str, Any], endpoint: str, headers: Dict[str, str],
+                                    page_key: Optional[str], fetched: int,
+                                    timeout: float) -> Tuple[Optional[List[Transfer]], Optional[str]]:
+        payload = {
+            "id": 1,
+            "jsonrpc": "2.0",
+            "method": "alchemy_getAssetTransfers",
+            "params": [dict(params, pageKey=page_key) if page_key else params]
+        }
+        with span("alchemy.getAssetTransfers", fetched=fetched):
+            response = await get_async_client().post(endpoint, json=payload, headers=headers, timeout=timeout)
+        if response.status_code != 200:
+            print(f"API Error: Status code {response.status_code}")
+            print(f"Response text: {response.text}")
+            return None, None
+
+        data = response.json()
+        if "error" in data:
+            print(f"API returned error: {data['error']}")
+            return None, None
+        result = data.get("result", {})
+        return parse_transfers(result.get("transfers", [])), result.get("pageKey")
+
+    @staticmethod
+    def _past_block(transfer: Transfer, stop_block: Optional[int], descending: bool) -> bool:
+        if stop_block is None:
+            return False
+        return transfer.block < stop_block if descending else transfer.block > stop_block
+
+    @staticmethod
+    def _mark_truncated(status: Optional[Dict[str, Any]]):
+        if status is not None:
+            status["truncated"] = True
+
+    def iter_transfers(self,
+                       params: Dict[str, Any],
+                       endpoint: str,
+                       headers: Dict[str, str],
+                       max_txs: Optional[int] = None,
+                       max_seconds: Optional[float] = None,
+                       stop_block: Optional[int] = None,
+                       timeout: Optional[float] = None,
+                       status: Optional[Dict[str, Any]] = None) -> Iterator[Transfer]:
+        """
+        Streams Alchemy's AssetTransfers results one Transfer at a time. The next
+        page is requested in the background while the caller works through the
+        current one.
+
+        Stops after `max_txs` transfers, once `max_seconds` have passed, or at
+        the first transfer past `stop_block` in the request's block order
+        (params["order"]). An API error or the request deadline ends the
+        stream early; what was already yielded stays valid, and
+        status["truncated"] is set when a `status` dict is passed.
+        """
+        descending = params.get("order") == "desc"
+        started = time.monotonic()
+        yielded = 0
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alchemy-prefetch")
+
+        def submit(page_key: Optional[str], fetched: int):
+            return executor.submit(contextvars.copy_context().run, self._fetch_transfer_page,
+                                   params, endpoint, headers, page_key, fetched, timeout)
+
+        future = submit(None, 0)
+        try:
+            while future is not None:
+                try:
+                    page, page_key = future.result()
+                except (DeadlineExceeded, CircuitOpenError) as e:
+                    # Out of time / upstream failing fast: the caller keeps what it has
+                    print(f"Stopping pagination early in iter_transfers: {str(e)}")
+                    self._mark_truncated(status)
+                    return
+                except Exception as e:
+                    print(f"Error in iter_transfers: {str(e)}")
+                    self._mark_truncated(status)
+                    return
+                future = None
+                if page is None:
+                    self._mark_truncated(status)
+                    return
+
+                if (page_key
+                        and (max_txs is None or yielded + len(page) < max_txs)
+                        and (max_seconds is None or time.monotonic() - started < max_seconds)
+                        and not (page and self._past_block(page[-1], stop_block, descending))):
+                    future = submit(page_key, yielded + len(page))
+
+                for tx in page:
+                    if (max_txs is not None and yielded >= max_txs) or self._past_block(tx, stop_block, descending):
+                        return
+                    yield tx
+                    yielded += 1
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    async def aiter_transfers(self,
+                              params: Dict[str, Any],
+                              endpoint: str,
+                              headers: Dict[str, str],
+                              max_txs: Optional[int] = None,
+                              max_seconds: Optional[float] = None,
+                              stop_block: Optional[int] = None,
+                              timeout: float = 60,
+                              status: Optional[Dict[str, Any]] = None) -> AsyncIterator[Transfer]:
+        """
+        Async variant of iter_transfers; the next page is fetched by a task.
+        """
+        descending = params.get("order") == "desc"
+        started = time.monotonic()
+        yielded = 0
+        task = asyncio.ensure_future(self._afetch_transfer_page(params, endpoint, headers, None, 0, timeout))
+        try:
+            while task is not None:
+                try:
+                    page, page_key = await task
+                except (DeadlineExceeded, CircuitOpenError) as e:
+                    print(f"Stopping pagination early in aiter_transfers: {str(e)}")
+                    self._mark_truncated(status)
+                    return
+                except Exception as e:
+                    print(f"Error in aiter_transfers: {str(e)}")
+                    self._mark_truncated(status)
+                    return
+                task = None
+                if page is None:
+                    self._mark_truncated(status)
+                    return
+
+                if (page_key
+                        and (max_txs is None or yielded + len(page) < max_txs)
+                        and (max_seconds is None or time.monotonic() - started < max_seconds)
+                        and not (page and self._past_block(page[-1], stop_block, descending))):
+                    task = asyncio.ensure_future(
+                        self._afetch_transfer_page(params, endpoint, headers, page_key, yielded + len(page), timeout)
+                    )
+
+                for tx in page:
+                    if (max_txs is not None and yielded >= max_txs) or self._past_block(tx, stop_block, descending):
+                        return
+                    yield tx
+                    yielded += 1
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+
+    @traced()
+    def fetch_all_transfers(self, 
+                          params: Dict[str, Any], 
+                          endpoint: str, 
+                          headers: Dict[str, str],
+                          max_txs: int = 1000) -> TransferList:
+        """
+        Uses Alchemy's AssetTransfers API to fetch all transaction information via pagination.
+        max_txs: 최대 몇 건까지 트랜잭션을 수집할 것인지 설정
+
+        List form of iter_transfers (pages decoded into Transfer records as they arrive);
+        `truncated` is set when the pagination was cut short.
+        """
+        status: Dict[str, Any] = {}
+        transfers = TransferList(self.iter_transfers(params, endpoint, headers, max_txs=max_txs, status=status))
+        transfers.truncated = status.get("truncated", False)
+        return transfers
+
+    @traced()
+    async def afetch_all_transfers(self,
+                                   params: Dict[str, Any],
+                                   endpoint: str,
+                                   headers: Dict[str, str],
+                                   max_txs: int = 1000) -> TransferList:
+        """
+        Async variant of fetch_all_transfers (same pagination and max_txs semantics).
+        """
+        status: Dict[str, Any] = {}
+        transfers = TransferList([
+            tx async for tx in self.aiter_transfers(params, endpoint, headers, max_txs=max_txs, status=status)
+        ])
+        transfers.truncated = status.get("truncated", False)
+        return transfers
@@ -0,0 +1,129 @@
+# conversation_store.py
+import os
+import time
+import uuid
+import threading
+from array import array
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+@dataclass
+class ConversationSession:
+    # Ollama's `context` (token ids of the conversation so far) from the last
+    # reply, as a 4-byte int array rather than a list of Python ints
+    context: Optional[array] = None
+    # Compacted (role, text) turns, for backends that return no context
+    history: Deque[Tuple[str, str]] = field(default_factory=deque)
+    history_chars: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+
+class ConversationStore:
+    """
+    Per-session continuation state for multi-turn direct LLM chats.
+
+    A follow-up turn sends the stored `context` with just the new message, so
+    the backend only prefills the new tokens. When the backend returns no
+    context (or it grew past `max_context_tokens`) the turn falls back to a
+    compacted transcript of the last messages (`max_history_chars`).
+    Sessions expire after `ttl` seconds idle; the least recently used session
+    is evicted beyond `max_sessions`.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800,
+                 max_context_tokens: int = 8192, max_history_chars: int = 4000,
+                 max_message_chars: int = 1000):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_context_tokens = max_context_tokens
+        self.max_history_chars = max_history_chars
+        self.max_message_chars = max_message_chars
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"context_turns": 0, "history_turns": 0, "evictions": 0}
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session.updated_at > self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def build_turn(self, session_id: str, message: str) -> Tuple[str, Optional[List[int]]]:
+        """(prompt, context) for the next turn of a session."""
+        session = self.get(session_id)
+        if session is None or not session.history:
+            return message, None
+        if session.context:
+            self.counters["context_turns"] += 1
+            return message, session.context.tolist()
+        self.counters["history_turns"] += 1
+        transcript = "\n".join(f"{role}: {text}" for role, text in session.history)
+        return f"Conversation so far:\n{transcript}\n\nUser: {message}\nAssistant:", None
+
+    def record(self, session_id: str, message: str, reply: str, context: Optional[List[int]] = None):
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = ConversationSession()
+            self._sessions.move_to_end(session_id)
+            session.updated_at = now
+            session.context = array('i', context) if context and len(context) <= self.max_context_tokens else None
+            for role, text in (("User", message), ("Assistant", reply)):
+                text = text[:self.max_message_chars]
+                session.history.append((role, text))
+                session.history_chars += len(text)
+            # Drop whole (user, assistant) turns, oldest first, keeping the latest one
+            while session.history_chars > self.max_history_chars and len(session.history) > 2:
+                for _ in range(2):
+                    _, dropped = session.history.popleft()
+                    session.history_chars -= len(dropped)
+            self._evict(now)
+
+    def _evict(self, now: float):
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.updated_at <= self.ttl:
+                break
+            del self._sessions[oldest_id]
+            self.counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "sessions": len(self._sessions)}
+
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> Optional[ConversationStore]:
+    """
+    CONVERSATION_TTL (seconds idle, 0 disables), CONVERSATION_MAX_SESSIONS,
+    CONVERSATION_MAX_CONTEXT (context tokens kept) and CONVERSATION_HISTORY_CHARS.
+    """
+    global _store
+    ttl = float(os.getenv('CONVERSATION_TTL', '1800'))
+    if ttl <= 0:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConversationStore(
+                    max_sessions=int(os.getenv('CONVERSATION_MAX_SESSIONS', '1000')),
+                    ttl=ttl,
+                    max_context_tokens=int(os.getenv('CONVERSATION_MAX_CONTEXT', '8192')),
+                    max_history_chars=int(os.getenv('CONVERSATION_HISTORY_CHARS', '4000')),
+                )
+    return _store
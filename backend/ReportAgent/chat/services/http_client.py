@@ -0,0 +1,282 @@
+# http_client.py
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .resilience import BREAKERS, clamp_timeout, is_failure_status
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    timeout: float
+    retries: int = 2
+    backoff: float = 0.3
+    retry_statuses: Tuple[int, ...] = (429, 502, 503, 504)
+    pool_connections: int = 10  # distinct hosts kept per upstream
+    pool_maxsize: int = 20      # keep-alive sockets per host
+
+
+# Defaults per upstream; HTTP_<NAME>_TIMEOUT / HTTP_<NAME>_RETRIES and
+# HTTP_POOL_MAXSIZE override them from the environment.
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    # A generation is expensive and not idempotent: only retry failed connects
+    "llm": UpstreamConfig(timeout=60, retries=1, retry_statuses=()),
+    # Alchemy / node JSON-RPC reads
+    "rpc": UpstreamConfig(timeout=30),
+    "image": UpstreamConfig(timeout=60, retries=1, retry_statuses=()),
+    # tokenURI / IPFS gateways fan out over many hosts
+    "metadata": UpstreamConfig(timeout=10, pool_connections=50),
+    "twitter": UpstreamConfig(timeout=30, retries=0, retry_statuses=()),
+    # Span export (tracing.py); best effort
+    "collector": UpstreamConfig(timeout=5, retries=0, retry_statuses=()),
+}
+
+
+def _config(upstream: str) -> UpstreamConfig:
+    config = UPSTREAMS.get(upstream, UPSTREAMS["rpc"])
+    prefix = f"HTTP_{upstream.upper()}_"
+    overrides: Dict[str, Any] = {}
+    if os.getenv(prefix + "TIMEOUT"):
+        overrides["timeout"] = float(os.getenv(prefix + "TIMEOUT"))
+    if os.getenv(prefix + "RETRIES"):
+        overrides["retries"] = int(os.getenv(prefix + "RETRIES"))
+    if os.getenv("HTTP_POOL_MAXSIZE"):
+        overrides["pool_maxsize"] = int(os.getenv("HTTP_POOL_MAXSIZE"))
+    return replace(config, **overrides) if overrides else config
+
+
+class _PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with a default timeout and connection counters. urllib3 counts
+    sockets opened (num_connections) and requests sent (num_requests) per host
+    pool; the difference is the number of requests that reused a connection.
+
+    Every request is also capped at the current request deadline and goes
+    through the host's circuit breaker (see resilience.py).
+    """
+
+    def __init__(self, config: UpstreamConfig):
+        self.timeout = config.timeout
+        self._retired = {"connections": 0, "requests": 0}
+        self._retired_lock = threading.Lock()
+        retry = Retry(
+            total=config.retries,
+            connect=config.retries,
+            read=0,
+            status=config.retries if config.retry_statuses else 0,
+            status_forcelist=config.retry_statuses,
+            allowed_methods=None,
+            backoff_factor=config.backoff,
+            raise_on_status=False,
+        )
+        super().__init__(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+            max_retries=retry,
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        # Keep the counters of host pools evicted from the LRU
+        self.poolmanager.pools.dispose_func = self._retire_pool
+
+    def _retire_pool(self, pool):
+        with self._retired_lock:
+            self._retired["connections"] += pool.num_connections
+            self._retired["requests"] += pool.num_requests
+        pool.close()
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        timeout, clamped = clamp_timeout(
+            self.timeout if kwargs.get("timeout") is None else kwargs["timeout"], host
+        )
+        kwargs["timeout"] = timeout
+        breaker = BREAKERS.get(host)
+        trial = breaker.allow() if breaker is not None else None
+        ok = None
+        try:
+            response = super().send(request, **kwargs)
+            ok = not is_failure_status(response.status_code)
+            return response
+        except requests.exceptions.Timeout:
+            # Running out of our own deadline says nothing about the upstream
+            ok = None if clamped else False
+            raise
+        except requests.exceptions.ConnectionError as e:
+            # With read retries at 0, urllib3 reports a read timeout as MaxRetryError -> ConnectionError
+            reason = getattr(e.args[0], "reason", None) if e.args else None
+            ok = None if clamped and isinstance(reason, urllib3.exceptions.TimeoutError) else False
+            if isinstance(reason, urllib3.exceptions.ReadTimeoutError):
+                # Surface it the way requests does, for callers catching Timeout
+                raise requests.exceptions.ReadTimeout(e, request=request) from e
+            raise
+        except requests.exceptions.RetryError:
+            ok = False
+            raise
+        finally:
+            if breaker is not None:
+                breaker.record(ok, trial)
+
+    def connection_stats(self) -> Dict[str, int]:
+        with self._retired_lock:
+            stats = dict(self._retired)
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                stats["connections"] += pool.num_connections
+                stats["requests"] += pool.num_requests
+        stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+        return stats
+
+
+class HttpClientRegistry:
+    """
+    One requests.Session per upstream for the whole process, so calls to the
+    same host reuse keep-alive connections instead of a new TCP/TLS handshake.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, requests.Session] = {}
+        self._adapters: Dict[str, _PooledAdapter] = {}
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def session(self, upstream: str) -> requests.Session:
+        session = self._sessions.get(upstream)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._sessions.get(upstream)
+            if session is None:
+                adapter = _PooledAdapter(_config(upstream))
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.hooks["response"].append(self._count_errors(upstream))
+                self._adapters[upstream] = adapter
+                self._sessions[upstream] = session
+        return session
+
+    def _count_errors(self, upstream: str):
+        def hook(response, *args, **kwargs):
+            if response.status_code >= 500:
+                self._errors[upstream] += 1
+        return hook
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        stats = {}
+        for upstream, adapter in list(self._adapters.items()):
+            stats[upstream] = adapter.connection_stats()
+            stats[upstream]["server_errors"] = self._errors[upstream]
+        return stats
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._adapters.clear()
+
+
+HTTP_CLIENTS = HttpClientRegistry()
+
+
+def get_http_session(upstream: str) -> requests.Session:
+    """Pooled requests.Session for an upstream name from UPSTREAMS."""
+    return HTTP_CLIENTS.session(upstream)
+
+
+# One AsyncClient per (event loop, verify) pair; an httpx client must not be
+# shared across loops, and the ASGI server runs a single long-lived loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[bool, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+_async_requests = {"requests": 0}
+
+
+async def _count_async_request(request: httpx.Request):
+    _async_requests["requests"] += 1
+
+
+class _ResilientTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of _PooledAdapter.send: request deadline + circuit breaker."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.netloc.decode("ascii")
+        timeouts = dict(request.extensions.get("timeout") or {})
+        clamped = False
+        for name, value in timeouts.items():
+            timeouts[name], capped = clamp_timeout(value, host)
+            clamped = clamped or capped
+        request.extensions["timeout"] = timeouts
+        breaker = BREAKERS.get(host)
+        trial = breaker.allow() if breaker is not None else None
+        ok = None
+        try:
+            response = await self._transport.handle_async_request(request)
+            ok = not is_failure_status(response.status_code)
+            return response
+        except httpx.TimeoutException:
+            ok = None if clamped else False
+            raise
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            if breaker is not None:
+                breaker.record(ok, trial)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def get_async_client(verify: bool = True) -> httpx.AsyncClient:
+    """
+    Returns the keep-alive AsyncClient bound to the running event loop.
+    Failed connects are retried by the transport; callers pass the upstream
+    timeout per request (see async_timeout).
+    """
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(verify)
+    if client is None or client.is_closed:
+        pool_maxsize = int(os.getenv("HTTP_POOL_MAXSIZE", "50"))
+        client = httpx.AsyncClient(
+            transport=_ResilientTransport(httpx.AsyncHTTPTransport(
+                verify=verify,
+                retries=2,
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=pool_maxsize)
+            )),
+            event_hooks={"request": [_count_async_request]}
+        )
+        clients[verify] = client
+    return client
+
+
+def async_timeout(upstream: str) -> float:
+    return _config(upstream).timeout
+
+
+def http_stats() -> Dict[str, Any]:
+    return {
+        "sync": HTTP_CLIENTS.stats(),
+        "async": dict(_async_requests),
+        "circuit_breakers": BREAKERS.stats(),
+    }
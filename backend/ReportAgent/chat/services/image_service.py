@@ -1,6 +1,8 @@
 from .base_service import BaseService
+from .http_client import get_async_client, get_http_session
+from .tracing import traced
 import os
-import requests
+import httpx
 from typing import Dict, Any, Optional
 import json
 
@@ -10,42 +12,48 @@ class ImageService(BaseService):
         self.image_generation_token = os.getenv('BEARER_TOKEN_FOR_THE_AI_GENERATION_SERVICE')
         self.image_generation_url = "http://localhost:5001/Generation/image"
 
+    def _get_generation_headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.image_generation_token}",
+            "Content-Type": "application/json"
+        }
+
+    def _build_generation_payload(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        # API 스펙에 맞춘 정확한 페이로드 구성
+        return {
+            "userId": str(params.get("userId", "260")),
+            "prompt": str(params.get("prompt", "")),
+            "aspectRatio": int(params.get("aspectRatio", 0)),
+            "useIppy": bool(params.get("useIppy", False)),
+            "usePepe": bool(params.get("usePepe", False)),
+            "useCoco": bool(params.get("useCoco", False)),
+            "useMfer": bool(params.get("useMfer", False)),
+            "useMilady": bool(params.get("useMilady", False)),
+            "usePepenobi": bool(params.get("usePepenobi", False)),
+            "useBoop": bool(params.get("useBoop", False)),
+            "useMonadpepe": bool(params.get("useMonadpepe", False)),
+            "usePatty": bool(params.get("usePatty", False)),
+            "useClaude": bool(params.get("useClaude", False)),
+            "useBlueArbpepe": bool(params.get("useBlueArbpepe", False)),
+            "useStoryMushy": bool(params.get("useStoryMushy", False)),
+            "useFate": bool(params.get("useFate", False)),
+            "usePipi": bool(params.get("usePipi", False)),
+            "useBopr": bool(params.get("useBopr", False)),
+            "useSparky": bool(params.get("useSparky", False))
+        }
+
+    @traced()
     def generate_image(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generates an image using the AI Generation Service
         """
         try:
-            headers = {
-                "Authorization": f"Bearer {self.image_generation_token}",
-                "Content-Type": "application/json"
-            }
-
-            # API 스펙에 맞춘 정확한 페이로드 구성
-            payload = {
-                "userId": str(params.get("userId", "260")),
-                "prompt": str(params.get("prompt", "")),
-                "aspectRatio": int(params.get("aspectRatio", 0)),
-                "useIppy": bool(params.get("useIppy", False)),
-                "usePepe": bool(params.get("usePepe", False)),
-                "useCoco": bool(params.get("useCoco", False)),
-                "useMfer": bool(params.get("useMfer", False)),
-                "useMilady": bool(params.get("useMilady", False)),
-                "usePepenobi": bool(params.get("usePepenobi", False)),
-                "useBoop": bool(params.get("useBoop", False)),
-                "useMonadpepe": bool(params.get("useMonadpepe", False)),
-                "usePatty": bool(params.get("usePatty", False)),
-                "useClaude": bool(params.get("useClaude", False)),
-                "useBlueArbpepe": bool(params.get("useBlueArbpepe", False)),
-                "useStoryMushy": bool(params.get("useStoryMushy", False)),
-                "useFate": bool(params.get("useFate", False)),
-                "usePipi": bool(params.get("usePipi", False)),
-                "useBopr": bool(params.get("useBopr", False)),
-                "useSparky": bool(params.get("useSparky", False))
-            }
+            headers = self._get_generation_headers()
+            payload = self._build_generation_payload(params)
 
             print(f"Sending request with payload: {json.dumps(payload, indent=2)}")
 
-            response = requests.post(
+            response = get_http_session("image").post(
                 self.image_generation_url,
                 json=payload,
                 headers=headers,
@@ -76,4 +84,38 @@ class ImageService(BaseService):
             return {
                 "status": "error",
                 "message": f"Error generating image: {str(e)}"
-            }
\ No newline at end of file
+            }
+
+    @traced()
+    async def agenerate_image(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async variant of generate_image (same payload, same result shape).
+        """
+        try:
+            payload = self._build_generation_payload(params)
+            response = await get_async_client(verify=False).post(
+                self.image_generation_url,
+                json=payload,
+                headers=self._get_generation_headers(),
+                timeout=60
+            )
+
+            print(f"Server response code: {response.status_code}")
+
+            if response.status_code == 200:
+                return {
+                    "status": "success",
+                    "data": response.json()
+                }
+            return {
+                "status": "error",
+                "message": f"Failed to generate image: {response.status_code}",
+                "details": response.text
+            }
+
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Exception in agenerate_image: {str(e)}")
+            return {
+                "status": "error",
+                "message": f"Error generating image: {str(e)}"
+            }
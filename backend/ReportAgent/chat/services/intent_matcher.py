@@ -0,0 +1,173 @@
+# intent_matcher.py
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Intent kinds, in priority order (first match wins)
+TRAINING = "training"
+IMAGE_GENERATION = "image_generation"
+NFT = "nft"
+WALLET = "wallet"
+UNKNOWN = "unknown"
+
+TRAINING_KEYWORDS = [
+    'train image', 'train character', 'training character',
+    'train lora', 'lora training', 'train my character'
+]
+IMAGE_KEYWORDS = ['generate image', 'create image', 'make image', 'draw']
+NFT_KEYWORDS = ['nft', 'collection', 'show my nft', 'get nft', 'view nft']
+
+# Same rule as the old whitespace split: a token starting with 0x, 42 chars long
+ETH_ADDRESS_RE = re.compile(r'(?<!\S)0x\S{40}(?!\S)')
+
+# Where one request ends and the next begins ("analyze 0x… and show my nfts")
+CLAUSE_SPLIT_RE = re.compile(r'\s*(?:;|&|,?\s+(?:and then|and also|and|then|also|plus)\s+)\s*', re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class IntentMatch:
+    kind: str
+    lower_input: str
+    address: Optional[str] = None
+    mentions_nft: bool = False
+
+
+class IntentMatcher:
+    """
+    Classifies a chat message with one scan of a precompiled keyword pattern
+    plus one address search, instead of a substring loop per intent.
+
+    Keywords are plain substrings (so 'draw' still matches 'withdraw'), exactly
+    like the previous `any(k in lower_input ...)` checks.
+    """
+
+    PRIORITY = (TRAINING, IMAGE_GENERATION, NFT)
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        self.keyword_kind = {kw: kind for kind, kws in keywords.items() for kw in kws}
+        self.keyword_rank = {kw: self.PRIORITY.index(kind) for kw, kind in self.keyword_kind.items()}
+        self.pattern = re.compile(self._trie_pattern(self.keyword_kind))
+        self.bridges = self._build_bridge_table()
+
+    @staticmethod
+    def _trie_pattern(words) -> str:
+        """
+        Factor the keywords into a prefix trie regex ('train(?: image| lora|...)')
+        so the engine tests one branch per leading character instead of every
+        keyword at every position. Greedy optional tails keep longest-match.
+        """
+        trie = {}
+        for word in words:
+            node = trie
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+
+        def build(node) -> str:
+            alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+            if not alts:
+                return ''
+            if len(alts) == 1 and '' not in node:
+                return alts[0]
+            body = '(?:' + '|'.join(alts) + ')'
+            return body + '?' if '' in node else body
+
+        return build(trie)
+
+    def _build_bridge_table(self) -> Dict[str, Tuple[str, ...]]:
+        """
+        The scan is non-overlapping, so a keyword of another kind that starts
+        inside a match is skipped ('nftrain image' only yields 'nft'). For each
+        keyword precompute the glued strings where that can happen; they are
+        probed only for keywords that actually hit.
+        """
+        table = {}
+        for kw, kind in self.keyword_kind.items():
+            bridges = []
+            for i in range(1, len(kw)):
+                for other, other_kind in self.keyword_kind.items():
+                    if other_kind == kind:
+                        continue
+                    if other.startswith(kw[i:]):
+                        bridges.append(kw[:i] + other)
+                    elif kw[i:].startswith(other):
+                        bridges.append(kw)
+            if bridges:
+                table[kw] = tuple(bridges)
+        return table
+
+    def _best_kind(self, lower_input: str, hits: List[str]) -> str:
+        rank = min(map(self.keyword_rank.__getitem__, hits))
+        if rank and not self.bridges.keys().isdisjoint(hits):
+            for kw in hits:
+                bridges = self.bridges.get(kw)
+                if bridges and any(b in lower_input for b in bridges):
+                    # Rare glued input: fall back to exact per-keyword checks
+                    rank = min(self.keyword_rank[other] for other in self.keyword_kind if other in lower_input)
+                    break
+        return self.PRIORITY[rank]
+
+    @staticmethod
+    def extract_address(text: str) -> Optional[str]:
+        if '0x' not in text:
+            return None
+        m = ETH_ADDRESS_RE.search(text)
+        return m.group() if m else None
+
+    def match(self, user_input: str) -> IntentMatch:
+        lower_input = user_input.lower()
+        hits = self.pattern.findall(lower_input)
+
+        if hits:
+            kind = self._best_kind(lower_input, hits)
+            if kind == TRAINING:
+                return IntentMatch(TRAINING, lower_input, mentions_nft="nft" in lower_input)
+            if kind == NFT:
+                return IntentMatch(NFT, lower_input, address=self.extract_address(user_input))
+            return IntentMatch(kind, lower_input)
+
+        address = self.extract_address(user_input)
+        if address:
+            return IntentMatch(WALLET, lower_input, address=address)
+        return IntentMatch(UNKNOWN, lower_input)
+
+    def match_all(self, user_input: str) -> List[IntentMatch]:
+        """
+        Every request in a message joined by "and" / "then" / ";" etc. Clauses
+        are matched on their own; unless at least two distinct requests come
+        out of that, the whole message is matched as before (so "draw a cat
+        and a dog" stays one image request).
+        """
+        clauses = [c for c in CLAUSE_SPLIT_RE.split(user_input) if c.strip()]
+        if len(clauses) < 2:
+            return [self.match(user_input)]
+
+        matches: List[IntentMatch] = []
+        for clause in clauses:
+            m = self.match(clause)
+            if m.kind != UNKNOWN:
+                matches.append(m)
+        # "show my nfts" refers to the wallet named elsewhere in the message
+        address = next((m.address for m in matches if m.address), None)
+        if address:
+            for m in matches:
+                if m.kind == NFT and not m.address:
+                    m.address = address
+
+        distinct = []
+        seen = set()
+        for m in matches:
+            key = (m.kind, m.address, m.lower_input if m.kind == IMAGE_GENERATION else None)
+            if key not in seen:
+                seen.add(key)
+                distinct.append(m)
+        if len(distinct) < 2:
+            return [self.match(user_input)]
+        return distinct
+
+
+INTENT_MATCHER = IntentMatcher({
+    TRAINING: TRAINING_KEYWORDS,
+    IMAGE_GENERATION: IMAGE_KEYWORDS,
+    NFT: NFT_KEYWORDS,
+})
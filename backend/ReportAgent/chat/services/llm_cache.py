@@ -0,0 +1,182 @@
+# llm_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+# Outside the source tree: SQLite also leaves -wal/-shm files next to the database
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'reportagent', 'llm_cache.sqlite3')
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for LLM completions: an in-memory LRU in front of a SQLite
+    table that survives restarts. Entries expire after `ttl` seconds; expired
+    rows are deleted on open and at most every `prune_interval` seconds on write.
+
+    Keys cover everything that changes the completion: model, prompt and the
+    sampling parameters (temperature, max_tokens).
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, ttl: float = 86400, memory_size: int = 512,
+                 prune_interval: float = 3600):
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.prune_interval = prune_interval
+        self._pruned_at = time.monotonic()
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+                self._db.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"LLM cache disabled on disk ({path}): {str(e)}")
+                self._db = None
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """Hash of (model, prompt, temperature, max_tokens) from an LLM payload."""
+        material = json.dumps(
+            [payload.get("model"), payload.get("prompt"), payload.get("temperature"), payload.get("max_tokens")],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return response
+            del self._memory[key]
+        return None
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            response = self._memory_get(key, now)
+            if response is not None:
+                return response
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT response, expires_at FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM cache read failed: {str(e)}")
+                    row = None
+                if row and row[1] > now:
+                    self._remember(key, row[1], row[0])
+                    self.counters["disk_hits"] += 1
+                    return row[0]
+
+            self.counters["misses"] += 1
+            return None
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() for the event loop: memory hits inline, the SQLite lookup on a worker thread."""
+        with self._lock:
+            response = self._memory_get(key, time.time())
+        if response is not None:
+            return response
+        if self._db is None:
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+        return await sync_to_async(self.get, thread_sensitive=False)(key)
+
+    def set(self, key: str, response: str):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, response)
+            self.counters["stores"] += 1
+        self._write(key, response, expires_at)
+
+    async def aset(self, key: str, response: str):
+        """set() for the event loop: the SQLite write and commit run on a worker thread."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, response)
+            self.counters["stores"] += 1
+        if self._db is not None:
+            await sync_to_async(self._write, thread_sensitive=False)(key, response, expires_at)
+
+    def _write(self, key: str, response: str, expires_at: float):
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                    (key, response, expires_at)
+                )
+                # Expired rows are otherwise only removed on open
+                if time.monotonic() - self._pruned_at >= self.prune_interval:
+                    self._pruned_at = time.monotonic()
+                    self._db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def _remember(self, key: str, expires_at: float, response: str):
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Process-wide cache configured from LLM_CACHE_TTL (seconds, 0 disables),
+    LLM_CACHE_SIZE (in-memory entries) and LLM_CACHE_PATH (empty = memory only).
+    """
+    global _llm_cache
+    ttl = float(os.getenv('LLM_CACHE_TTL', '86400'))
+    if ttl <= 0:
+        return None
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache(
+                    path=os.getenv('LLM_CACHE_PATH', DEFAULT_CACHE_PATH) or None,
+                    ttl=ttl,
+                    memory_size=int(os.getenv('LLM_CACHE_SIZE', '512'))
+                )
+    return _llm_cache
@@ -0,0 +1,168 @@
+# llm_dispatcher.py
+import os
+import queue
+import time
+import logging
+import threading
+import contextvars
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from .resilience import DeadlineExceeded, remaining
+
+logger = logging.getLogger(__name__)
+
+SendOne = Callable[[Dict[str, Any]], Optional[str]]
+SendBatch = Callable[[List[Dict[str, Any]]], List[Optional[str]]]
+
+
+@dataclass
+class _Pending:
+    payload: Dict[str, Any]
+    send_one: SendOne
+    send_batch: Optional[SendBatch]
+    batch_key: Hashable
+    future: Future = field(default_factory=Future)
+    # Caller's context (e.g. the current trace span) for the worker thread
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+class LLMDispatcher:
+    """
+    Sits in front of the LLM backend.
+
+    - Every request goes through a pool of `max_concurrency` workers, so no
+      more than that many completions are in flight against AGENT_URL.
+    - Requests submitted with a send_batch callable are collected for up to
+      `max_wait` seconds (or `max_batch` requests) and requests sharing a
+      batch_key (same model and sampling params) go out as one batched call.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_batch: int = 16, max_wait: float = 0.005):
+        self.max_concurrency = max_concurrency
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-dispatch")
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._collector: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "batches": 0, "batched_requests": 0}
+
+    def submit(self,
+               payload: Dict[str, Any],
+               send_one: SendOne,
+               send_batch: Optional[SendBatch] = None,
+               batch_key: Hashable = None) -> Future:
+        item = _Pending(payload, send_one, send_batch, batch_key)
+        self.counters["requests"] += 1
+        if send_batch is None:
+            self._pool.submit(self._run_one, item)
+        else:
+            self._ensure_collector()
+            self._queue.put(item)
+        return item.future
+
+    def call(self, payload: Dict[str, Any], send_one: SendOne,
+             send_batch: Optional[SendBatch] = None, batch_key: Hashable = None) -> Optional[str]:
+        """Waits at most until the request deadline (a queued request can't hold the caller past it)."""
+        future = self.submit(payload, send_one, send_batch, batch_key)
+        left = remaining()
+        try:
+            return future.result(timeout=None if left is None else max(left, 0))
+        except FutureTimeout:
+            future.cancel()
+            raise DeadlineExceeded("Request deadline exceeded waiting for an LLM slot")
+
+    def _ensure_collector(self):
+        if self._collector is None:
+            with self._lock:
+                if self._collector is None:
+                    self._collector = threading.Thread(target=self._collect, name="llm-batch-collector", daemon=True)
+                    self._collector.start()
+
+    def _collect(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            groups: Dict[Hashable, List[_Pending]] = defaultdict(list)
+            for item in items:
+                groups[item.batch_key].append(item)
+            for group in groups.values():
+                if len(group) == 1:
+                    self._pool.submit(self._run_one, group[0])
+                else:
+                    self._pool.submit(self._run_batch, group)
+
+    @classmethod
+    def _run_one(cls, item: _Pending):
+        # Cancelled while queued (its caller hit the deadline): nothing to run
+        if item.future.set_running_or_notify_cancel():
+            cls._execute(item)
+
+    @staticmethod
+    def _execute(item: _Pending):
+        try:
+            item.future.set_result(item.context.run(item.send_one, item.payload))
+        except Exception as e:
+            item.future.set_exception(e)
+
+    def _run_batch(self, group: List[_Pending]):
+        group = [item for item in group if item.future.set_running_or_notify_cancel()]
+        if not group:
+            return
+        self.counters["batches"] += 1
+        self.counters["batched_requests"] += len(group)
+        try:
+            results = group[0].send_batch([item.payload for item in group])
+        except Exception as e:
+            logger.error(f"Batched LLM call failed, falling back to single requests: {str(e)}")
+            results = None
+        if results is None or len(results) != len(group):
+            for item in group:
+                self._execute(item)
+            return
+        for item, result in zip(group, results):
+            item.future.set_result(result)
+
+_dispatchers: Dict[tuple, LLMDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def llm_batch_url() -> Optional[str]:
+    """OpenAI-compatible /v1/completions endpoint that accepts a list of prompts."""
+    return os.getenv('LLM_BATCH_URL') or None
+
+
+def get_llm_dispatcher() -> Optional[LLMDispatcher]:
+    """
+    Enabled by LLM_MAX_CONCURRENCY (> 0) or LLM_BATCH_URL; batching is tuned
+    with LLM_BATCH_SIZE and LLM_BATCH_WAIT_MS. Returns None when disabled.
+    """
+    concurrency = int(os.getenv('LLM_MAX_CONCURRENCY', '0'))
+    if concurrency <= 0:
+        if not llm_batch_url():
+            return None
+        concurrency = 8
+    config = (
+        concurrency,
+        int(os.getenv('LLM_BATCH_SIZE', '16')),
+        float(os.getenv('LLM_BATCH_WAIT_MS', '5')) / 1000.0,
+    )
+    dispatcher = _dispatchers.get(config)
+    if dispatcher is None:
+        with _dispatchers_lock:
+            dispatcher = _dispatchers.get(config)
+            if dispatcher is None:
+                dispatcher = _dispatchers[config] = LLMDispatcher(*config)
+    return dispatcher
@@ -0,0 +1,312 @@
+# llm_pool.py
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from .http_client import get_http_session
+
+logger = logging.getLogger(__name__)
+
+Send = Callable[[str], Optional[str]]
+ASend = Callable[[str], Awaitable[Optional[str]]]
+
+
+class LLMBackend:
+    """One LLM node: in-flight count, latency EWMA and health."""
+
+    FAILURES_BEFORE_UNHEALTHY = 3
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.ewma_ms = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def probe_url(self, path: str) -> str:
+        parts = urlsplit(self.url)
+        return f"{parts.scheme}://{parts.netloc}{path}"
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ewma_ms": round(self.ewma_ms, 1),
+        }
+
+
+class LLMBackendPool:
+    """
+    Routes completions over several LLM nodes (AGENT_URLS).
+
+    - Each request goes to the healthy backend with the fewest requests in
+      flight (ties: lowest latency EWMA).
+    - A backend is taken out of rotation after a few consecutive failures
+      and put back when its health probe (GET <host><probe_path>) succeeds.
+    - Hedging: if the first backend hasn't answered after `hedge_after` (the
+      pool's recent p95 unless fixed), the same request is sent to a second
+      backend and the first answer wins. A failed answer fails over at once.
+      Hedges are capped at `hedge_budget` of all requests so an overloaded
+      pool isn't doubled.
+    """
+
+    def __init__(self, urls: List[str],
+                 hedge_after: Optional[float] = None,
+                 hedge_budget: float = 0.1,
+                 probe_interval: float = 10.0,
+                 probe_path: str = "/api/tags"):
+        self.backends = [LLMBackend(url) for url in urls]
+        self.fixed_hedge_after = hedge_after
+        self.hedge_budget = hedge_budget
+        self.probe_interval = probe_interval
+        self.probe_path = probe_path
+        self._latencies: "deque[float]" = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8 * len(urls), thread_name_prefix="llm-pool")
+        self.counters = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+        if probe_interval > 0:
+            threading.Thread(target=self._probe_loop, name="llm-health-probe", daemon=True).start()
+
+    # -- selection / bookkeeping --
+
+    def pick(self, exclude: Optional[LLMBackend] = None) -> Optional[LLMBackend]:
+        with self._lock:
+            candidates = [b for b in self.backends if b is not exclude]
+            healthy = [b for b in candidates if b.healthy]
+            # With nothing healthy, still try someone rather than failing outright
+            pool = healthy or candidates
+            if not pool:
+                return None
+            return min(pool, key=lambda b: (b.outstanding, b.ewma_ms))
+
+    @contextmanager
+    def track(self, backend: LLMBackend, record_latency: bool = True):
+        """
+        Counts the request as in flight on `backend`; the caller sets result["ok"]
+        (left None for a cancelled hedge, which is neither a success nor a failure).
+        Streams pass record_latency=False so their duration doesn't skew the hedge p95.
+        """
+        with self._lock:
+            backend.outstanding += 1
+            backend.requests += 1
+        started = time.perf_counter()
+        result = {"ok": False}
+        try:
+            yield result
+        finally:
+            ms = (time.perf_counter() - started) * 1000 if record_latency else None
+            self._finish(backend, ms, result["ok"])
+
+    def _finish(self, backend: LLMBackend, ms: Optional[float], ok: Optional[bool]):
+        with self._lock:
+            backend.outstanding -= 1
+            if ok is None:
+                return
+            if ok:
+                backend.failures = 0
+                backend.healthy = True
+                if ms is not None:
+                    backend.ewma_ms = ms if not backend.ewma_ms else 0.8 * backend.ewma_ms + 0.2 * ms
+                    self._latencies.append(ms)
+            else:
+                backend.errors += 1
+                backend.failures += 1
+                if backend.failures >= backend.FAILURES_BEFORE_UNHEALTHY and backend.healthy:
+                    backend.healthy = False
+                    logger.warning(f"LLM backend {backend.url} marked unhealthy")
+
+    def hedge_after(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off."""
+        if len(self.backends) < 2:
+            return None
+        if self.fixed_hedge_after is not None:
+            return self.fixed_hedge_after if self.fixed_hedge_after > 0 else None
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < 20:
+            return 2.0
+        return max(samples[int(len(samples) * 0.95) - 1] / 1000.0, 0.05)
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            if self.counters["hedges"] >= self.hedge_budget * self.counters["requests"] + 1:
+                return False
+            self.counters["hedges"] += 1
+            return True
+
+    # -- sync --
+
+    def _attempt(self, backend: LLMBackend, send: Send) -> Optional[str]:
+        with self.track(backend) as result:
+            text = send(backend.url)
+            result["ok"] = text is not None
+            return text
+
+    def _submit(self, backend: LLMBackend, send: Send):
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._attempt, backend, send)
+
+    def call(self, send: Send) -> Optional[str]:
+        """send(url) -> text or None. Returns the first successful answer."""
+        with self._lock:
+            self.counters["requests"] += 1
+        primary = self.pick()
+        if primary is None:
+            return None
+        delay = self.hedge_after()
+        if delay is None:
+            # No hedging: run in the caller's thread, fail over once on error
+            text = self._attempt(primary, send)
+            if text is None:
+                backup = self.pick(exclude=primary)
+                if backup is not None:
+                    self.counters["failovers"] += 1
+                    text = self._attempt(backup, send)
+            return text
+
+        futures = {self._submit(primary, send): primary}
+        done, _ = wait(futures, timeout=delay)
+        hedged = False
+        if not done or next(iter(done)).result() is None:
+            backup = self.pick(exclude=primary)
+            if backup is not None and (done or self._may_hedge()):
+                if done:
+                    self.counters["failovers"] += 1
+                hedged = not done
+                futures[self._submit(backup, send)] = backup
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                text = future.result()
+                if text is not None:
+                    if hedged and futures[future] is not primary:
+                        self.counters["hedge_wins"] += 1
+                    # The losing request can't be aborted mid-read; it finishes in the background
+                    return text
+        return None
+
+    # -- async --
+
+    async def _aattempt(self, backend: LLMBackend, send: ASend) -> Optional[str]:
+        with self.track(backend) as result:
+            try:
+                text = await send(backend.url)
+            except asyncio.CancelledError:
+                result["ok"] = None
+                raise
+            result["ok"] = text is not None
+            return text
+
+    async def acall(self, send: ASend) -> Optional[str]:
+        """Async variant of call; the losing request is cancelled."""
+        with self._lock:
+            self.counters["requests"] += 1
+        primary = self.pick()
+        if primary is None:
+            return None
+        tasks = {asyncio.ensure_future(self._aattempt(primary, send)): primary}
+        delay = self.hedge_after()
+        hedged = False
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done or next(iter(done)).result() is None:
+                backup = self.pick(exclude=primary)
+                if backup is not None and (done or self._may_hedge()):
+                    if done:
+                        self.counters["failovers"] += 1
+                    hedged = not done
+                    tasks[asyncio.ensure_future(self._aattempt(backup, send))] = backup
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    text = task.result()
+                    if text is not None:
+                        if hedged and tasks[task] is not primary:
+                            self.counters["hedge_wins"] += 1
+                        return text
+            return None
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    # -- health --
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            for backend in self.backends:
+                self.probe(backend)
+
+    def probe(self, backend: LLMBackend) -> bool:
+        try:
+            ok = get_http_session("llm").get(backend.probe_url(self.probe_path), timeout=2, verify=False).ok
+        except Exception:
+            ok = False
+        with self._lock:
+            if ok:
+                if not backend.healthy:
+                    logger.info(f"LLM backend {backend.url} healthy again")
+                backend.healthy = True
+                backend.failures = 0
+            elif backend.healthy:
+                logger.warning(f"LLM backend {backend.url} failed its health probe")
+                backend.healthy = False
+        return ok
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_after()
+        with self._lock:
+            return {
+                **self.counters,
+                "hedge_after_ms": round(delay * 1000, 1) if delay is not None else None,
+                "backends": [b.snapshot() for b in self.backends],
+            }
+
+
+_pool: Optional[LLMBackendPool] = None
+_pool_lock = threading.Lock()
+
+
+def llm_backend_urls() -> List[str]:
+    urls = [u.strip() for u in os.getenv('AGENT_URLS', '').split(',') if u.strip()]
+    return urls or ([os.getenv('AGENT_URL')] if os.getenv('AGENT_URL') else [])
+
+
+def get_llm_pool() -> Optional[LLMBackendPool]:
+    """
+    Enabled when AGENT_URLS lists two or more backends; returns None otherwise
+    (a single AGENT_URL is called directly). LLM_HEDGE_AFTER_MS fixes the
+    hedge delay (0 disables hedging, default: recent p95); LLM_HEALTH_INTERVAL
+    and LLM_HEALTH_PATH configure the probes.
+    """
+    global _pool
+    urls = llm_backend_urls()
+    if len(urls) < 2:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                hedge_ms = os.getenv('LLM_HEDGE_AFTER_MS')
+                _pool = LLMBackendPool(
+                    urls,
+                    hedge_after=float(hedge_ms) / 1000.0 if hedge_ms else None,
+                    probe_interval=float(os.getenv('LLM_HEALTH_INTERVAL', '10')),
+                    probe_path=os.getenv('LLM_HEALTH_PATH', '/api/tags'),
+                )
+    return _pool
@@ -1,6 +1,14 @@
 # llm_service.py
 from .base_service import BaseService
+from .tracing import traced
+from .model_keepalive import get_model_keepalive
+from .intent_matcher import (
+    INTENT_MATCHER, IMAGE_KEYWORDS, IntentMatch,
+    TRAINING, IMAGE_GENERATION, NFT, WALLET
+)
+from .style_filter_classifier import StyleFilterClassifier
 from typing import Dict, Any, List, Optional
+import asyncio
 import logging
 import re
 
@@ -31,6 +39,27 @@ class LLMService(BaseService):
         'sparky': 'useSparky'
     }
 
+    IMAGE_KEYWORDS = IMAGE_KEYWORDS
+
+    # Shared across instances so the memo cache survives per-request services
+    filter_classifier = StyleFilterClassifier(FILTER_MAPPING.keys())
+
+    def model_status(self) -> Dict[str, Any]:
+        """
+        Keep-alive manager state with the backends' /api/ps view of MODEL_NAME as
+        last recorded by the keep-alive loop; only backends never checked yet
+        are probed here.
+        """
+        keepalive = get_model_keepalive()
+        if keepalive is None:
+            return {"enabled": False, "model": self.model}
+        for url in keepalive.urls:
+            state = keepalive.backends[url]
+            if state["supported"] and state["loaded"] is None:
+                keepalive.check(url)
+        return {"enabled": True, **keepalive.stats()}
+
+    @traced()
     def parse_intent(self, user_input: str) -> Dict[str, Any]:
         """
         Parse user input to determine command type and parameters
@@ -43,16 +72,9 @@ class LLMService(BaseService):
         """
         try:
             logger.info(f"Parsing intent for input: {user_input}")
-            lower_input = user_input.lower()
-
-            # Check commands in priority order
-            intent = (
-                self._check_training_intent(lower_input, user_input) or
-                self._check_image_generation_intent(lower_input, user_input) or
-                self._check_nft_intent(lower_input, user_input) or
-                self._check_wallet_intent(lower_input, user_input) or
-                self._get_unknown_intent()
-            )
+
+            # Single pass over the input; priority order is kept by the matcher
+            intent = self._intent_for(INTENT_MATCHER.match(user_input))
             
             logger.debug(f"Detected intent: {intent}")
             return intent
@@ -61,9 +83,67 @@ class LLMService(BaseService):
             logger.error(f"Error parsing intent: {str(e)}", exc_info=True)
             return self._get_unknown_intent()
 
+    @traced()
+    def parse_intents(self, user_input: str) -> List[Dict[str, Any]]:
+        """
+        Like parse_intent, but returns one intent per request in the message
+        ("analyze 0x… and show my nfts" -> wallet_analysis + nft_analysis).
+        A single-request message gives a one-element list.
+        """
+        try:
+            logger.info(f"Parsing intents for input: {user_input}")
+            intents = [self._intent_for(match) for match in INTENT_MATCHER.match_all(user_input)]
+            logger.debug(f"Detected intents: {intents}")
+            return intents
+        except Exception as e:
+            logger.error(f"Error parsing intents: {str(e)}", exc_info=True)
+            return [self._get_unknown_intent()]
+
+    def _intent_for(self, match: IntentMatch) -> Dict[str, Any]:
+        if match.kind == IMAGE_GENERATION:
+            prompt = self._extract_generation_prompt(match.lower_input, self.IMAGE_KEYWORDS)
+            return self._build_image_generation_intent(prompt, self.get_image_filters(prompt))
+        return self._intent_from_match(match)
+
+    @traced()
+    async def aparse_intent(self, user_input: str) -> Dict[str, Any]:
+        """
+        Async variant of parse_intent. Only the image-generation branch does I/O
+        (filter selection through the LLM).
+        """
+        try:
+            logger.info(f"Parsing intent (async) for input: {user_input}")
+
+            return await self._aintent_for(INTENT_MATCHER.match(user_input))
+
+        except Exception as e:
+            logger.error(f"Error parsing intent: {str(e)}", exc_info=True)
+            return self._get_unknown_intent()
+
+    @traced()
+    async def aparse_intents(self, user_input: str) -> List[Dict[str, Any]]:
+        """Async variant of parse_intents (filter selections for several images run concurrently)"""
+        try:
+            logger.info(f"Parsing intents (async) for input: {user_input}")
+            matches = INTENT_MATCHER.match_all(user_input)
+            return list(await asyncio.gather(*(self._aintent_for(match) for match in matches)))
+        except Exception as e:
+            logger.error(f"Error parsing intents: {str(e)}", exc_info=True)
+            return [self._get_unknown_intent()]
+
+    async def _aintent_for(self, match: IntentMatch) -> Dict[str, Any]:
+        if match.kind == IMAGE_GENERATION:
+            prompt = self._extract_generation_prompt(match.lower_input, self.IMAGE_KEYWORDS)
+            selected_filters = await self.aget_image_filters(prompt)
+            return self._build_image_generation_intent(prompt, selected_filters)
+        return self._intent_from_match(match)
+
+    @traced()
     def get_image_filters(self, prompt: str) -> List[str]:
         """
-        Get recommended style filters for image generation
+        Get recommended style filters for image generation.
+        The local classifier answers obvious prompts; the LLM is only asked
+        when it is unsure.
         
         Args:
             prompt: User's image generation prompt
@@ -72,95 +152,95 @@ class LLMService(BaseService):
             List of applicable style filters
         """
         try:
+            decision = self.filter_classifier.classify(prompt)
+            if decision.confident:
+                logger.debug(f"Style filter from {decision.source}: {decision.key}")
+                return self._map_filter(decision.key)
+
             filter_prompt = self._create_filter_prompt(prompt)
             response = self.generate_llm_response(filter_prompt)
             
             if not response:
                 return []
                 
-            selected_filter = response.strip().lower()
-            mapped_filter = self.FILTER_MAPPING.get(selected_filter)
-            
-            return [mapped_filter] if mapped_filter else []
+            return self._remember_llm_filter(prompt, response)
             
         except Exception as e:
             logger.error(f"Error getting image filters: {str(e)}", exc_info=True)
             return []
 
-    def _check_training_intent(self, lower_input: str, original_input: str) -> Optional[Dict[str, Any]]:
-        training_keywords = [
-            'train image', 'train character', 'training character',
-            'train lora', 'lora training', 'train my character'
-        ]
-        if any(k in lower_input for k in training_keywords):
-            if "nft" in lower_input:
-                return {
-                    "command_type": "image_training_nft",
-                    "params": {
-                        # ...
-                    }
-                }
-            else:
-                return {
-                    "command_type": "image_training_upload",
-                    "params": {
-                        # ...
-                    }
-                }
-        return None
+    @traced()
+    async def aget_image_filters(self, prompt: str) -> List[str]:
+        """Async variant of get_image_filters"""
+        try:
+            decision = self.filter_classifier.classify(prompt)
+            if decision.confident:
+                return self._map_filter(decision.key)
 
-    def _check_image_generation_intent(self, lower_input: str, original_input: str) -> Optional[Dict[str, Any]]:
-        """Check for image generation intent"""
-        image_keywords = ['generate image', 'create image', 'make image', 'draw']
-        
-        if any(keyword in lower_input for keyword in image_keywords):
-            prompt = self._extract_generation_prompt(lower_input, image_keywords)
-            selected_filters = self.get_image_filters(prompt)
-            
-            filter_params = {
-                filter_name: False for filter_name in self.FILTER_MAPPING.values()
-            }
-            
-            for filter_name in selected_filters:
-                if filter_name:
-                    filter_params[filter_name] = True
+            response = await self.agenerate_llm_response(self._create_filter_prompt(prompt))
+            if not response:
+                return []
+
+            return self._remember_llm_filter(prompt, response)
+
+        except Exception as e:
+            logger.error(f"Error getting image filters: {str(e)}", exc_info=True)
+            return []
+
+    def _map_filter(self, filter_key: Optional[str]) -> List[str]:
+        mapped_filter = self.FILTER_MAPPING.get(filter_key) if filter_key else None
+        return [mapped_filter] if mapped_filter else []
+
+    def _remember_llm_filter(self, prompt: str, response: str) -> List[str]:
+        selected_filter = response.strip().lower()
+        if selected_filter not in self.FILTER_MAPPING:
+            selected_filter = None
+        # Failed calls are not memoized; an answer (even "none of them") is
+        self.filter_classifier.remember(prompt, selected_filter)
+        return self._map_filter(selected_filter)
 
+    def _intent_from_match(self, match: IntentMatch) -> Dict[str, Any]:
+        """Build the intent dict for every kind except image generation"""
+        if match.kind == TRAINING:
             return {
-                "command_type": "image_generation",
+                "command_type": "image_training_nft" if match.mentions_nft else "image_training_upload",
                 "params": {
-                    "prompt": prompt,
-                    "userId": "247",
-                    "aspectRatio": 0,
-                    **filter_params
+                    # ...
                 }
             }
-        return None
-
-    def _check_nft_intent(self, lower_input: str, original_input: str) -> Optional[Dict[str, Any]]:
-        """Check for NFT analysis intent"""
-        nft_keywords = ['nft', 'collection', 'show my nft', 'get nft', 'view nft']
-        
-        if any(keyword in lower_input for keyword in nft_keywords):
-            address = self._extract_eth_address(original_input)
+        if match.kind == NFT:
             return {
                 "command_type": "nft_analysis",
                 "params": {
-                    "address": address if address else None,
+                    "address": match.address if match.address else None,
                     "network": "arbitrum"
                 }
             }
-        return None
-
-    def _check_wallet_intent(self, lower_input: str, original_input: str) -> Optional[Dict[str, Any]]:
-        """Check for wallet analysis intent"""
-        address = self._extract_eth_address(original_input)
-        
-        if address:
+        if match.kind == WALLET:
             return {
                 "command_type": "wallet_analysis",
-                "params": {"address": address}
+                "params": {"address": match.address}
+            }
+        return self._get_unknown_intent()
+
+    def _build_image_generation_intent(self, prompt: str, selected_filters: List[str]) -> Dict[str, Any]:
+        filter_params = {
+            filter_name: False for filter_name in self.FILTER_MAPPING.values()
+        }
+        
+        for filter_name in selected_filters:
+            if filter_name:
+                filter_params[filter_name] = True
+
+        return {
+            "command_type": "image_generation",
+            "params": {
+                "prompt": prompt,
+                "userId": "247",
+                "aspectRatio": 0,
+                **filter_params
             }
-        return None
+        }
 
     def _extract_character_name(self, text: str) -> str:
         """Extract character name from training request"""
@@ -186,10 +266,7 @@ class LLMService(BaseService):
 
     def _extract_eth_address(self, text: str) -> Optional[str]:
         """Extract Ethereum address from text"""
-        for word in text.split():
-            if word.startswith('0x') and len(word) == 42:
-                return word
-        return None
+        return INTENT_MATCHER.extract_address(text)
 
     def _create_filter_prompt(self, prompt: str) -> str:
         """Create prompt for style filter selection"""
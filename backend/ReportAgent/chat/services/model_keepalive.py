@@ -0,0 +1,219 @@
+# model_keepalive.py
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from .http_client import get_http_session
+from .llm_pool import llm_backend_urls
+
+logger = logging.getLogger(__name__)
+
+
+class ModelKeepAlive:
+    """
+    Keeps MODEL_NAME loaded on the Ollama backend(s) while it is likely to be
+    used, so a chat turn after a quiet period doesn't pay the model load.
+
+    Every `interval` seconds, if there was LLM traffic within `idle_window`
+    seconds or the coming hour is usually busy (hour-of-day request counts,
+    decayed daily), each backend's /api/ps is checked and the model is
+    (re)loaded with an empty-prompt /api/generate carrying `keep_alive` when
+    it isn't loaded or is about to expire. Backends without /api/ps (not
+    Ollama) are skipped.
+    """
+
+    def __init__(self, model: str, urls: List[str], keep_alive: str = "30m",
+                 interval: float = 60.0, idle_window: float = 3600.0):
+        self.model = model
+        self.urls = urls
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.idle_window = idle_window
+        self.last_request = 0.0
+        self.hourly = [0.0] * 24
+        self._decayed_day = datetime.now(timezone.utc).toordinal()
+        self.backends: Dict[str, Dict[str, Any]] = {
+            url: {"supported": True, "loaded": None, "checked_at": None, "expires_at": None,
+                  "warm_ups": 0, "last_warm_ms": None}
+            for url in urls
+        }
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def touch(self):
+        """Called for every LLM request; also starts the background loop."""
+        now = datetime.now(timezone.utc)
+        self.last_request = time.time()
+        self.hourly[now.hour] += 1
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None and self.interval > 0:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="llm-keepalive", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self.wanted():
+                    self.refresh()
+            except Exception as e:
+                logger.warning(f"LLM keep-alive pass failed: {str(e)}")
+
+    def wanted(self) -> bool:
+        now = datetime.now(timezone.utc)
+        day = now.toordinal()
+        if day != self._decayed_day:
+            self.hourly = [c * 0.8 ** (day - self._decayed_day) for c in self.hourly]
+            self._decayed_day = day
+        if time.time() - self.last_request < self.idle_window:
+            return True
+        total = sum(self.hourly)
+        # Busy hour: at least half of a uniform share of the (decayed) daily traffic
+        next_hour = (now.hour + 1) % 24
+        return total >= 20 and max(self.hourly[now.hour], self.hourly[next_hour]) >= total / 48
+
+    def _api_url(self, url: str, path: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}{path}"
+
+    def check(self, url: str) -> Optional[Dict[str, Any]]:
+        """The model's entry in the backend's /api/ps, {} when not loaded, None if unknown."""
+        state = self.backends[url]
+        try:
+            response = get_http_session("llm").get(self._api_url(url, "/api/ps"), timeout=5, verify=False)
+        except Exception as e:
+            logger.debug(f"/api/ps on {url} failed: {str(e)}")
+            return None
+        if response.status_code == 404:
+            state["supported"] = False
+            return None
+        if response.status_code != 200:
+            return None
+        entry = {}
+        for model in response.json().get("models", []):
+            name = model.get("name") or model.get("model") or ""
+            if name == self.model or name.split(":")[0] == self.model:
+                entry = model
+                break
+        state["loaded"] = bool(entry)
+        state["checked_at"] = time.time()
+        state["expires_at"] = entry.get("expires_at")
+        state["size_vram"] = entry.get("size_vram")
+        return entry
+
+    def warm(self, url: str) -> bool:
+        """Loads the model (empty prompt: nothing is generated) and extends its keep_alive."""
+        state = self.backends[url]
+        started = time.perf_counter()
+        try:
+            response = get_http_session("llm").post(
+                url,
+                json={"model": self.model, "prompt": "", "stream": False, "keep_alive": self.keep_alive},
+                verify=False,
+                timeout=300
+            )
+        except Exception as e:
+            logger.warning(f"Warm-up of {self.model} on {url} failed: {str(e)}")
+            return False
+        state["last_warm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if response.status_code != 200:
+            logger.warning(f"Warm-up of {self.model} on {url} returned {response.status_code}")
+            return False
+        state["warm_ups"] += 1
+        state["loaded"] = True
+        logger.info(f"Warmed {self.model} on {url} in {state['last_warm_ms']} ms")
+        return True
+
+    def _expiring(self, entry: Dict[str, Any]) -> bool:
+        expires_at = entry.get("expires_at")
+        if not expires_at:
+            return False
+        try:
+            # Ollama reports e.g. 2024-06-04T14:38:31.83753-07:00 (nanosecond precision)
+            head, sep, tail = expires_at.partition(".")
+            if sep:
+                digits = len(tail) - len(tail.lstrip("0123456789"))
+                expires_at = f"{head}.{tail[:min(digits, 6)]}{tail[digits:]}"
+            left = datetime.fromisoformat(expires_at.replace("Z", "+00:00")).timestamp() - time.time()
+        except ValueError:
+            return False
+        return left < 2 * self.interval
+
+    def refresh(self):
+        for url in self.urls:
+            if not self.backends[url]["supported"]:
+                continue
+            entry = self.check(url)
+            if entry is None:
+                continue
+            if not entry or self._expiring(entry):
+                self.warm(url)
+
+    def prewarm(self):
+        """Process-start warm-up: load the model everywhere, then keep it warm."""
+        for url in self.urls:
+            self.warm(url)
+        self.last_request = time.time()
+        self._ensure_thread()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "keep_alive": self.keep_alive,
+            "interval": self.interval,
+            "idle_seconds": round(time.time() - self.last_request, 1) if self.last_request else None,
+            "keeping_warm": self.wanted(),
+            "hourly_traffic": [round(c, 1) for c in self.hourly],
+            "backends": self.backends,
+        }
+
+
+_keepalive: Optional[ModelKeepAlive] = None
+_keepalive_lock = threading.Lock()
+
+
+def get_model_keepalive() -> Optional[ModelKeepAlive]:
+    """
+    LLM_KEEPALIVE_INTERVAL (seconds between checks, 0 disables, default 60),
+    LLM_KEEP_ALIVE (Ollama keep_alive duration, default 30m) and
+    LLM_KEEPALIVE_IDLE (seconds after the last request to keep warming).
+    """
+    global _keepalive
+    interval = float(os.getenv('LLM_KEEPALIVE_INTERVAL', '60'))
+    urls = llm_backend_urls()
+    if interval <= 0 or not urls:
+        return None
+    if _keepalive is None:
+        with _keepalive_lock:
+            if _keepalive is None:
+                _keepalive = ModelKeepAlive(
+                    os.getenv('MODEL_NAME', 'phi4'),
+                    urls,
+                    keep_alive=os.getenv('LLM_KEEP_ALIVE', '30m'),
+                    interval=interval,
+                    idle_window=float(os.getenv('LLM_KEEPALIVE_IDLE', '3600')),
+                )
+    return _keepalive
+
+
+def note_llm_traffic():
+    keepalive = get_model_keepalive()
+    if keepalive is not None:
+        keepalive.touch()
+
+
+def prewarm_from_env():
+    """LLM_PREWARM=1 loads the model on every backend at startup (in the background)."""
+    if os.getenv('LLM_PREWARM', '').lower() not in ('1', 'true', 'yes'):
+        return
+    keepalive = get_model_keepalive()
+    if keepalive is not None:
+        threading.Thread(target=keepalive.prewarm, name="llm-prewarm", daemon=True).start()
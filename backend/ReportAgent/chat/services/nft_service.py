@@ -1,4 +1,8 @@
 from .base_service import BaseService
+from .http_client import get_http_session
+from .single_flight import single_flight
+from .tracing import traced
+from .transfer_digest import build_market_digest, format_market_digest
 from typing import Dict, Any, Optional, List, Union
 from collections import defaultdict
 from datetime import datetime
@@ -10,6 +14,7 @@ from web3.main import to_checksum_address
 from web3.exceptions import ContractLogicError  # For handling contract call errors
 import logging
 import traceback  # 상단에 추가
+from asgiref.sync import sync_to_async
 logger = logging.getLogger(__name__)
 # Disable HTTPS certificate warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -41,9 +46,14 @@ class NFTService(BaseService):
             'story': 'https://mainnet.storyrpc.io/'
         }
 
+        self.ERC721_ABI = ERC721_ABI
+
+    def _web3_endpoint(self) -> str:
         # Arbitrum 네트워크로 Web3 초기화
-        self.web3 = Web3(Web3.HTTPProvider(self.network_rpcs['arbitrum']))
-        
+        return self.network_rpcs['arbitrum']
+
+    def warm_up(self):
+        super().warm_up()
         # 체인 ID 확인 (Arbitrum은 42161)
         try:
             chain_id = self.web3.eth.chain_id
@@ -53,8 +63,7 @@ class NFTService(BaseService):
         except Exception as e:
             print(f"Error checking chain ID: {e}")
 
-        self.ERC721_ABI = ERC721_ABI
-
+    @traced()
     def get_token_metadata(self, contract_address: str, token_id: int) -> Dict[str, Any]:
         """
         Fetch token metadata from an ERC721 contract using standard tokenURI.
@@ -91,7 +100,7 @@ class NFTService(BaseService):
                 token_uri = f"https://arweave.net/{token_uri[5:]}"
             # Fetch metadata from tokenURI
             try:
-                response = requests.get(token_uri, headers={'Accept': 'application/json'}, timeout=10)
+                response = get_http_session("metadata").get(token_uri, headers={'Accept': 'application/json'}, timeout=10)
                 response.raise_for_status()
                 metadata = response.json()
                 # Process image field
@@ -144,6 +153,7 @@ class NFTService(BaseService):
                         print(f"Failed to process batch after {max_retries} retries")
         return collection_data
 
+    @traced()
     def get_nfts(self, address: str, network: str = 'arbitrum') -> Dict[str, Any]:
         """
         Retrieves NFTs owned by the given address.
@@ -166,6 +176,14 @@ class NFTService(BaseService):
             print(f"Error in get_nfts: {str(e)}")
             return {"status": "error", "message": f"Error fetching NFTs: {str(e)}"}
 
+    @traced()
+    async def aget_nfts(self, address: str, network: str = 'arbitrum') -> Dict[str, Any]:
+        """
+        Async entry point for get_nfts. The per-token tokenURI lookups go through
+        the blocking Web3 contract API, so they run on a worker thread.
+        """
+        return await sync_to_async(self.get_nfts, thread_sensitive=False)(address, network)
+
     def _fetch_nfts_from_chain(self, address: str, rpc_url: str, network: str) -> List[Dict[str, Any]]:
         """
         Example method to manually iterate over token IDs (not recommended for large collections).
@@ -201,6 +219,7 @@ class NFTService(BaseService):
             print(f"Error fetching NFTs: {str(e)}")
             return []
 
+    @traced()
     def _fetch_token_metadata(self, contract_address: str, token_id: str) -> Dict[str, Any]:
         try:
             # Web3 연결 상태 확인
@@ -282,6 +301,7 @@ class NFTService(BaseService):
             traceback.print_exc()
             return {}        
 
+    @traced()
     def _fetch_nfts_optimized(self, address: str, network: str) -> List[Dict[str, Any]]:
         """
         Optimized NFT fetching with improved error handling and metadata retrieval
@@ -297,7 +317,7 @@ class NFTService(BaseService):
             }
             
             print(f"Fetching NFTs for address: {address}")
-            response = requests.get(url, params=params, headers={"Accept": "application/json"}, timeout=30)
+            response = get_http_session("rpc").get(url, params=params, headers={"Accept": "application/json"}, timeout=30)
             
             if response.status_code != 200:
                 print(f"Alchemy API Error: {response.status_code}")
@@ -410,6 +430,7 @@ class NFTService(BaseService):
             print(f"Error processing Story response: {str(e)}")
             return []
 
+    @traced()
     def analyze_nft_market(self, days: int = 7, max_transactions: int = 50000) -> Dict[str, Any]:
         """
         NFT market analysis: fetch transactions, group by tx hash, identify actual sales/transfers,
@@ -447,54 +468,6 @@ class NFTService(BaseService):
                 "withMetadata": True,
                 "maxCount": "0x3e8"
             }
-            all_transfers = []
-            page_key = None
-            first_batch = True
-            while len(all_transfers) < max_transactions:
-                try:
-                    if page_key:
-                        params["pageKey"] = page_key
-                    payload = {
-                        "id": 1,
-                        "jsonrpc": "2.0",
-                        "method": "alchemy_getAssetTransfers",
-                        "params": [params]
-                    }
-                    response = requests.post(
-                        alchemy_url,  # self.rpc_url 대신 alchemy_url 사용
-                        json=payload,
-                        headers={"Accept": "application/json", "Content-Type": "application/json"},
-                        timeout=120
-                    )
-                    if response.status_code != 200:
-                        print(f"API Error: {response.status_code}")
-                        break
-                    data = response.json()
-                    if "error" in data:
-                        print(f"API Error: {data['error']}")
-                        break
-                    transfers = data.get("result", {}).get("transfers", [])
-                    if first_batch and transfers:
-                        sample_tx = transfers[0]
-                        print("First batch sample transfer:")
-                        print(json.dumps(sample_tx, indent=2))
-                        val = self.get_transfer_value(sample_tx)
-                        print(f"Extracted value: {val} ETH")
-                        first_batch = False
-                    all_transfers.extend(transfers)
-                    print(f"Collected {len(all_transfers)} transfers so far...")
-                    page_key = data.get("result", {}).get("pageKey")
-                    if not page_key:
-                        break
-                except Exception as e:
-                    print(f"Error fetching transfers: {e}")
-                    break
-            print(f"\nTotal transfers collected: {len(all_transfers)}")
-            grouped_transfers = defaultdict(list)
-            for tx in all_transfers:
-                tx_hash = tx.get('hash')
-                if tx_hash:
-                    grouped_transfers[tx_hash].append(tx)
             collection_stats = defaultdict(lambda: {
                 'volume_eth': 0.0,
                 'transactions': 0,
@@ -512,25 +485,22 @@ class NFTService(BaseService):
                 'liquidity_score': 0.0,
                 'token_ids': set()
             })
-            for tx_hash, transfers_in_one_tx in grouped_transfers.items():
+
+            def record_transaction(transfers_in_one_tx):
                 nft_transfers = []
                 for t in transfers_in_one_tx:
-                    cat = t.get('category', '')
-                    if cat in ('erc721', 'erc1155'):
+                    if t.category in ('erc721', 'erc1155'):
                         nft_transfers.append(t)
                 if not nft_transfers:
-                    continue
+                    return
                 payment_transfers = []
                 for t in transfers_in_one_tx:
-                    cat = t.get('category', '')
-                    if cat in ('external', 'internal', 'erc20'):
-                        val = self.get_transfer_value(t)
-                        if val > 0:
-                            payment_transfers.append(t)
+                    if t.category in ('external', 'internal', 'erc20') and t.value > 0:
+                        payment_transfers.append(t)
                 used_marketplace = None
                 for t in transfers_in_one_tx:
-                    from_addr = t.get('from', '').lower()
-                    to_addr = t.get('to', '').lower()
+                    from_addr = t.sender
+                    to_addr = t.receiver
                     for mp_addr, mp_name in MARKETPLACES.items():
                         if mp_addr.lower() in [from_addr, to_addr]:
                             used_marketplace = mp_name
@@ -538,10 +508,10 @@ class NFTService(BaseService):
                     if used_marketplace:
                         break
                 for nft_tx in nft_transfers:
-                    contract_address = nft_tx.get('rawContract', {}).get('address', '').lower()
-                    token_id = nft_tx.get('tokenId')
-                    from_addr = nft_tx.get('from', '').lower()
-                    to_addr = nft_tx.get('to', '').lower()
+                    contract_address = nft_tx.contract
+                    token_id = nft_tx.token_id
+                    from_addr = nft_tx.sender
+                    to_addr = nft_tx.receiver
                     stats = collection_stats[contract_address]
                     stats['transactions'] += 1
                     if token_id:
@@ -550,9 +520,9 @@ class NFTService(BaseService):
                     is_sale = False
                     max_payment = 0.0
                     for pay_tx in payment_transfers:
-                        pay_from = pay_tx.get('from', '').lower()
-                        pay_to = pay_tx.get('to', '').lower()
-                        val = self.get_transfer_value(pay_tx)
+                        pay_from = pay_tx.sender
+                        pay_to = pay_tx.receiver
+                        val = pay_tx.value
                         if val > 0 and pay_from == to_addr and pay_to == from_addr:
                             if val > max_payment:
                                 max_payment = val
@@ -570,7 +540,7 @@ class NFTService(BaseService):
                             stats['highest_price'] = sale_price
                         price_record = {
                             'price': sale_price,
-                            'timestamp': nft_tx.get('metadata', {}).get('blockTimestamp'),
+                            'timestamp': nft_tx.timestamp or None,
                             'marketplace': used_marketplace if used_marketplace else "Unknown",
                             'token_id': token_id
                         }
@@ -579,6 +549,30 @@ class NFTService(BaseService):
                             stats['marketplace_stats'][used_marketplace] += 1
                     else:
                         stats['transfers'] += 1
+
+            # Transfers arrive in block order, so once a later block shows up every
+            # transaction of the earlier blocks is complete: only the current
+            # block's transfers are held, and aggregation overlaps the prefetch of
+            # the next page.
+            headers = {"Accept": "application/json", "Content-Type": "application/json"}
+            pending = defaultdict(list)
+            block_in_progress = None
+            collected = 0
+            for tx in self.iter_transfers(params, alchemy_url, headers,  # self.rpc_url 대신 alchemy_url 사용
+                                          max_txs=max_transactions, timeout=120):
+                if not collected:
+                    print(f"First transfer: {tx!r}, value {tx.value} ETH")
+                collected += 1
+                if tx.block != block_in_progress:
+                    for transfers_in_one_tx in pending.values():
+                        record_transaction(transfers_in_one_tx)
+                    pending.clear()
+                    block_in_progress = tx.block
+                if tx.hash:
+                    pending[tx.hash].append(tx)
+            for transfers_in_one_tx in pending.values():
+                record_transaction(transfers_in_one_tx)
+            print(f"\nTotal transfers collected: {collected}")
             for contract, stats in collection_stats.items():
                 if stats['floor_price'] == float('inf'):
                     stats['floor_price'] = 0.0
@@ -718,6 +712,8 @@ class NFTService(BaseService):
                 report.append(f"| {mp} | {cnt} | {share:.1f}% |")
         return "\n".join(report)
 
+    @traced()
+    @single_flight(lambda self: ("nft_market",))
     def process_nft_analysis(self) -> str:
         """
         Perform general NFT market analysis without requiring a specific wallet address.
@@ -745,6 +741,14 @@ class NFTService(BaseService):
             logger.error(f"Error during NFT analysis: {str(e)}", exc_info=True)
             return "An error occurred during NFT market analysis."
 
+    @traced()
+    @single_flight(lambda self: ("nft_market",))
+    async def aprocess_nft_analysis(self) -> str:
+        """
+        Async entry point for process_nft_analysis (runs on a worker thread).
+        """
+        return await sync_to_async(self.process_nft_analysis, thread_sensitive=False)()
+
     def generate_nft_deep_analysis(self, collection_stats: Dict[str, Any], advanced_data: Dict[str, Any]) -> str:
         """
         Uses extended data (rarity, whale ratio, security score) plus basic stats for an LLM-based deep analysis.
@@ -774,10 +778,20 @@ class NFTService(BaseService):
                     "price_trend_7d": round(stats.get('price_trend', 0), 1)
                 }
                 combined_summary.append(summary_item)
+            # One compact row per collection instead of indented JSON
+            columns = list(combined_summary[0].keys()) if combined_summary else []
+            rows = "\n".join(
+                " | ".join(str(item[c]) for c in columns) for item in combined_summary
+            )
+            market_digest = format_market_digest(build_market_digest(collection_stats))
             prompt = f"""As an NFT market expert, analyze the following NFT collection data from the past 7 days.
 
+Market totals:
+{market_digest}
+
 Collection Data (Top {len(combined_summary)} by volume):
-{json.dumps(combined_summary, indent=2)}
+{" | ".join(columns)}
+{rows}
 
 Please provide a comprehensive market analysis covering:
 
@@ -814,6 +828,7 @@ Keep the analysis fact-based and avoid speculation."""
             logger.error(f"Error generating deep analysis: {str(e)}", exc_info=True)
             return "Error generating market analysis. Please refer to the statistical data above."
 
+    @traced()
     def get_image_url_from_token_uri(self, token_uri):
         """주어진 tokenURI에서 NFT 메타데이터를 가져와서 image_url을 반환함.
         IPFS 변환은 하지 않고, URL 그대로 사용.
@@ -827,7 +842,7 @@ Keep the analysis fact-based and avoid speculation."""
             internal_uri = internal_uri.replace('https://api-ai-staging.playarts.ai', 'http://localhost:5001')
         try:
             logger.info(f"Fetching NFT metadata from {internal_uri}")
-            response = requests.get(internal_uri, timeout=10)
+            response = get_http_session("metadata").get(internal_uri, timeout=10)
             response.raise_for_status()
             metadata = response.json()
             logger.info(f"Metadata response: {json.dumps(metadata, indent=2)}")
@@ -0,0 +1,122 @@
+# registry.py
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    Builds services on first use instead of at import time, so importing the
+    views (manage.py migrate, worker restarts) needs no network, GPU or model
+    weights. Each service is constructed once per process.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                self._instances[name] = instance
+                logger.info(f"Service '{name}' created in {time.perf_counter() - started:.2f}s")
+        return instance
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        Opt-in: construct the given services (all when None) and run their
+        warm_up() hook if they have one. Returns seconds spent per service.
+        """
+        timings = {}
+        for name in (names or list(self._factories)):
+            started = time.perf_counter()
+            try:
+                service = self.get(name)
+                if hasattr(service, "warm_up"):
+                    service.warm_up()
+            except Exception as e:
+                logger.error(f"Warm-up of '{name}' failed: {str(e)}", exc_info=True)
+            timings[name] = round(time.perf_counter() - started, 3)
+        return timings
+
+
+def _wallet_service():
+    from .wallet_service import WalletService
+    return WalletService()
+
+
+def _nft_service():
+    from .nft_service import NFTService
+    return NFTService()
+
+
+def _llm_service():
+    from .llm_service import LLMService
+    return LLMService()
+
+
+def _image_service():
+    from .image_service import ImageService
+    return ImageService()
+
+
+def _orchestrator():
+    from ..core.orchestrator import CommandOrchestrator
+    return CommandOrchestrator()
+
+
+def _trainer_service():
+    # Loads BLIP-2 and SAM and starts the training workers
+    from .trainer_service import TrainerService
+    return TrainerService()
+
+
+def _model_manager():
+    # Loads the FLUX pipeline and every LoRA
+    from .model_manager import get_model_manager
+    return get_model_manager()
+
+
+SERVICES = ServiceRegistry()
+SERVICES.register("wallet", _wallet_service)
+SERVICES.register("nft", _nft_service)
+SERVICES.register("llm", _llm_service)
+SERVICES.register("image", _image_service)
+SERVICES.register("orchestrator", _orchestrator)
+SERVICES.register("trainer", _trainer_service)
+SERVICES.register("model_manager", _model_manager)
+
+
+def get_service(name: str) -> Any:
+    return SERVICES.get(name)
+
+
+def warm_up_from_env() -> Dict[str, float]:
+    """
+    WARM_UP_SERVICES=orchestrator,trainer (or "all") builds those services at
+    startup instead of on the first request. Unset means fully lazy.
+    """
+    value = os.getenv("WARM_UP_SERVICES", "").strip()
+    if not value:
+        return {}
+    names = None if value == "all" else [n.strip() for n in value.split(",") if n.strip()]
+    timings = SERVICES.warm_up(names)
+    logger.info(f"Service warm-up: {timings}")
+    return timings
@@ -0,0 +1,190 @@
+# resilience.py
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+# Both exceptions subclass the requests *and* httpx error types, so the
+# existing `except requests.exceptions.RequestException` / `except
+# httpx.HTTPError` handlers in the services treat them like any failed call.
+class DeadlineExceeded(requests.exceptions.Timeout, httpx.TimeoutException):
+    """The request's deadline passed before (or while) calling an upstream."""
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError, httpx.TransportError):
+    """The upstream's circuit breaker is open; the call was not attempted."""
+
+
+# -- deadlines --
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def request_deadline_seconds() -> float:
+    """REQUEST_DEADLINE_SECONDS (default 90, 0 disables)."""
+    return float(os.getenv('REQUEST_DEADLINE_SECONDS', '90'))
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """
+    Sets the deadline for everything called inside the block (threads started
+    with a copied context and asyncio tasks inherit it). A nested deadline can
+    only shorten the current one.
+    """
+    current = _deadline.get()
+    if seconds is None or seconds <= 0:
+        yield current
+        return
+    at = time.monotonic() + seconds
+    if current is not None:
+        at = min(at, current)
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current deadline, or None without one."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check_deadline(what: str = "upstream call"):
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded before {what}")
+
+
+def clamp_timeout(timeout: Any, what: str = "upstream call") -> Tuple[Any, bool]:
+    """
+    Caps a requests-style timeout (number or (connect, read) tuple) at the time
+    left. Returns (timeout, clamped); raises DeadlineExceeded when none is left.
+    """
+    left = remaining()
+    if left is None:
+        return timeout, False
+    if left <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded before {what}")
+    if timeout is None:
+        return left, True
+    if isinstance(timeout, (int, float)):
+        return (left, True) if left < timeout else (timeout, False)
+    if isinstance(timeout, tuple):
+        capped = tuple(left if t is None or left < t else t for t in timeout)
+        return capped, capped != timeout
+    return timeout, False
+
+
+# -- circuit breakers --
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open calls
+    fail immediately with CircuitOpenError; after `reset_timeout` seconds one
+    trial call is let through (half-open) and its outcome closes or re-opens
+    the circuit.
+
+    allow() returns a token for the trial call (None for ordinary ones) that
+    the caller hands back to record(). Calls admitted before the circuit
+    opened may still finish while it is half-open; only the trial's own
+    outcome changes the state then.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial: Optional[object] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> Optional[object]:
+        with self._lock:
+            if self.state == "closed":
+                return None
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and self._trial is None:
+                self._trial = object()
+                return self._trial
+            self.rejected += 1
+        raise CircuitOpenError(f"Circuit open for {self.name}; failing fast")
+
+    def record(self, ok: Optional[bool], trial: Optional[object] = None):
+        """
+        ok=None: the call ended without saying anything about the upstream (e.g. cancelled).
+        trial: the token allow() returned for this call.
+        """
+        with self._lock:
+            is_trial = trial is not None and trial is self._trial
+            if is_trial:
+                self._trial = None
+            elif self.state != "closed":
+                # A straggler from before the circuit opened: not a trial
+                return
+            if ok is None:
+                return
+            if ok:
+                if self.state != "closed":
+                    logger.info(f"Circuit closed for {self.name}")
+                self.state = "closed"
+                self.failures = 0
+                return
+            self.failures += 1
+            if is_trial or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened for {self.name} after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+def is_failure_status(status_code: int) -> bool:
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitBreakerRegistry:
+    """One breaker per upstream host, shared by the sync and async clients."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> Optional[CircuitBreaker]:
+        """None when CIRCUIT_FAILURES is 0 (breakers disabled)."""
+        breaker = self._breakers.get(host)
+        if breaker is not None:
+            return breaker
+        threshold = int(os.getenv('CIRCUIT_FAILURES', '5'))
+        if threshold <= 0:
+            return None
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(
+                    host, threshold, float(os.getenv('CIRCUIT_RESET_SECONDS', '30'))
+                )
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {host: b.snapshot() for host, b in list(self._breakers.items())}
+
+
+BREAKERS = CircuitBreakerRegistry()
@@ -0,0 +1,208 @@
+# semantic_cache.py
+import os
+import re
+import time
+import zlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the of in on at to for with and or is are was be been do does did can could would should "
+    "i me my you your we our it its this that these those what whats how hows why which who please "
+    "tell explain about there here just".split()
+)
+
+
+def _content_tokens(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class HashingEmbedder:
+    """
+    Dependency-free local embedding: content words, word bigrams and in-word
+    character trigrams hashed into a fixed-size vector. Paraphrases that keep
+    the same content words ("how do I train a character" / "how can i train
+    my character") land on (almost) the same vector; different subjects don't.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _add(self, vec: np.ndarray, feature: str, weight: float):
+        h = zlib.crc32(feature.encode("utf-8"))
+        vec[h % self.dim] += weight if h & 0x80000000 else -weight
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        tokens = _content_tokens(text)
+        for i, token in enumerate(tokens):
+            self._add(vec, "w:" + token, 1.0)
+            if i:
+                self._add(vec, f"b:{tokens[i - 1]} {token}", 0.5)
+            padded = f"#{token}#"
+            for j in range(len(padded) - 2):
+                self._add(vec, "c:" + padded[j:j + 3], 0.2)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+class SentenceTransformerEmbedder:
+    """Small local model (e.g. all-MiniLM-L6-v2) via sentence-transformers, loaded on first use."""
+
+    def __init__(self, model_name: str):
+        self.name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> np.ndarray:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.name, device="cpu")
+        return self._model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+def make_embedder():
+    model_name = os.getenv('SEMANTIC_CACHE_MODEL')
+    if model_name:
+        try:
+            import sentence_transformers  # noqa: F401
+            return SentenceTransformerEmbedder(model_name)
+        except ImportError:
+            logger.warning("sentence-transformers not installed; semantic cache uses the hashing embedder")
+    return HashingEmbedder()
+
+
+class SemanticCache:
+    """
+    Near-duplicate answer cache: a query whose embedding is within `threshold`
+    cosine similarity of a stored query gets the stored answer. Entries live
+    in a fixed-capacity in-memory matrix (brute-force dot product search),
+    expire after `ttl` seconds and the least recently used one is evicted
+    when full.
+    """
+
+    def __init__(self, embedder=None, capacity: int = 1024, ttl: float = 3600,
+                 threshold: float = 0.9, max_query_chars: int = 500):
+        self.embedder = embedder or HashingEmbedder()
+        self.capacity = capacity
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_query_chars = max_query_chars
+        self._vectors: Optional[np.ndarray] = None
+        self._expires = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._queries: List[Optional[str]] = [None] * capacity
+        self._answers: List[Optional[str]] = [None] * capacity
+        self._size = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        if not query or len(query) > self.max_query_chars:
+            return None
+        vec = self.embedder.embed(query)
+        return vec if vec.any() else None
+
+    def _best(self, vec: np.ndarray, now: float) -> Tuple[int, float]:
+        sims = self._vectors[:self._size] @ vec
+        sims[self._expires[:self._size] <= now] = -1.0
+        i = int(np.argmax(sims))
+        return i, float(sims[i])
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        vec = self._embed(query)
+        if vec is None:
+            return None
+        now = time.time()
+        with self._lock:
+            if self._size:
+                i, score = self._best(vec, now)
+                if score >= self.threshold:
+                    self._last_used[i] = now
+                    self.counters["hits"] += 1
+                    return {"answer": self._answers[i], "score": score, "matched_query": self._queries[i]}
+            self.counters["misses"] += 1
+        return None
+
+    def store(self, query: str, answer: str):
+        vec = self._embed(query)
+        if vec is None or not answer:
+            return
+        now = time.time()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, vec.shape[0]), dtype=np.float32)
+            slot = None
+            if self._size:
+                i, score = self._best(vec, now)
+                if score >= 0.999:
+                    slot = i  # same question again: refresh the answer
+            if slot is None:
+                expired = np.flatnonzero(self._expires[:self._size] <= now)
+                if expired.size:
+                    slot = int(expired[0])
+                elif self._size < self.capacity:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    slot = int(np.argmin(self._last_used[:self._size]))
+                    self.counters["evictions"] += 1
+            self._vectors[slot] = vec
+            self._queries[slot] = query
+            self._answers[slot] = answer
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self.counters["stores"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["entries"] = int((self._expires[:self._size] > time.time()).sum())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["embedder"] = self.embedder.name
+        stats["threshold"] = self.threshold
+        return stats
+
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Configured from SEMANTIC_CACHE_TTL (seconds, 0 disables), SEMANTIC_CACHE_SIZE,
+    SEMANTIC_CACHE_THRESHOLD and SEMANTIC_CACHE_MODEL (sentence-transformers
+    model name; the hashing embedder is used when unset).
+    """
+    global _semantic_cache
+    ttl = float(os.getenv('SEMANTIC_CACHE_TTL', '3600'))
+    if ttl <= 0:
+        return None
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache(
+                    embedder=make_embedder(),
+                    capacity=int(os.getenv('SEMANTIC_CACHE_SIZE', '1024')),
+                    ttl=ttl,
+                    threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.9'))
+                )
+    return _semantic_cache
@@ -0,0 +1,120 @@
+# single_flight.py
+import asyncio
+import functools
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .resilience import DeadlineExceeded, remaining
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution: the first
+    caller runs the function, the others wait and get the same result (or the
+    same exception). Nothing is kept once the call finishes; this is not a cache.
+
+    Threaded callers share through do(), coroutines on one event loop through
+    ado(). Shared results are the same object, so callers must not mutate them.
+    A caller joining an in-flight call waits no longer than its own request
+    deadline (DeadlineExceeded); the call itself keeps running for the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = weakref.WeakKeyDictionary()
+        self.counters = {"executed": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.counters["executed"] += 1
+            else:
+                call.waiters += 1
+                self.counters["shared"] += 1
+
+        if not leader:
+            left = remaining()
+            if not call.done.wait(None if left is None else max(left, 0)):
+                raise DeadlineExceeded(f"Request deadline exceeded waiting for shared call {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.debug(f"single-flight {key!r}: shared with {call.waiters} waiting caller(s)")
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.setdefault(loop, {})
+        task = tasks.get(key)
+        if task is None:
+            # A task (not a bare await) so one cancelled caller does not cancel the others
+            task = tasks[key] = loop.create_task(fn(*args, **kwargs))
+            task.add_done_callback(lambda t: tasks.pop(key, None) if tasks.get(key) is t else None)
+            self.counters["executed"] += 1
+        else:
+            self.counters["shared"] += 1
+        left = remaining()
+        if left is None:
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), max(left, 0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Request deadline exceeded waiting for shared call {key!r}") from None
+
+
+FLIGHTS = SingleFlight()
+
+
+def single_flight(key_fn: Callable[..., Optional[Hashable]], flights: SingleFlight = FLIGHTS):
+    """
+    Decorator for service methods (sync or async). key_fn receives the same
+    arguments as the method and returns the coalescing key, or None to run the
+    call on its own.
+    """
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key = key_fn(*args, **kwargs)
+                if key is None:
+                    return await fn(*args, **kwargs)
+                return await flights.ado(key, fn, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = key_fn(*args, **kwargs)
+            if key is None:
+                return fn(*args, **kwargs)
+            return flights.do(key, fn, *args, **kwargs)
+        return wrapper
+    return decorator
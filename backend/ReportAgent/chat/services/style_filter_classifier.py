@@ -0,0 +1,172 @@
+# style_filter_classifier.py
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Other ways users spell the filter names (keys must match LLMService.FILTER_MAPPING)
+FILTER_ALIASES: Dict[str, List[str]] = {
+    'ippy': ['ippy'],
+    'pepe': ['pepe', 'pepe the frog'],
+    'coco': ['coco'],
+    'mfer': ['mfer', 'mfers'],
+    'milady': ['milady', 'miladys', 'miladies', 'milady maker'],
+    'pepenobi': ['pepenobi', 'pepe nobi', 'ninja pepe'],
+    'boop': ['boop'],
+    'monadpepe': ['monadpepe', 'monad pepe'],
+    'patty': ['patty'],
+    'claude': ['claude'],
+    'bluearbpepe': ['bluearbpepe', 'blue arb pepe', 'arbpepe', 'arb pepe', 'arbitrum pepe', 'blue pepe'],
+    'storymushy': ['storymushy', 'story mushy', 'mushy'],
+    'fate': ['fate'],
+    'pipi': ['pipi'],
+    'bopr': ['bopr'],
+    'sparky': ['sparky'],
+}
+
+# What each filter's character looks like (from the filter thumbnails in the web client)
+FILTER_DESCRIPTIONS: Dict[str, str] = {
+    'ippy': "soft white star shaped blob mascot, cute smiling face, pastel 3d render",
+    'pepe': "green frog meme, smug sad frog face, classic pepe",
+    'coco': "green virus germ with spikes and a frog face, coronavirus meme",
+    'mfer': "simple stick figure with headphones smoking a cigarette, doodle",
+    'milady': "anime chibi girl, neochibi fashion, cute girl with big eyes",
+    'pepenobi': "orange ninja frog with headband eating ramen noodles, naruto style ninja",
+    'boop': "fluffy white dog nose close up with laser eyes, doge meme puppy",
+    'monadpepe': "purple frog, monad themed pepe",
+    'patty': "chubby green dinosaur toy with blue cheeks, 3d cute dino",
+    'claude': "dark round cloud blob with red lips, muscular pose, 3d game character",
+    'bluearbpepe': "blue frog, arbitrum themed pepe",
+    'storymushy': "yellow chick duckling bird with big eyes, cartoon",
+    'fate': "orange haired anime boy with headband winking, overalls, forest",
+    'pipi': "mint green blob frog smiling, yellow stripes, kawaii",
+    'bopr': "purple bunny rabbit with big eyes and long ears, halftone comic, city street",
+    'sparky': "yellow lightning spiky hero with sneakers, energetic fist, electric",
+}
+
+_STOPWORDS = frozenset(
+    "a an the of in on at to for with and or is are be me my please image picture "
+    "style like some that this it as by from into".split()
+)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass
+class FilterDecision:
+    key: Optional[str]
+    confident: bool
+    source: str  # "cache", "name", "index" or "none"
+
+
+class StyleFilterClassifier:
+    """
+    Picks one FILTER_MAPPING key for an image prompt without an LLM call.
+
+    1. Name/alias match: the first filter mentioned wins (same rule the LLM
+       prompt asks for); the longest alias wins at the same position.
+    2. TF-IDF cosine over the filter descriptions; answered only when the best
+       score clears `min_score` and beats the runner-up by `min_margin`.
+    Otherwise the decision is not confident and the caller asks the LLM, then
+    stores the answer with remember(). Decisions are memoized in an LRU.
+    """
+
+    def __init__(self,
+                 filter_keys: Iterable[str],
+                 aliases: Dict[str, List[str]] = FILTER_ALIASES,
+                 descriptions: Dict[str, str] = FILTER_DESCRIPTIONS,
+                 min_score: float = 0.3,
+                 min_margin: float = 0.1,
+                 cache_size: int = 1024):
+        self.filter_keys = list(filter_keys)
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        alias_key = {}
+        for key in self.filter_keys:
+            for alias in aliases.get(key, [key]):
+                alias_key[alias] = key
+        self._alias_key = alias_key
+        ordered = sorted(alias_key, key=len, reverse=True)
+        self._alias_re = re.compile(
+            r"(?<![a-z0-9])(" + "|".join(re.escape(a) for a in ordered) + r")(?:'s|s)?(?![a-z0-9])"
+        )
+        self._build_index({k: descriptions.get(k, k) for k in self.filter_keys})
+
+    def _build_index(self, documents: Dict[str, str]):
+        doc_tokens = {key: _tokenize(f"{key} {text}") for key, text in documents.items()}
+        df = Counter(token for tokens in doc_tokens.values() for token in set(tokens))
+        n_docs = len(doc_tokens)
+        self._idf = {token: math.log((1 + n_docs) / (1 + count)) + 1.0 for token, count in df.items()}
+        self._doc_vectors = {key: self._vectorize(tokens) for key, tokens in doc_tokens.items()}
+
+    def _vectorize(self, tokens: List[str]) -> Dict[str, float]:
+        tf = Counter(t for t in tokens if t in self._idf)
+        vector = {t: count * self._idf[t] for t, count in tf.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {t: v / norm for t, v in vector.items()} if norm else {}
+
+    @staticmethod
+    def _normalize(prompt: str) -> str:
+        return " ".join(prompt.lower().split())
+
+    def match_name(self, prompt: str) -> Optional[str]:
+        m = self._alias_re.search(prompt.lower())
+        return self._alias_key[m.group(1)] if m else None
+
+    def score(self, prompt: str) -> List[Tuple[str, float]]:
+        """Cosine scores against every filter description, best first."""
+        query = self._vectorize(_tokenize(prompt))
+        if not query:
+            return []
+        scores = [
+            (key, sum(w * doc.get(t, 0.0) for t, w in query.items()))
+            for key, doc in self._doc_vectors.items()
+        ]
+        return sorted(scores, key=lambda x: x[1], reverse=True)
+
+    def classify(self, prompt: str) -> FilterDecision:
+        normalized = self._normalize(prompt)
+        with self._lock:
+            if normalized in self._cache:
+                self._cache.move_to_end(normalized)
+                return FilterDecision(self._cache[normalized], True, "cache")
+
+        key = self.match_name(normalized)
+        if key:
+            self.remember(normalized, key)
+            return FilterDecision(key, True, "name")
+
+        scores = self.score(normalized)
+        if scores:
+            best_key, best = scores[0]
+            runner_up = scores[1][1] if len(scores) > 1 else 0.0
+            if best >= self.min_score and best - runner_up >= self.min_margin:
+                self.remember(normalized, best_key)
+                return FilterDecision(best_key, True, "index")
+
+        return FilterDecision(None, False, "none")
+
+    def remember(self, prompt: str, key: Optional[str]):
+        """Memoize a decision (including an LLM answer or 'no filter')."""
+        normalized = self._normalize(prompt)
+        with self._lock:
+            self._cache[normalized] = key
+            self._cache.move_to_end(normalized)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -0,0 +1,231 @@
+# tracing.py
+import os
+import json
+import time
+import queue
+import bisect
+import asyncio
+import logging
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "duration_ms", "attrs", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration_ms = 0.0
+        self.attrs = attrs
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets (ms); percentiles are reported as bucket upper bounds."""
+
+    BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+
+    def record(self, ms: float, error: bool = False):
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if error:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target and c:
+                return float(self.BOUNDS_MS[i]) if i < len(self.BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={b}" for b in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {label: c for label, c in zip(labels, self.counts) if c},
+        }
+
+
+class _SpanExporter:
+    """
+    Background thread that appends finished spans to a JSONL file and/or POSTs
+    them in batches (a JSON list) to a local collector.
+    """
+
+    def __init__(self, jsonl_path: Optional[str], collector_url: Optional[str], max_batch: int = 256):
+        self.jsonl_path = jsonl_path
+        self.collector_url = collector_url
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=10000)
+        self.dropped = 0
+        threading.Thread(target=self._run, name="span-exporter", daemon=True).start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + 1.0
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        if self.jsonl_path:
+            try:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(s, default=str) + "\n" for s in batch)
+            except OSError as e:
+                logger.warning(f"Span export to {self.jsonl_path} failed: {str(e)}")
+        if self.collector_url:
+            from .http_client import get_http_session
+            try:
+                get_http_session("collector").post(self.collector_url, json=batch)
+            except Exception as e:
+                logger.warning(f"Span export to {self.collector_url} failed: {str(e)}")
+
+
+class Tracer:
+    """
+    Span tracing for the chat pipeline. The current span is kept in a
+    ContextVar, so nesting follows both call stacks and asyncio tasks.
+    Every finished span feeds a per-name latency histogram; export is enabled
+    with TRACE_JSONL_PATH and/or TRACE_COLLECTOR_URL.
+    """
+
+    def __init__(self, recent_size: int = 200):
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._recent: "deque[Dict[str, Any]]" = deque(maxlen=recent_size)
+        self._lock = threading.Lock()
+        self._exporter: Optional[_SpanExporter] = None
+        self._exporter_ready = False
+
+    def current(self) -> Optional[Span]:
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        s = Span(name, self._current.get(), attrs)
+        token = self._current.set(s)
+        started = time.perf_counter()
+        try:
+            yield s
+        except BaseException as e:
+            s.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            s.duration_ms = (time.perf_counter() - started) * 1000
+            self._current.reset(token)
+            self._finish(s)
+
+    def _finish(self, s: Span):
+        with self._lock:
+            histogram = self._histograms.get(s.name)
+            if histogram is None:
+                histogram = self._histograms[s.name] = LatencyHistogram()
+            histogram.record(s.duration_ms, s.error is not None)
+            if s.parent_id is None:
+                self._recent.append({"trace_id": s.trace_id, "name": s.name, "duration_ms": round(s.duration_ms, 2)})
+        exporter = self._get_exporter()
+        if exporter is not None:
+            exporter.export(s)
+
+    def _get_exporter(self) -> Optional[_SpanExporter]:
+        if not self._exporter_ready:
+            with self._lock:
+                if not self._exporter_ready:
+                    jsonl_path = os.getenv("TRACE_JSONL_PATH") or None
+                    collector_url = os.getenv("TRACE_COLLECTOR_URL") or None
+                    if jsonl_path or collector_url:
+                        self._exporter = _SpanExporter(jsonl_path, collector_url)
+                    self._exporter_ready = True
+        return self._exporter
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {name: h.snapshot() for name, h in sorted(self._histograms.items())}
+            recent = list(self._recent)[-20:]
+        return {
+            "stages": stages,
+            "recent_traces": recent,
+            "dropped_spans": self._exporter.dropped if self._exporter else 0,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._recent.clear()
+
+
+TRACER = Tracer()
+
+
+def span(name: str, **attrs):
+    """with span("alchemy.page", page=3): ..."""
+    return TRACER.span(name, **attrs)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator: run a sync or async function inside a span (default name: its qualname)."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with TRACER.span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,123 @@
+# transfer_columns.py
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .transfer_record import Transfer
+
+MISSING_TS = np.iinfo(np.int64).min
+
+
+def _parse_timestamps(raw: List[str]) -> np.ndarray:
+    """ISO blockTimestamps -> int64 ms since epoch (MISSING_TS when empty or malformed)."""
+    trimmed = [s[:-1] if s.endswith('Z') else s for s in raw]
+    try:
+        parsed = np.array(trimmed, dtype='datetime64[ms]')
+    except ValueError:
+        # One malformed value fails the whole conversion; redo it element-wise
+        parsed = np.empty(len(trimmed), dtype='datetime64[ms]')
+        for i, s in enumerate(trimmed):
+            try:
+                parsed[i] = np.datetime64(s, 'ms')
+            except ValueError:
+                parsed[i] = np.datetime64('NaT')
+    return parsed.astype(np.int64)
+
+
+class TransferColumns:
+    """
+    One wallet's Transfer records as NumPy columns, built in a single
+    pass so the report aggregates, top-N lists and burst detection run
+    vectorized instead of re-walking the transfer list.
+
+    ts           int64 ms since epoch (MISSING_TS when absent)
+    value        float64, the transfer's `amount`
+    outgoing     bool, sent by the wallet
+    erc20        bool
+    token        int32 code into `tokens` (erc20 rows only, -1 elsewhere), first-seen order
+    sender, receiver  int32 codes into `addresses` (lowercased)
+    """
+
+    def __init__(self, transactions: List[Transfer], address: str):
+        me = address.lower()
+        self.transactions = transactions
+        self.n = len(transactions)
+        self.tokens: List[Any] = []
+        self.addresses: Dict[str, int] = {}
+        token_index: Dict[Any, int] = {}
+
+        raw_ts, values, erc20, token, sender, receiver = [], [], [], [], [], []
+        for tx in transactions:
+            raw_ts.append(tx.timestamp)
+            values.append(tx.amount)
+            is_erc20 = tx.category == 'erc20'
+            erc20.append(is_erc20)
+            if is_erc20:
+                symbol = tx.asset
+                code = token_index.get(symbol)
+                if code is None:
+                    code = token_index[symbol] = len(self.tokens)
+                    self.tokens.append(symbol)
+                token.append(code)
+            else:
+                token.append(-1)
+            sender.append(self._code(tx.sender))
+            receiver.append(self._code(tx.receiver))
+
+        self.ts = _parse_timestamps(raw_ts)
+        self.value = np.array(values, dtype=np.float64)
+        self.erc20 = np.array(erc20, dtype=bool)
+        self.token = np.array(token, dtype=np.int32)
+        self.sender = np.array(sender, dtype=np.int32)
+        self.receiver = np.array(receiver, dtype=np.int32)
+        self.outgoing = self.sender == self.addresses.get(me, -2)
+
+    def _code(self, addr: str) -> int:
+        code = self.addresses.get(addr)
+        if code is None:
+            code = self.addresses[addr] = len(self.addresses)
+        return code
+
+    def token_stats(self) -> List[Tuple[Any, int, float, float]]:
+        """(symbol, count, incoming, outgoing) per ERC-20 token, in first-seen order."""
+        if not self.tokens:
+            return []
+        codes = self.token[self.erc20]
+        values = self.value[self.erc20]
+        outgoing = self.outgoing[self.erc20]
+        size = len(self.tokens)
+        counts = np.bincount(codes, minlength=size)
+        incoming_sum = np.bincount(codes, weights=np.where(outgoing, 0.0, values), minlength=size)
+        outgoing_sum = np.bincount(codes, weights=np.where(outgoing, values, 0.0), minlength=size)
+        return [
+            (symbol, int(counts[i]), float(incoming_sum[i]), float(outgoing_sum[i]))
+            for i, symbol in enumerate(self.tokens)
+        ]
+
+    def eth_totals(self) -> Tuple[float, float]:
+        """(incoming, outgoing) over the non-ERC-20 rows."""
+        eth = ~self.erc20
+        return (float(self.value[eth & ~self.outgoing].sum()),
+                float(self.value[eth & self.outgoing].sum()))
+
+    def latest(self, mask: np.ndarray, k: int = 10) -> np.ndarray:
+        """
+        Row indices of the k latest transfers in `mask`, newest first; ties keep
+        list order (like sorted(..., reverse=True)).
+        """
+        rows = np.flatnonzero(mask)
+        # Stable ascending sort of the reversed rows, reversed back -> descending, ties in list order
+        order = np.argsort(self.ts[rows][::-1], kind='stable')[::-1]
+        return rows[len(rows) - 1 - order][:k]
+
+    def burst_count(self, window_ms: int = 60_000) -> int:
+        """Consecutive transfers (by time) at most `window_ms` apart."""
+        ts = np.sort(self.ts[self.ts != MISSING_TS])
+        return int(np.count_nonzero(np.diff(ts) <= window_ms))
+
+    def touching(self, flagged: Iterable[str]) -> int:
+        """Transfers whose sender or receiver is in `flagged` (lowercase addresses)."""
+        codes = [self.addresses[a] for a in flagged if a in self.addresses]
+        if not codes:
+            return 0
+        return int(np.count_nonzero(np.isin(self.sender, codes) | np.isin(self.receiver, codes)))
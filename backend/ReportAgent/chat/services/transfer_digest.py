@@ -0,0 +1,167 @@
+# transfer_digest.py
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Any, Dict, List
+
+from .transfer_record import Transfer
+
+# Fixed sizes: the digest (and the prompt built from it) does not grow with
+# the number of transfers.
+TOP_N = 5
+RECENT_N = 3
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+HOUR_BUCKETS = ("00-04", "04-08", "08-12", "12-16", "16-20", "20-24")
+
+
+def _short(addr: str) -> str:
+    return f"{addr[:8]}…{addr[-4:]}" if addr and len(addr) > 14 else (addr or "?")
+
+
+def _rank(counter: Counter, n: int = TOP_N) -> List:
+    # Ties broken by key so the digest (and the LLM cache key) is deterministic
+    return sorted(counter.items(), key=lambda kv: (-kv[1], str(kv[0])))[:n]
+
+
+def build_wallet_digest(transactions: List[Transfer], address: str) -> Dict[str, Any]:
+    """
+    One pass over the wallet's transfers -> counts, volumes, top counterparties,
+    top tokens, time histograms and the few most recent transfers.
+    """
+    me = address.lower()
+    directions = Counter()
+    categories = Counter()
+    counterparties = Counter()
+    tokens = defaultdict(lambda: {"count": 0, "in": 0.0, "out": 0.0})
+    eth = {"in": 0.0, "out": 0.0}
+    hours = [0] * len(HOUR_BUCKETS)
+    weekdays = [0] * 7
+    days = Counter()
+    weekday_of: Dict[str, int] = {}
+    largest = []
+    timestamps = []
+
+    for tx in transactions:
+        sender = tx.sender
+        receiver = tx.receiver
+        outgoing = sender == me
+        direction = "out" if outgoing else "in"
+        directions[direction] += 1
+        category = tx.category or 'unknown'
+        categories[category] += 1
+        counterparty = receiver if outgoing else sender
+        if counterparty:
+            counterparties[counterparty] += 1
+
+        value = tx.value
+        asset = tx.asset or category
+        if category in ('external', 'internal') and asset == 'ETH':
+            eth[direction] += value
+            largest.append((value, direction, counterparty))
+        elif category == 'erc20':
+            token = tokens[asset[:16]]
+            token["count"] += 1
+            token[direction] += value
+
+        ts = tx.timestamp
+        if len(ts) >= 13:
+            timestamps.append(ts)
+            hours[int(ts[11:13]) // 4] += 1
+            day = ts[:10]
+            days[day] += 1
+            if day not in weekday_of:
+                try:
+                    weekday_of[day] = date.fromisoformat(day).weekday()
+                except ValueError:
+                    weekday_of[day] = -1
+            if weekday_of[day] >= 0:
+                weekdays[weekday_of[day]] += 1
+
+    timestamps.sort()
+    busiest_day = _rank(days, 1)
+    return {
+        "total": len(transactions),
+        "incoming": directions["in"],
+        "outgoing": directions["out"],
+        "categories": dict(_rank(categories, 6)),
+        "eth_in": round(eth["in"], 4),
+        "eth_out": round(eth["out"], 4),
+        "top_counterparties": [(_short(a), c) for a, c in _rank(counterparties)],
+        "unique_counterparties": len(counterparties),
+        "top_tokens": [
+            (symbol, stats["count"], round(stats["in"], 4), round(stats["out"], 4))
+            for symbol, stats in sorted(tokens.items(), key=lambda kv: (-kv[1]["count"], kv[0]))[:TOP_N]
+        ],
+        "largest_eth": [
+            (round(v, 4), d, _short(c)) for v, d, c in sorted(largest, key=lambda x: -x[0])[:RECENT_N]
+        ],
+        "first_seen": timestamps[0][:16] if timestamps else None,
+        "last_seen": timestamps[-1][:16] if timestamps else None,
+        "active_days": len(days),
+        "busiest_day": busiest_day[0] if busiest_day else None,
+        "hour_histogram": dict(zip(HOUR_BUCKETS, hours)),
+        "weekday_histogram": dict(zip(WEEKDAYS, weekdays)),
+    }
+
+
+def format_wallet_digest(digest: Dict[str, Any]) -> str:
+    lines = [
+        f"Transfers: {digest['total']} (in {digest['incoming']}, out {digest['outgoing']})",
+        "By category: " + ", ".join(f"{k} {v}" for k, v in digest['categories'].items()),
+        f"ETH volume: in {digest['eth_in']}, out {digest['eth_out']}, net {digest['eth_in'] - digest['eth_out']:+.4f}",
+        f"Counterparties: {digest['unique_counterparties']} unique; top: "
+        + ", ".join(f"{a} x{c}" for a, c in digest['top_counterparties']),
+    ]
+    if digest['top_tokens']:
+        lines.append("Top ERC-20 (count/in/out): " + ", ".join(
+            f"{s} {c}/{i}/{o}" for s, c, i, o in digest['top_tokens']
+        ))
+    if digest['largest_eth']:
+        lines.append("Largest ETH transfers: " + ", ".join(
+            f"{v} {d} {c}" for v, d, c in digest['largest_eth']
+        ))
+    if digest['first_seen']:
+        busiest = digest['busiest_day']
+        lines.append(
+            f"Active {digest['active_days']} days between {digest['first_seen']} and {digest['last_seen']} UTC"
+            + (f"; busiest {busiest[0]} ({busiest[1]} transfers)" if busiest else "")
+        )
+        lines.append("By hour (UTC): " + ", ".join(f"{k} {v}" for k, v in digest['hour_histogram'].items()))
+        lines.append("By weekday: " + ", ".join(f"{k} {v}" for k, v in digest['weekday_histogram'].items()))
+    return "\n".join(lines)
+
+
+def build_market_digest(collection_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Market-wide totals over every collection (the per-collection rows stay top-N)."""
+    sales = volume = transfers = 0
+    marketplaces = Counter()
+    days = Counter()
+    for stats in collection_stats.values():
+        sales += stats.get('sales', 0)
+        transfers += stats.get('transfers', 0)
+        volume += stats.get('volume_eth', 0.0)
+        for name, count in stats.get('marketplace_stats', {}).items():
+            marketplaces[name] += count
+        for record in stats.get('price_history', []):
+            ts = record.get('timestamp') or ''
+            if len(ts) >= 10:
+                days[ts[:10]] += 1
+    return {
+        "collections": len(collection_stats),
+        "sales": sales,
+        "transfers": transfers,
+        "volume_eth": round(volume, 2),
+        "marketplaces": [(name, round(count / sales * 100, 1)) for name, count in _rank(marketplaces)] if sales else [],
+        "daily_sales": sorted(days.items())[-7:],
+    }
+
+
+def format_market_digest(digest: Dict[str, Any]) -> str:
+    lines = [
+        f"Collections traded: {digest['collections']}; sales {digest['sales']}, "
+        f"non-sale transfers {digest['transfers']}, volume {digest['volume_eth']} ETH",
+    ]
+    if digest['marketplaces']:
+        lines.append("Marketplace share of sales: " + ", ".join(f"{n} {p}%" for n, p in digest['marketplaces']))
+    if digest['daily_sales']:
+        lines.append("Sales per day: " + ", ".join(f"{d} {c}" for d, c in digest['daily_sales']))
+    return "\n".join(lines)
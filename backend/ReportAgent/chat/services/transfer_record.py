@@ -0,0 +1,177 @@
+# transfer_record.py
+import sys
+import json
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+
+def _hex_to_eth(hex_value: str) -> float:
+    if not hex_value:
+        return 0.0
+    try:
+        if hex_value.startswith('0x'):
+            wei = int(hex_value, 16)
+            return float(wei) / 1e18
+        return 0.0
+    except ValueError:
+        return 0.0
+
+
+def transfer_value(tx: Dict[str, Any]) -> float:
+    """
+    Extracts a 'direct' value (ETH or ERC-20) from a single Alchemy transfer dict.
+    """
+    try:
+        # 1. Direct value field
+        if 'value' in tx:
+            val = tx['value']
+            if isinstance(val, str):
+                if val.startswith('0x'):
+                    return _hex_to_eth(val)
+                else:
+                    try:
+                        return float(val)
+                    except ValueError:
+                        pass
+            elif isinstance(val, (int, float)):
+                return float(val)
+
+        # 2. rawContract.value
+        if 'rawContract' in tx and 'value' in tx['rawContract']:
+            raw_val = tx['rawContract']['value']
+            if isinstance(raw_val, str):
+                return _hex_to_eth(raw_val)
+            elif isinstance(raw_val, (int, float)):
+                return float(raw_val) / 1e18
+
+        # 3. metadata.value
+        metadata = tx.get('metadata', {})
+        if 'value' in metadata:
+            try:
+                return float(metadata['value'])
+            except (ValueError, TypeError):
+                pass
+
+        # 4. erc20 token transfer value (Alchemy response format)
+        if 'erc20Metadata' in tx:
+            erc20 = tx['erc20Metadata']
+            if isinstance(erc20, dict):
+                raw_val = erc20.get('value')
+                decimals = erc20.get('decimals', 18)
+                if raw_val and raw_val.isdigit():
+                    return float(raw_val) / (10 ** int(decimals))
+
+        # 5. external transfer's ETH value
+        if tx.get('category') == 'external' and tx.get('asset') == 'ETH':
+            raw_val = tx.get('value')
+            if isinstance(raw_val, str):
+                try:
+                    return float(raw_val)
+                except ValueError:
+                    pass
+            elif isinstance(raw_val, (int, float)):
+                return float(raw_val)
+
+        return 0.0
+
+    except Exception as e:
+        print(f"Error extracting value from tx: {str(e)}, tx data: {json.dumps(tx)[:200]}...")
+        return 0.0
+
+
+def _amount(value: Any) -> float:
+    """The transfer's `value` field as a float (digits, '.' and '-' kept; 0.0 when unparsable)."""
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(''.join(c for c in str(value) if c.isdigit() or c == '.' or c == '-'))
+    except ValueError:
+        return 0.0
+
+
+def _intern(value: Optional[str]) -> str:
+    return sys.intern(value.lower()) if value else ''
+
+
+class Transfer:
+    """
+    One Alchemy asset transfer, decoded once when its page arrives: block and
+    values as numbers, addresses lowercased and interned (a wallet's
+    counterparties repeat), everything else from the nested JSON dropped.
+
+    value     the 'direct' ETH / token value (transfer_value)
+    amount    the raw `value` field as a float (what the wallet report shows)
+    """
+
+    __slots__ = ("hash", "unique_id", "block", "timestamp", "category", "sender", "receiver",
+                 "asset", "contract", "token_id", "value", "amount")
+
+    def __init__(self, hash: str, unique_id: Optional[str], block: int, timestamp: str, category: str,
+                 sender: str, receiver: str, asset: Optional[str], contract: str, token_id: Optional[str],
+                 value: float, amount: float):
+        self.hash = hash
+        self.unique_id = unique_id
+        self.block = block
+        self.timestamp = timestamp
+        self.category = category
+        self.sender = sender
+        self.receiver = receiver
+        self.asset = asset
+        self.contract = contract
+        self.token_id = token_id
+        self.value = value
+        self.amount = amount
+
+    @classmethod
+    def from_alchemy(cls, tx: Dict[str, Any]) -> "Transfer":
+        try:
+            block = int(tx.get('blockNum') or '0x0', 16)
+        except ValueError:
+            block = 0
+        asset = tx.get('asset', 'Unknown')
+        return cls(
+            tx.get('hash') or '',
+            tx.get('uniqueId'),
+            block,
+            (tx.get('metadata') or {}).get('blockTimestamp') or '',
+            sys.intern(tx.get('category') or ''),
+            _intern(tx.get('from')),
+            _intern(tx.get('to')),
+            sys.intern(asset) if isinstance(asset, str) else asset,
+            _intern((tx.get('rawContract') or {}).get('address')),
+            tx.get('tokenId'),
+            transfer_value(tx),
+            _amount(tx.get('value')),
+        )
+
+    def to_row(self) -> List[Any]:
+        """Compact list form (for the transfer store)."""
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_row(cls, row: Union[List[Any], Dict[str, Any]]) -> "Transfer":
+        """Inverse of to_row; also accepts a raw Alchemy dict."""
+        if isinstance(row, dict):
+            return cls.from_alchemy(row)
+        transfer = cls(*row)
+        for name in ("category", "sender", "receiver", "contract"):
+            setattr(transfer, name, sys.intern(getattr(transfer, name)))
+        return transfer
+
+    def __repr__(self) -> str:
+        return f"Transfer({self.category} {self.sender}->{self.receiver} {self.amount} {self.asset} @{self.block})"
+
+
+class TransferList(list):
+    """
+    A fetched transfer history. `truncated` is set when an API error, an open
+    circuit or the request deadline ended the pagination before it was done,
+    i.e. the list is a prefix of the wallet's real history.
+    """
+
+    truncated = False
+
+
+def parse_transfers(transfers: Iterable[Dict[str, Any]]) -> List[Transfer]:
+    return [Transfer.from_alchemy(tx) for tx in transfers]
@@ -0,0 +1,200 @@
+# transfer_store.py
+import os
+import json
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from .transfer_record import Transfer
+
+logger = logging.getLogger(__name__)
+
+# Outside the source tree: SQLite also leaves -wal/-shm files next to the database
+DEFAULT_STORE_PATH = os.path.join(tempfile.gettempdir(), 'reportagent', 'transfer_store.sqlite3')
+
+
+class TransferStore:
+    """
+    Local SQLite copy of the Alchemy asset transfers fetched per (address,
+    direction), as compact Transfer rows, with a high-water mark: the highest
+    block stored.
+
+    Transfers are kept in fetch order (block ascending, like Alchemy returns
+    them), so the first `limit` stored rows are what a fresh fetch from block
+    0x0 with the same limit would return. A repeat analysis therefore only
+    fetches from the mark on, and not at all once the store already holds
+    `limit` transfers. The last `reorg_depth` blocks below the mark are
+    re-fetched and replaced each time, which also completes a block that a
+    truncated fetch stopped in the middle of.
+
+    Histories not used for `max_age` seconds are dropped, and only the
+    `max_addresses` most recently used addresses are kept (0 = no limit);
+    pruning runs on open and then at most every `prune_interval` seconds.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, reorg_depth: int = 12,
+                 max_age: float = 30 * 86400, max_addresses: int = 5000, prune_interval: float = 3600):
+        self.path = path
+        self.reorg_depth = reorg_depth
+        self.max_age = max_age
+        self.max_addresses = max_addresses
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self.counters = {"loads": 0, "fetches": 0, "skipped_fetches": 0, "transfers_fetched": 0, "pruned": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS transfers ("
+            "address TEXT NOT NULL, direction TEXT NOT NULL, block INTEGER NOT NULL, data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS transfers_by_block ON transfers (address, direction, block)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS transfer_marks ("
+            "address TEXT NOT NULL, direction TEXT NOT NULL, last_block INTEGER NOT NULL, "
+            "stored INTEGER NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (address, direction))"
+        )
+        self._db.commit()
+        self.prune()
+
+    def fetch_start(self, address: str, direction: str, limit: int) -> Optional[int]:
+        """First block to fetch from, or None when the stored transfers already answer `limit`."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_block, stored FROM transfer_marks WHERE address = ? AND direction = ?",
+                (address, direction)
+            ).fetchone()
+        if row is None:
+            return 0
+        last_block, stored = row
+        if stored >= limit:
+            self.counters["skipped_fetches"] += 1
+            self._touch(address, direction)
+            return None
+        return max(last_block - self.reorg_depth, 0)
+
+    def _touch(self, address: str, direction: str):
+        # Served without a fetch: still in use as far as pruning is concerned
+        with self._lock:
+            try:
+                self._db.execute(
+                    "UPDATE transfer_marks SET updated_at = ? WHERE address = ? AND direction = ?",
+                    (time.time(), address, direction)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._db.rollback()
+                logger.warning(f"Transfer store write failed for {address}: {str(e)}")
+
+    def save(self, address: str, direction: str, start_block: int, transfers: List[Transfer]):
+        """
+        Replaces the stored transfers from `start_block` on with a fetch that
+        started there. An empty fetch leaves the store alone: fetch_all_transfers
+        also returns [] when the upstream failed.
+        """
+        self.counters["fetches"] += 1
+        if not transfers:
+            return
+        self.counters["transfers_fetched"] += len(transfers)
+        rows = [(address, direction, tx.block, json.dumps(tx.to_row())) for tx in transfers]
+        with self._lock:
+            try:
+                self._db.execute(
+                    "DELETE FROM transfers WHERE address = ? AND direction = ? AND block >= ?",
+                    (address, direction, start_block)
+                )
+                self._db.executemany(
+                    "INSERT INTO transfers (address, direction, block, data) VALUES (?, ?, ?, ?)", rows
+                )
+                stored = self._db.execute(
+                    "SELECT COUNT(*) FROM transfers WHERE address = ? AND direction = ?", (address, direction)
+                ).fetchone()[0]
+                self._db.execute(
+                    "INSERT OR REPLACE INTO transfer_marks (address, direction, last_block, stored, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (address, direction, max(row[2] for row in rows), stored, time.time())
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._db.rollback()
+                logger.warning(f"Transfer store write failed for {address}: {str(e)}")
+        if time.monotonic() - self._pruned_at >= self.prune_interval:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drops histories past max_age and beyond max_addresses; returns the number of transfers removed."""
+        self._pruned_at = time.monotonic()
+        with self._lock:
+            try:
+                if self.max_age > 0:
+                    self._db.execute("DELETE FROM transfer_marks WHERE updated_at < ?", (time.time() - self.max_age,))
+                if self.max_addresses > 0:
+                    self._db.execute(
+                        "DELETE FROM transfer_marks WHERE address IN ("
+                        "SELECT address FROM transfer_marks GROUP BY address "
+                        "ORDER BY MAX(updated_at) DESC LIMIT -1 OFFSET ?)",
+                        (self.max_addresses,)
+                    )
+                removed = self._db.execute(
+                    "DELETE FROM transfers WHERE NOT EXISTS ("
+                    "SELECT 1 FROM transfer_marks m WHERE m.address = transfers.address "
+                    "AND m.direction = transfers.direction)"
+                ).rowcount
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._db.rollback()
+                logger.warning(f"Transfer store prune failed: {str(e)}")
+                return 0
+        self.counters["pruned"] += removed
+        return removed
+
+    def load(self, address: str, direction: str, limit: int) -> List[Transfer]:
+        self.counters["loads"] += 1
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM transfers WHERE address = ? AND direction = ? ORDER BY block, rowid LIMIT ?",
+                (address, direction, limit)
+            ).fetchall()
+        return [Transfer.from_row(json.loads(row[0])) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            addresses, transfers = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(stored), 0) FROM transfer_marks"
+            ).fetchone()
+        return {**self.counters, "histories": addresses, "transfers_stored": transfers}
+
+
+_store: Optional[TransferStore] = None
+_store_lock = threading.Lock()
+
+
+def get_transfer_store() -> Optional[TransferStore]:
+    """
+    TRANSFER_STORE_PATH (SQLite file, empty disables),
+    TRANSFER_STORE_REORG_DEPTH (blocks re-fetched below the mark, default 12),
+    TRANSFER_STORE_MAX_AGE_DAYS (unused histories dropped after, default 30, 0 = never) and
+    TRANSFER_STORE_MAX_ADDRESSES (most recently used addresses kept, default 5000, 0 = no limit).
+    """
+    global _store
+    path = os.getenv('TRANSFER_STORE_PATH', DEFAULT_STORE_PATH)
+    if not path:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = TransferStore(
+                        path,
+                        reorg_depth=int(os.getenv('TRANSFER_STORE_REORG_DEPTH', '12')),
+                        max_age=float(os.getenv('TRANSFER_STORE_MAX_AGE_DAYS', '30')) * 86400,
+                        max_addresses=int(os.getenv('TRANSFER_STORE_MAX_ADDRESSES', '5000')),
+                    )
+                except (sqlite3.Error, OSError) as e:
+                    logger.error(f"Transfer store disabled ({path}): {str(e)}")
+                    return None
+    return _store
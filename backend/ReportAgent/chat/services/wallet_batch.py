@@ -0,0 +1,46 @@
+# wallet_batch.py
+import os
+import asyncio
+import weakref
+from typing import Iterable, List, Tuple
+
+from web3 import Web3
+
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def batch_concurrency() -> int:
+    """WALLET_BATCH_CONCURRENCY: wallets fetched at once across all batch requests (default 8)."""
+    return max(int(os.getenv('WALLET_BATCH_CONCURRENCY', '8')), 1)
+
+
+def max_batch_size() -> int:
+    """WALLET_BATCH_MAX_ADDRESSES: addresses accepted per batch request (default 500)."""
+    return int(os.getenv('WALLET_BATCH_MAX_ADDRESSES', '500'))
+
+
+def get_batch_limiter() -> asyncio.Semaphore:
+    """
+    The semaphore bound to the running event loop that every batch shares, so
+    concurrent batch requests split the upstream quota instead of each adding
+    batch_concurrency() wallets of load (one loop = the whole process under ASGI).
+    """
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = asyncio.Semaphore(batch_concurrency())
+    return limiter
+
+
+def split_addresses(addresses: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """(valid addresses, de-duplicated case-insensitively in input order; invalid entries)."""
+    valid, invalid, seen = [], [], set()
+    for address in addresses:
+        if not isinstance(address, str) or not Web3.is_address(address.strip()):
+            invalid.append(address)
+            continue
+        address = address.strip()
+        if address.lower() not in seen:
+            seen.add(address.lower())
+            valid.append(address)
+    return valid, invalid
@@ -0,0 +1,121 @@
+# wallet_report_cache.py
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+@dataclass
+class CachedReport:
+    report: str
+    block: int
+    created_at: float = field(default_factory=time.time)
+    # Recent lookup times, to tell hot addresses apart
+    hits: Deque[float] = field(default_factory=deque)
+
+
+class WalletReportCache:
+    """
+    Finished wallet reports (basic report + LLM analysis) per address, stamped
+    with the block they were built at.
+
+    How far the chain may have moved past that block is given in seconds of
+    chain time (blocks behind x the chain's block time), so the same settings
+    fit Ethereum's ~12 s blocks and Arbitrum's ~0.25 s ones. A report is served
+    as is while it is at most `max_lag_seconds` behind (and younger than
+    `ttl`). Up to `max_stale_seconds` behind, a hot address (`hot_hits` lookups
+    within `hot_window` seconds) still gets the cached report immediately and
+    is rebuilt in the background; any other address is rebuilt before answering.
+    """
+
+    def __init__(self, ttl: float = 3600, max_lag_seconds: float = 60, max_stale_seconds: float = 1800,
+                 max_entries: int = 512, hot_hits: int = 3, hot_window: float = 600):
+        self.ttl = ttl
+        self.max_lag_seconds = max_lag_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.max_entries = max_entries
+        self.hot_hits = hot_hits
+        self.hot_window = hot_window
+        self._entries: "OrderedDict[str, CachedReport]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+
+    def lookup(self, address: str, latest_block: int, block_seconds: float) -> Tuple[Optional[str], bool]:
+        """(report to serve or None, whether to rebuild it in the background)."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None or now - entry.created_at > self.ttl:
+                self.counters["misses"] += 1
+                return None, False
+            self._entries.move_to_end(address)
+            entry.hits.append(now)
+            while len(entry.hits) > self.hot_hits:
+                entry.hits.popleft()
+            lag = (latest_block - entry.block) * block_seconds
+            if lag <= self.max_lag_seconds:
+                self.counters["hits"] += 1
+                return entry.report, False
+            hot = len(entry.hits) >= self.hot_hits and now - entry.hits[0] <= self.hot_window
+            if hot and lag <= self.max_stale_seconds:
+                self.counters["stale_hits"] += 1
+                return entry.report, self._claim_refresh(address)
+            self.counters["misses"] += 1
+            return None, False
+
+    def _claim_refresh(self, address: str) -> bool:
+        # One background rebuild per address at a time
+        if address in self._refreshing:
+            return False
+        self._refreshing.add(address)
+        self.counters["refreshes"] += 1
+        return True
+
+    def store(self, address: str, block: int, report: str):
+        with self._lock:
+            previous = self._entries.get(address)
+            entry = self._entries[address] = CachedReport(report, block)
+            if previous is not None:
+                entry.hits = previous.hits
+            self._entries.move_to_end(address)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def refresh_done(self, address: str):
+        with self._lock:
+            self._refreshing.discard(address)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "refreshing": len(self._refreshing)}
+
+
+_cache: Optional[WalletReportCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_wallet_report_cache() -> Optional[WalletReportCache]:
+    """
+    WALLET_REPORT_CACHE_TTL (seconds, 0 disables, default 3600),
+    WALLET_REPORT_MAX_LAG_SECONDS (chain time behind, served as fresh, default 60),
+    WALLET_REPORT_STALE_SECONDS (served stale to hot addresses, default 1800),
+    WALLET_REPORT_CACHE_SIZE and WALLET_REPORT_HOT_HITS.
+    """
+    global _cache
+    ttl = float(os.getenv('WALLET_REPORT_CACHE_TTL', '3600'))
+    if ttl <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = WalletReportCache(
+                    ttl=ttl,
+                    max_lag_seconds=float(os.getenv('WALLET_REPORT_MAX_LAG_SECONDS', '60')),
+                    max_stale_seconds=float(os.getenv('WALLET_REPORT_STALE_SECONDS', '1800')),
+                    max_entries=int(os.getenv('WALLET_REPORT_CACHE_SIZE', '512')),
+                    hot_hits=int(os.getenv('WALLET_REPORT_HOT_HITS', '3')),
+                )
+    return _cache
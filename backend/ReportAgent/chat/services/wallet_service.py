@@ -1,26 +1,68 @@
 from .base_service import BaseService
-from typing import Dict, Any, Optional, List
-from collections import defaultdict
-from datetime import datetime
-import json
-import requests
+from .address_screening import get_address_screening
+from .single_flight import single_flight
+from .tracing import traced
+from .transfer_columns import MISSING_TS, TransferColumns
+from .transfer_digest import build_wallet_digest, format_wallet_digest
+from .transfer_record import Transfer, TransferList
+from .transfer_store import get_transfer_store
+from .wallet_batch import get_batch_limiter
+from .wallet_report_cache import get_wallet_report_cache
+from .resilience import deadline, request_deadline_seconds
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+import time
+import asyncio
+import threading
+import contextvars
 
 class WalletService(BaseService):
+    _columns_memo: Optional[Tuple[List[Transfer], str, TransferColumns]] = None
+    _block_memo: Tuple[float, Optional[int]] = (0.0, None)
+
+    _block_seconds: Optional[float] = None
+
+    BLOCK_POLL_SECONDS = 2.0
+    BLOCK_TIME_SAMPLE = 1000
+    DEFAULT_BLOCK_SECONDS = 12.0
+    BASIC_REPORT_ERROR = "An error occurred while generating the report."
+
+    @traced()
     def analyze_wallet(self, address: str) -> str:
         """
         Takes a wallet address, creates a basic report and a deep analysis report (using the LLM),
         then combines them into a final report.
+
+        Complete reports are cached per address and validated against the
+        latest block (wallet_report_cache).
         """
+        cache = get_wallet_report_cache()
+        block = self.latest_block() if cache is not None else None
+        if block is not None:
+            report, refresh = cache.lookup(address.lower(), block, self.block_seconds(block))
+            if refresh:
+                self._refresh_report_in_background(address)
+            if report is not None:
+                return report
+
+        report, complete = self._analyze_wallet(address)
+        if complete and block is not None:
+            cache.store(address.lower(), block, report)
+        return report
+
+    def _analyze_wallet(self, address: str) -> Tuple[str, bool]:
+        """(report, whether it is complete: data fetched and the LLM answered)."""
         try:
             print("Starting wallet analysis...")
             wallet_data = self.get_wallet_analysis(address)
             if not wallet_data:
-                return "Error occurred while fetching wallet data."
+                return "Error occurred while fetching wallet data.", False
                 
             print("1) Generating basic report...")
             basic_report = self.generate_basic_report(wallet_data, address)
             if not basic_report:
-                return "Error occurred while generating the basic report."
+                return "Error occurred while generating the basic report.", False
                 
             print("2) Generating LLM-based deep analysis report...")
             deep_analysis_report = self.analyze_transaction_data(wallet_data, address)
@@ -29,13 +71,145 @@ class WalletService(BaseService):
                 
             # Final output
             combined_report = f"{basic_report}\n\n---\n\n{deep_analysis_report}"
-            return combined_report
+            return combined_report, self._is_complete(wallet_data, basic_report, deep_analysis_report)
             
         except Exception as e:
             import traceback
             traceback.print_exc()
-            return f"An error occurred during wallet analysis. Details: {str(e)}"
+            return f"An error occurred during wallet analysis. Details: {str(e)}", False
         
+    @traced()
+    async def aanalyze_wallet(self, address: str) -> str:
+        """
+        Async variant of analyze_wallet for the ASGI request path.
+        """
+        cache = get_wallet_report_cache()
+        block = await self.alatest_block() if cache is not None else None
+        if block is not None:
+            report, refresh = cache.lookup(address.lower(), block, await self.ablock_seconds(block))
+            if refresh:
+                self._refresh_report_in_background(address)
+            if report is not None:
+                return report
+
+        report, complete = await self._aanalyze_wallet(address)
+        if complete and block is not None:
+            cache.store(address.lower(), block, report)
+        return report
+
+    async def _aanalyze_wallet(self, address: str) -> Tuple[str, bool]:
+        try:
+            print("Starting wallet analysis (async)...")
+            wallet_data = await self.aget_wallet_analysis(address)
+            if not wallet_data:
+                return "Error occurred while fetching wallet data.", False
+            return await self._acompose_report(wallet_data, address)
+
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return f"An error occurred during wallet analysis. Details: {str(e)}", False
+
+    async def _acompose_report(self, wallet_data: Dict[str, Any], address: str) -> Tuple[str, bool]:
+        """Basic report + LLM deep analysis for already fetched wallet data."""
+        basic_report = self.generate_basic_report(wallet_data, address)
+        if not basic_report:
+            return "Error occurred while generating the basic report.", False
+
+        deep_analysis_report = await self.aanalyze_transaction_data(wallet_data, address)
+        if not deep_analysis_report:
+            deep_analysis_report = "An error occurred during deep analysis."
+
+        return (f"{basic_report}\n\n---\n\n{deep_analysis_report}",
+                self._is_complete(wallet_data, basic_report, deep_analysis_report))
+
+    def _is_complete(self, wallet_data: Dict[str, Any], basic_report: str, deep_analysis_report: str) -> bool:
+        """Full transfer history fetched and both report parts built (only those are cached)."""
+        return (not wallet_data.get('truncated')
+                and basic_report != self.BASIC_REPORT_ERROR
+                and deep_analysis_report.startswith("## Deep Analysis Report")
+                and self.NO_LLM_ANALYSIS not in deep_analysis_report)
+
+    def latest_block(self) -> Optional[int]:
+        """Current block number, reused for BLOCK_POLL_SECONDS; None when the node is unreachable."""
+        polled_at, block = self._block_memo
+        if block is not None and time.monotonic() - polled_at < self.BLOCK_POLL_SECONDS:
+            return block
+        try:
+            block = self.web3.eth.block_number
+        except Exception as e:
+            print(f"Could not read the latest block: {str(e)}")
+            return None
+        self._block_memo = (time.monotonic(), block)
+        return block
+
+    def block_seconds(self, latest_block: int) -> float:
+        """
+        Average block time of the connected chain, measured once over the last
+        BLOCK_TIME_SAMPLE blocks (~12 s on Ethereum, ~0.25 s on Arbitrum), so the
+        report cache's staleness limits can be given in seconds.
+        """
+        if WalletService._block_seconds is None:
+            try:
+                earlier = max(latest_block - self.BLOCK_TIME_SAMPLE, 0)
+                elapsed = (self.web3.eth.get_block(latest_block)['timestamp']
+                           - self.web3.eth.get_block(earlier)['timestamp'])
+                WalletService._block_seconds = self._average_block_time(elapsed, latest_block - earlier)
+            except Exception as e:
+                print(f"Could not measure the block time: {str(e)}")
+                return self.DEFAULT_BLOCK_SECONDS
+        return WalletService._block_seconds
+
+    async def ablock_seconds(self, latest_block: int) -> float:
+        if WalletService._block_seconds is None:
+            try:
+                earlier = max(latest_block - self.BLOCK_TIME_SAMPLE, 0)
+                newest, oldest = await asyncio.gather(
+                    self.arpc_call("eth_getBlockByNumber", [hex(latest_block), False]),
+                    self.arpc_call("eth_getBlockByNumber", [hex(earlier), False]),
+                )
+                elapsed = int(newest['timestamp'], 16) - int(oldest['timestamp'], 16)
+                WalletService._block_seconds = self._average_block_time(elapsed, latest_block - earlier)
+            except Exception as e:
+                print(f"Could not measure the block time: {str(e)}")
+                return self.DEFAULT_BLOCK_SECONDS
+        return WalletService._block_seconds
+
+    def _average_block_time(self, elapsed: float, blocks: int) -> float:
+        if blocks <= 0 or elapsed <= 0:
+            return self.DEFAULT_BLOCK_SECONDS
+        return elapsed / blocks
+
+    async def alatest_block(self) -> Optional[int]:
+        polled_at, block = self._block_memo
+        if block is not None and time.monotonic() - polled_at < self.BLOCK_POLL_SECONDS:
+            return block
+        try:
+            block = int(await self.arpc_call("eth_blockNumber", []), 16)
+        except Exception as e:
+            print(f"Could not read the latest block: {str(e)}")
+            return None
+        self._block_memo = (time.monotonic(), block)
+        return block
+
+    def _refresh_report_in_background(self, address: str):
+        """Rebuilds a hot address's stale report off the request path."""
+        cache = get_wallet_report_cache()
+
+        def refresh():
+            try:
+                with deadline(request_deadline_seconds()):
+                    block = self.latest_block()
+                    report, complete = self._analyze_wallet(address)
+                if complete and block is not None:
+                    cache.store(address.lower(), block, report)
+            finally:
+                cache.refresh_done(address.lower())
+
+        threading.Thread(target=refresh, name="wallet-report-refresh", daemon=True).start()
+
+    @traced()
+    @single_flight(lambda self, address, max_txs=10000: ("wallet", address.lower(), max_txs))
     def get_wallet_analysis(self, address: str, max_txs: int = 10000) -> Dict[str, Any]:
         """
         (For wallet analysis) Retrieves basic info (balance, tx count) and recent transactions
@@ -52,16 +226,6 @@ class WalletService(BaseService):
             }
             
             checksum_address = self.web3.to_checksum_address(address)
-            
-            # Basic info
-            balance_wei = self.web3.eth.get_balance(checksum_address)
-            balance_eth = float(self.web3.from_wei(balance_wei, 'ether'))
-            tx_count = self.web3.eth.get_transaction_count(checksum_address)
-            
-            wallet_data['basic_info'] = {
-                'balance': balance_eth,
-                'transaction_count': tx_count
-            }
 
             # Alchemy Asset Transfers endpoint
             endpoint = self.rpc_url
@@ -69,122 +233,201 @@ class WalletService(BaseService):
                 "Accept": "application/json",
                 "Content-Type": "application/json"
             }
-            
-            # (1) Check total number of transactions (이건 실제 on-chain 상 트랜잭션 추정치)
-            #     단순히 최대 1000건만 가져와서 전체 tx 수 파악 가능 (API 제한).
-            print("Checking total transaction count...")
-            params_count = {
-                "fromBlock": "0x0",
-                "toBlock": "latest",
-                "fromAddress": address,
-                "category": ["external", "internal", "erc20", "erc721", "erc1155"],
-                "withMetadata": True,
-                "maxCount": "0x3e8"  # up to 1000
-            }
-            total_txs_data = self.fetch_all_transfers(params_count, endpoint, headers, max_txs=1000)
-            # 실제 건수만 측정
-            total_count = len(total_txs_data) if total_txs_data is not None else 0
-            print(f"Found total {total_count} transactions (in first 1000 or fewer).")
-
-            # (2) 실제로 가져올 fromBlock 범위 결정
-            #     - total_count > max_txs 이면 "최근 7일" 혹은 "최근 N 블록"만 가져오도록 제한
-            if total_count > max_txs:
-                print(f"Transaction count exceeds {max_txs}, fetching last 7 days only...")
-                current_block = self.web3.eth.block_number
-                blocks_in_7_days = 7 * 24 * 60 * 60 // 12
-                from_block = hex(current_block - blocks_in_7_days)
-            else:
-                print("Fetching all transactions from block 0...")
-                from_block = "0x0"
-            
-            # (3) fromAddress, toAddress 각각 fetch
-            print(f"Fetching transactions from block {from_block} to the latest, up to max {max_txs}...")
-            
-            params_from = {
-                "fromBlock": from_block,
-                "toBlock": "latest",
-                "fromAddress": address,
-                "category": ["external", "internal", "erc20", "erc721", "erc1155"],
-                "withMetadata": True,
-                "maxCount": "0x3e8",  # per page
-                "excludeZeroValue": False
-            }
-            txs_from = self.fetch_all_transfers(params_from, endpoint, headers, max_txs=max_txs) or []
-            print(f"Found {len(txs_from)} 'from' transactions (limited to {max_txs} max).")
-            
-            params_to = {
-                "fromBlock": from_block,
-                "toBlock": "latest",
-                "toAddress": address,
-                "category": ["external", "internal", "erc20", "erc721", "erc1155"],
-                "withMetadata": True,
-                "maxCount": "0x3e8",
-                "excludeZeroValue": False
-            }
-            txs_to = self.fetch_all_transfers(params_to, endpoint, headers, max_txs=max_txs) or []
-            print(f"Found {len(txs_to)} 'to' transactions (limited to {max_txs} max).")
-            
+
+            # Basic info calls and the fromAddress / toAddress paginations run
+            # side by side; each thread keeps the caller's context (trace span,
+            # request deadline).
+            with ThreadPoolExecutor(max_workers=5, thread_name_prefix="wallet-fetch") as pool:
+                def submit(fn, *args, **kwargs):
+                    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+                balance_f = submit(self.web3.eth.get_balance, checksum_address)
+                nonce_f = submit(self.web3.eth.get_transaction_count, checksum_address)
+                block_f = submit(lambda: self.web3.eth.block_number)
+
+                # The old separate "count" pass (first 1000 'from' transfers, thrown
+                # away) is now the first pages of the real 'from' pass: one extra
+                # transfer tells whether there are more than max_txs.
+                print(f"Fetching transactions from block 0x0 to the latest, up to max {max_txs}...")
+                from_f = submit(self._fetch_history, address, "fromAddress", endpoint, headers, max_txs + 1)
+                to_f = submit(self._fetch_history, address, "toAddress", endpoint, headers, max_txs)
+
+                wallet_data['basic_info'] = {
+                    'balance': float(self.web3.from_wei(balance_f.result(), 'ether')),
+                    'transaction_count': nonce_f.result()
+                }
+                txs_from = from_f.result()
+                txs_to = to_f.result()
+
+                # Very active wallet (more than max_txs within the first 1000): only
+                # the recent window, as before. Only possible with max_txs < 1000.
+                if self._exceeds_count_window(txs_from, max_txs):
+                    print(f"Transaction count exceeds {max_txs}, fetching last 7 days only...")
+                    from_block = self._recent_window_start(block_f.result())
+                    from_f = submit(self.fetch_all_transfers, self._transfer_params(address, from_block, "fromAddress"),
+                                    endpoint, headers, max_txs=max_txs)
+                    to_f = submit(self.fetch_all_transfers, self._transfer_params(address, from_block, "toAddress"),
+                                  endpoint, headers, max_txs=max_txs)
+                    txs_from = from_f.result()
+                    txs_to = to_f.result()
+
+            wallet_data['truncated'] = self._truncated(txs_from, txs_to)
+            txs_from = txs_from[:max_txs]
+            print(f"Found {len(txs_from)} 'from' / {len(txs_to)} 'to' transactions (limited to {max_txs} max).")
+
             # (4) Merge & sort (timestamp desc), 그리고 최종 max_txs까지 잘라냄
-            combined_txs = txs_from + txs_to
-            combined_txs = sorted(
-                combined_txs,
-                key=lambda x: x.get('metadata', {}).get('blockTimestamp', ''),
-                reverse=True
-            )
-            
-            # 최종적으로 max_txs 개까지만 제한
-            combined_txs = combined_txs[:max_txs]
-            
-            wallet_data['transactions'] = combined_txs
+            wallet_data['transactions'] = self._merge_transfers(txs_from, txs_to, max_txs)
             return wallet_data
             
         except Exception as e:
             print(f"Error in wallet analysis: {str(e)}")
             return {}
 
-        
-    def process_transaction_details(self, tx: Dict[str, Any], address: str) -> Dict[str, Any]:
+    @traced()
+    @single_flight(lambda self, address, max_txs=10000: ("wallet", address.lower(), max_txs))
+    async def aget_wallet_analysis(self, address: str, max_txs: int = 10000) -> Dict[str, Any]:
         """
-        Processes the details of a single transaction and classifies it.
+        Async variant of get_wallet_analysis. Basic info goes through raw JSON-RPC
+        and the transfer pages through the async Alchemy client.
+        """
+        try:
+            checksum_address = self.web3.to_checksum_address(address)
+
+            endpoint = self.rpc_url
+            headers = {
+                "Accept": "application/json",
+                "Content-Type": "application/json"
+            }
+
+            # Basic info and both paginations concurrently (see get_wallet_analysis)
+            balance_hex, nonce_hex, block_hex, txs_from, txs_to = await asyncio.gather(
+                self.arpc_call("eth_getBalance", [checksum_address, "latest"]),
+                self.arpc_call("eth_getTransactionCount", [checksum_address, "latest"]),
+                self.arpc_call("eth_blockNumber", []),
+                self._afetch_history(address, "fromAddress", endpoint, headers, max_txs + 1),
+                self._afetch_history(address, "toAddress", endpoint, headers, max_txs),
+            )
+            wallet_data = {
+                'basic_info': {
+                    'balance': float(self.web3.from_wei(int(balance_hex, 16), 'ether')),
+                    'transaction_count': int(nonce_hex, 16)
+                },
+                'transactions': [],
+                'tokens': []
+            }
+
+            if self._exceeds_count_window(txs_from, max_txs):
+                from_block = self._recent_window_start(int(block_hex, 16))
+                txs_from, txs_to = await asyncio.gather(
+                    self.afetch_all_transfers(self._transfer_params(address, from_block, "fromAddress"),
+                                              endpoint, headers, max_txs=max_txs),
+                    self.afetch_all_transfers(self._transfer_params(address, from_block, "toAddress"),
+                                              endpoint, headers, max_txs=max_txs),
+                )
+            wallet_data['truncated'] = self._truncated(txs_from, txs_to)
+            txs_from = txs_from[:max_txs]
+            print(f"Found {len(txs_from)} 'from' / {len(txs_to)} 'to' transactions (async).")
+
+            wallet_data['transactions'] = self._merge_transfers(txs_from, txs_to, max_txs)
+            return wallet_data
+
+        except Exception as e:
+            print(f"Error in async wallet analysis: {str(e)}")
+            return {}
+
+    def _fetch_history(self, address: str, direction: str, endpoint: str,
+                       headers: Dict[str, str], limit: int) -> TransferList:
         """
-        processed_tx = {
-            'timestamp': tx.get('metadata', {}).get('blockTimestamp', 'N/A'),
-            'block_number': tx.get('blockNum', 'N/A'),
-            'category': tx.get('category', 'unknown'),
-            'from': tx.get('from', 'N/A'),
-            'to': tx.get('to', 'N/A'),
-            'hash': tx.get('hash', 'N/A')
+        The first `limit` transfers of the wallet in one direction from block 0x0,
+        as fetch_all_transfers returns them. With the transfer store only the
+        blocks after its high-water mark are fetched.
+        """
+        store = get_transfer_store()
+        if store is None:
+            return self.fetch_all_transfers(self._transfer_params(address, "0x0", direction),
+                                            endpoint, headers, max_txs=limit)
+        key = address.lower()
+        start = store.fetch_start(key, direction, limit)
+        history = TransferList()
+        if start is not None:
+            fetched = self.fetch_all_transfers(self._transfer_params(address, hex(start), direction),
+                                               endpoint, headers, max_txs=limit)
+            store.save(key, direction, start, fetched)
+            history.truncated = fetched.truncated
+        history.extend(store.load(key, direction, limit))
+        return history
+
+    async def _afetch_history(self, address: str, direction: str, endpoint: str,
+                              headers: Dict[str, str], limit: int) -> TransferList:
+        store = get_transfer_store()
+        if store is None:
+            return await self.afetch_all_transfers(self._transfer_params(address, "0x0", direction),
+                                                   endpoint, headers, max_txs=limit)
+        # SQLite work (a save can write thousands of rows) runs off the event loop
+        key = address.lower()
+        start = await sync_to_async(store.fetch_start, thread_sensitive=False)(key, direction, limit)
+        history = TransferList()
+        if start is not None:
+            fetched = await self.afetch_all_transfers(self._transfer_params(address, hex(start), direction),
+                                                      endpoint, headers, max_txs=limit)
+            await sync_to_async(store.save, thread_sensitive=False)(key, direction, start, fetched)
+            history.truncated = fetched.truncated
+        history.extend(await sync_to_async(store.load, thread_sensitive=False)(key, direction, limit))
+        return history
+
+    @staticmethod
+    def _truncated(*histories: List[Transfer]) -> bool:
+        """Whether any of the fetched histories was cut short (see TransferList)."""
+        return any(getattr(history, "truncated", False) for history in histories)
+
+    @staticmethod
+    def _recent_window_start(current_block: int, days: int = 7) -> str:
+        """First block (hex) of the recent window used for very active wallets."""
+        blocks_in_window = days * 24 * 60 * 60 // 12
+        return hex(current_block - blocks_in_window)
+
+    @staticmethod
+    def _exceeds_count_window(txs_from: List[Transfer], max_txs: int) -> bool:
+        """
+        Same rule as the old count pass: more than max_txs among the wallet's
+        first 1000 outgoing transfers. txs_from holds up to max_txs + 1 of them.
+        """
+        return max_txs < 1000 and len(txs_from) > max_txs
+
+    @staticmethod
+    def _transfer_params(address: str, from_block: str, direction: str) -> Dict[str, Any]:
+        """
+        direction: "fromAddress" or "toAddress"
+        """
+        return {
+            "fromBlock": from_block,
+            "toBlock": "latest",
+            direction: address,
+            "category": ["external", "internal", "erc20", "erc721", "erc1155"],
+            "withMetadata": True,
+            "maxCount": "0x3e8",  # per page
+            "excludeZeroValue": False
         }
-        
-        def safe_float_conversion(value) -> float:
-            """Safely convert to float."""
-            if value is None:
-                return 0.0
-            try:
-                if isinstance(value, str):
-                    value = ''.join(c for c in value if c.isdigit() or c == '.' or c == '-')
-                return float(value)
-            except (ValueError, TypeError):
-                print(f"Warning: Could not convert value '{value}' to float")
-                return 0.0
-        
-        # Simplify type identification based on category
-        if tx.get('category') == 'erc20':
-            processed_tx['type'] = 'ERC-20'
-            processed_tx['token_symbol'] = tx.get('asset', 'Unknown')
-            raw_value = tx.get('value')
-            processed_tx['token_amount'] = safe_float_conversion(raw_value)
-            processed_tx['token_decimals'] = tx.get('decimals', 18)
-            processed_tx['direction'] = 'Outgoing' if tx['from'].lower() == address.lower() else 'Incoming'
-            processed_tx['eth_value'] = 0.0
-        else:
-            processed_tx['type'] = 'ETH'
-            raw_value = tx.get('value')
-            processed_tx['eth_value'] = safe_float_conversion(raw_value)
-            processed_tx['direction'] = 'Outgoing' if tx['from'].lower() == address.lower() else 'Incoming'
-        
-        return processed_tx
-        
+
+    @staticmethod
+    def _merge_transfers(txs_from: List[Transfer],
+                         txs_to: List[Transfer],
+                         max_txs: int) -> List[Transfer]:
+        combined_txs = sorted(txs_from + txs_to, key=lambda x: x.timestamp, reverse=True)
+        return combined_txs[:max_txs]
+
+    def transfer_columns(self, transactions: List[Transfer], address: str) -> TransferColumns:
+        """
+        Columnar view of `transactions`, built once per transfer list: the basic
+        report and the suspicious-activity check of one analysis share it.
+        """
+        cached = self._columns_memo
+        if cached is not None and cached[0] is transactions and cached[1] == address:
+            return cached[2]
+        columns = TransferColumns(transactions, address)
+        self._columns_memo = (transactions, address, columns)
+        return columns
+
     def generate_basic_report(self, wallet_data: Dict[str, Any], address: str) -> str:
         """
         Generates a simple Markdown report summarizing the wallet data.
@@ -196,53 +439,44 @@ class WalletService(BaseService):
             basic_info = wallet_data.get('basic_info', {})
             transactions = wallet_data.get('transactions', [])
             
-            # Process transactions
-            processed_txs = []
-            for tx in transactions:
-                try:
-                    processed_tx = self.process_transaction_details(tx, address)
-                    processed_txs.append(processed_tx)
-                except Exception as e:
-                    print(f"Error processing transaction: {e}")
-                    continue
-            
-            # Separate ERC-20 and ETH transactions
-            erc20_txs = [tx for tx in processed_txs if tx['type'] == 'ERC-20']
-            eth_txs = [tx for tx in processed_txs if tx['type'] == 'ETH']
-            
+            columns = self.transfer_columns(transactions, address)
+            erc20_count = int(columns.erc20.sum())
+            eth_count = columns.n - erc20_count
+
+            def counterparty(i: int) -> str:
+                tx = transactions[i]
+                return (tx.receiver if columns.outgoing[i] else tx.sender) or 'N/A'
+
+            def timestamp(i: int) -> str:
+                return transactions[i].timestamp or 'N/A'
+
+            def direction(i: int) -> str:
+                return 'Outgoing' if columns.outgoing[i] else 'Incoming'
+
             report = [
                 f"# Ethereum Wallet Analysis Report",
                 f"**Target Address:** `{address}`\n",
                 "## 1. Basic Information",
                 f"- **ETH Balance**: {basic_info.get('balance', 0.0):.4f} ETH",
                 f"- **Total Transactions**: {len(transactions)} (recent 7 days or overall)",
-                f"  - ETH Transactions: {len(eth_txs)}",
-                f"  - ERC-20 Token Transactions: {len(erc20_txs)}\n"
+                f"  - ETH Transactions: {eth_count}",
+                f"  - ERC-20 Token Transactions: {erc20_count}\n"
             ]
             
             # (2) ERC-20 token analysis
-            if erc20_txs:
+            if erc20_count:
                 report.append("## 2. ERC-20 Token Transactions Analysis")
-                token_stats = defaultdict(lambda: {'Incoming': 0.0, 'Outgoing': 0.0, 'tx_count': 0})
-                for tx in erc20_txs:
-                    token = tx['token_symbol']
-                    amount = tx['token_amount']
-                    direction = tx['direction']
-                    
-                    token_stats[token][direction] += amount
-                    token_stats[token]['tx_count'] += 1
-                
                 report.extend([
                     "### Statistics by Token",
                     "| Token | Transaction Count | Incoming | Outgoing | Net Change |",
                     "|-------|-------------------|----------|----------|-----------|"
                 ])
                 
-                for token, stats in token_stats.items():
-                    net_change = stats['Incoming'] - stats['Outgoing']
+                for token, tx_count, incoming, outgoing in columns.token_stats():
+                    net_change = incoming - outgoing
                     report.append(
-                        f"| {token} | {stats['tx_count']} | "
-                        f"{stats['Incoming']:.4f} | {stats['Outgoing']:.4f} | {net_change:+.4f} |"
+                        f"| {token} | {tx_count} | "
+                        f"{incoming:.4f} | {outgoing:.4f} | {net_change:+.4f} |"
                     )
                 
                 report.extend([
@@ -251,40 +485,36 @@ class WalletService(BaseService):
                     "|------|-------|----------|--------|-------------|---------|"
                 ])
                 
-                for tx in sorted(erc20_txs, key=lambda x: x['timestamp'], reverse=True)[:10]:
+                for i in columns.latest(columns.erc20, 10):
                     report.append(
-                        f"| {tx['timestamp']} | {tx['token_symbol']} | {tx['direction']} | "
-                        f"{tx['token_amount']:.4f} | `{tx['to'] if tx['direction'] == 'Outgoing' else tx['from']}` | "
-                        f"`{tx['hash']}` |"
+                        f"| {timestamp(i)} | {columns.tokens[columns.token[i]]} | {direction(i)} | "
+                        f"{columns.value[i]:.4f} | `{counterparty(i)}` | "
+                        f"`{transactions[i].hash or 'N/A'}` |"
                     )
             else:
                 report.append("\n## 2. ERC-20 Token Transactions Analysis\nNo recent ERC-20 transactions.")
             
             # (3) ETH transaction analysis
-            if eth_txs:
+            if eth_count:
                 report.append("\n## 3. ETH Transaction Analysis")
-                eth_stats = {'Incoming': 0.0, 'Outgoing': 0.0, 'tx_count': len(eth_txs)}
-                
-                for tx in eth_txs:
-                    eth_stats[tx['direction']] += tx['eth_value']
-                
-                net_change = eth_stats['Incoming'] - eth_stats['Outgoing']
+                incoming, outgoing = columns.eth_totals()
+                net_change = incoming - outgoing
                 
                 report.extend([
                     "### ETH Transaction Statistics",
-                    f"- **Total Transaction Count**: {eth_stats['tx_count']}",
-                    f"- **Total Incoming**: {eth_stats['Incoming']:.4f} ETH",
-                    f"- **Total Outgoing**: {eth_stats['Outgoing']:.4f} ETH",
+                    f"- **Total Transaction Count**: {eth_count}",
+                    f"- **Total Incoming**: {incoming:.4f} ETH",
+                    f"- **Total Outgoing**: {outgoing:.4f} ETH",
                     f"- **Net Change**: {net_change:+.4f} ETH\n",
                     "### Recent ETH Transactions (up to 10)",
                     "| Time | Direction | Amount (ETH) | Counterparty | Tx Hash |",
                     "|------|-----------|--------------|-------------|---------|"
                 ])
                 
-                for tx in sorted(eth_txs, key=lambda x: x['timestamp'], reverse=True)[:10]:
+                for i in columns.latest(~columns.erc20, 10):
                     report.append(
-                        f"| {tx['timestamp']} | {tx['direction']} | {tx['eth_value']:.4f} | "
-                        f"`{tx['to'] if tx['direction'] == 'Outgoing' else tx['from']}` | `{tx['hash']}` |"
+                        f"| {timestamp(i)} | {direction(i)} | {columns.value[i]:.4f} | "
+                        f"`{counterparty(i)}` | `{transactions[i].hash or 'N/A'}` |"
                     )
             else:
                 report.append("\n## 3. ETH Transaction Analysis\nNo recent ETH transactions.")
@@ -293,59 +523,29 @@ class WalletService(BaseService):
             
         except Exception as e:
             print(f"Error generating basic report: {str(e)}")
-            return "An error occurred while generating the report."
+            return self.BASIC_REPORT_ERROR
         
-    def analyze_suspicious_activity(self, transactions: List[Dict[str, Any]], address: str) -> Dict[str, Any]:
+    def analyze_suspicious_activity(self, transactions: List[Transfer], address: str) -> Dict[str, Any]:
         """
         Check transaction data for suspicious activity (phishing, blacklist associations, etc.).
+        Every counterparty is screened against the flagged-address feeds (address_screening).
         """
-        blacklist_addresses = {
-            "0xbaa44c7e27e125118d10c43ae6c9f0f5e094e144",
-            "0x46705dfff24256421a05d056c29e81bdc09723b8",
-        }
-
         if not transactions:
             return {
                 "total_txs": 0,
                 "blacklisted_count": 0,
                 "suspicious_spam_count": 0,
                 "suspicious": False,
+                "flagged_addresses": {},
                 "details": "No transaction data available."
             }
 
         total_txs = len(transactions)
-        
-        blacklisted_txs = 0
-        for tx in transactions:
-            from_addr = tx.get('from', '').lower()
-            to_addr = tx.get('to', '').lower()
-            if from_addr in blacklist_addresses or to_addr in blacklist_addresses:
-                blacklisted_txs += 1
-
-        suspicious_spam_count = 0
-        sorted_txs = sorted(
-            transactions,
-            key=lambda x: x.get('metadata', {}).get('blockTimestamp', ''),
-            reverse=True
-        )
-
-        for i in range(len(sorted_txs) - 1):
-            current_tx = sorted_txs[i]
-            next_tx = sorted_txs[i + 1]
-            
-            current_time = current_tx.get('metadata', {}).get('blockTimestamp', '')
-            next_time = next_tx.get('metadata', {}).get('blockTimestamp', '')
-            
-            if current_time and next_time:
-                try:
-                    current_dt = datetime.strptime(current_time, "%Y-%m-%dT%H:%M:%S.%fZ")
-                    next_dt = datetime.strptime(next_time, "%Y-%m-%dT%H:%M:%S.%fZ")
-                    time_diff = (current_dt - next_dt).total_seconds()
-                    
-                    if 0 <= time_diff <= 60:  # within 1 minute
-                        suspicious_spam_count += 1
-                except ValueError:
-                    continue
+        columns = self.transfer_columns(transactions, address)
+        flagged = get_address_screening().screen(columns.addresses)
+        blacklisted_txs = columns.touching(flagged)
+        # Transfers less than a minute after the previous one
+        suspicious_spam_count = columns.burst_count(60_000)
 
         suspicious = (blacklisted_txs > 0) or (suspicious_spam_count >= 5)
 
@@ -354,16 +554,38 @@ class WalletService(BaseService):
             "blacklisted_count": blacklisted_txs,
             "suspicious_spam_count": suspicious_spam_count,
             "suspicious": suspicious,
+            "flagged_addresses": flagged,
             "details": "Suspicious activity detected." if suspicious else "No special notes."
         }
 
+    @traced()
     def analyze_transaction_data(self, wallet_data: Dict[str, Any], address: str) -> str:
         """
         Calculates statistics/metrics from transaction data and requests 'deep analysis' from the LLM.
         """
         if not wallet_data or "transactions" not in wallet_data:
             return "No transaction data to analyze."
-            
+
+        stats_summary, prompt = self._build_transaction_prompt(wallet_data, address)
+        llm_analysis = self.generate_llm_response(prompt)  # generate_response를 generate_llm_response로 변경
+        return self._render_deep_analysis(address, stats_summary, llm_analysis)
+
+    @traced()
+    async def aanalyze_transaction_data(self, wallet_data: Dict[str, Any], address: str) -> str:
+        """
+        Async variant of analyze_transaction_data.
+        """
+        if not wallet_data or "transactions" not in wallet_data:
+            return "No transaction data to analyze."
+
+        stats_summary, prompt = self._build_transaction_prompt(wallet_data, address)
+        llm_analysis = await self.agenerate_llm_response(prompt)
+        return self._render_deep_analysis(address, stats_summary, llm_analysis)
+
+    def _build_transaction_prompt(self, wallet_data: Dict[str, Any], address: str) -> Tuple[str, str]:
+        """
+        Returns (stats_summary, prompt) for the LLM deep analysis.
+        """
         tx_list = wallet_data["transactions"]
         suspicious_info = self.analyze_suspicious_activity(tx_list, address)
         
@@ -378,9 +600,14 @@ class WalletService(BaseService):
             f"Number of consecutive transactions within 1 minute: {spam_cnt}\n"
             f"Suspicious Flag: {suspicious_flag}\n"
         )
+        flagged = suspicious_info["flagged_addresses"]
+        if flagged:
+            stats_summary += "Flagged Counterparties: " + ", ".join(
+                f"{addr} ({'/'.join(feeds)})" for addr, feeds in sorted(flagged.items())[:10]
+            ) + "\n"
         
-        # Preview the latest 5 transactions
-        tx_preview = json.dumps(tx_list[:5], indent=2)
+        # Fixed-size digest instead of raw transfers, so the prompt does not grow with the wallet
+        digest = format_wallet_digest(build_wallet_digest(tx_list, address))
         
         prompt = f"""
 You are a professional blockchain analyst.
@@ -389,8 +616,8 @@ Please analyze the Ethereum wallet at address {address}.
 Below is a summary of transaction statistics:
 {stats_summary}
 
-And here is a sample of the most recent 5 transactions:
-{tx_preview}
+Activity digest:
+{digest}
 
 Please examine the wallet's activity patterns, any suspicious transactions, security vulnerabilities (phishing, blacklist),
 and any special observations. Provide warnings or cautions if necessary.
@@ -400,17 +627,155 @@ Notes:
 2. Try to explain specialized terminology simply.
 3. The analysis should be objective and fact-based.
 """
-        llm_analysis = self.generate_llm_response(prompt)  # generate_response를 generate_llm_response로 변경
-        if not llm_analysis:
-            llm_analysis = "(No LLM response received or an error occurred.)"
-            
-        final_report = (
+        return stats_summary, prompt
+
+    NO_LLM_ANALYSIS = "(No LLM response received or an error occurred.)"
+
+    @staticmethod
+    def _render_deep_analysis_header(address: str, stats_summary: str) -> str:
+        return (
             "## Deep Analysis Report\n\n"
             f"**Target Address**: `{address}`\n\n"
             "### Preliminary Statistics Summary\n"
             f"```\n{stats_summary}\n```\n\n"
             "### AI Analysis Result\n"
-            f"{llm_analysis}\n"
         )
-        
-        return final_report
+
+    def _render_deep_analysis(self, address: str, stats_summary: str, llm_analysis: Optional[str]) -> str:
+        if not llm_analysis:
+            llm_analysis = self.NO_LLM_ANALYSIS
+            
+        return f"{self._render_deep_analysis_header(address, stats_summary)}{llm_analysis}\n"
+
+    async def astream_wallet_analysis(self, address: str) -> AsyncIterator[str]:
+        """
+        Streaming variant of aanalyze_wallet: the basic report is sent as soon as
+        the transfers are in, then the LLM deep analysis token by token.
+        """
+        cache = get_wallet_report_cache()
+        block = await self.alatest_block() if cache is not None else None
+        if block is not None:
+            report, refresh = cache.lookup(address.lower(), block, await self.ablock_seconds(block))
+            if refresh:
+                self._refresh_report_in_background(address)
+            if report is not None:
+                yield report
+                return
+
+        wallet_data = await self.aget_wallet_analysis(address)
+        if not wallet_data:
+            yield "Error occurred while fetching wallet data."
+            return
+
+        basic_report = self.generate_basic_report(wallet_data, address)
+        parts = [f"{basic_report}\n\n---\n\n"]
+        yield parts[-1]
+
+        stats_summary, prompt = self._build_transaction_prompt(wallet_data, address)
+        parts.append(self._render_deep_analysis_header(address, stats_summary))
+        yield parts[-1]
+
+        received = False
+        async for chunk in self.astream_llm_response(prompt):
+            received = True
+            parts.append(chunk)
+            yield chunk
+        if not received:
+            yield self.NO_LLM_ANALYSIS
+        yield "\n"
+        if (received and block is not None and not wallet_data.get('truncated')
+                and basic_report != self.BASIC_REPORT_ERROR):
+            parts.append("\n")
+            cache.store(address.lower(), block, "".join(parts))
+
+    async def aanalyze_wallets(self, addresses: List[str], max_txs: int = 1000,
+                               include_report: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Batch analysis: yields one wallet_summary per address as each finishes.
+
+        At most batch_concurrency() wallets are analyzed at once (fetch and,
+        with include_report, the LLM report), shared with every other batch in
+        the process (wallet_batch.get_batch_limiter), and all of them go
+        through the pooled async client; raising the cap is what buys
+        throughput, not sending more batches. With include_report the full
+        Markdown report is added, served from and stored in the wallet report
+        cache like aanalyze_wallet's.
+        """
+        limiter = get_batch_limiter()
+
+        async def analyze(address: str) -> Dict[str, Any]:
+            async with limiter:
+                try:
+                    wallet_data = await self.aget_wallet_analysis(address, max_txs=max_txs)
+                except Exception as e:
+                    wallet_data = {}
+                    print(f"Error in batch wallet analysis for {address}: {str(e)}")
+                if not wallet_data:
+                    return {"address": address, "status": "error", "error": "Could not fetch wallet data."}
+                result = self.wallet_summary(wallet_data, address)
+                if include_report:
+                    result["report"] = await self._areport_for(wallet_data, address)
+                return result
+
+        tasks = [asyncio.ensure_future(analyze(address)) for address in addresses]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away mid-stream: drop the wallets not started yet
+            for task in tasks:
+                task.cancel()
+
+    async def _areport_for(self, wallet_data: Dict[str, Any], address: str) -> str:
+        """aanalyze_wallet's cache handling for already fetched wallet data."""
+        cache = get_wallet_report_cache()
+        block = await self.alatest_block() if cache is not None else None
+        if block is not None:
+            report, refresh = cache.lookup(address.lower(), block, await self.ablock_seconds(block))
+            if refresh:
+                self._refresh_report_in_background(address)
+            if report is not None:
+                return report
+        report, complete = await self._acompose_report(wallet_data, address)
+        if complete and block is not None:
+            cache.store(address.lower(), block, report)
+        return report
+
+    async def abatch_analyze_wallets(self, addresses: List[str], max_txs: int = 1000,
+                                     include_report: bool = False) -> List[Dict[str, Any]]:
+        """aanalyze_wallets collected into a list in input order."""
+        results = {}
+        async for result in self.aanalyze_wallets(addresses, max_txs=max_txs, include_report=include_report):
+            results[result["address"]] = result
+        return [results[address] for address in addresses]
+
+    def wallet_summary(self, wallet_data: Dict[str, Any], address: str, top_tokens: int = 10) -> Dict[str, Any]:
+        """Structured (JSON-ready) counterpart of generate_basic_report for batch results."""
+        transactions = wallet_data.get('transactions', [])
+        basic_info = wallet_data.get('basic_info', {})
+        columns = self.transfer_columns(transactions, address)
+        eth_in, eth_out = columns.eth_totals()
+        tokens = sorted(columns.token_stats(), key=lambda t: t[1], reverse=True)[:top_tokens]
+        suspicious = self.analyze_suspicious_activity(transactions, address)
+        known_ts = columns.ts[columns.ts != MISSING_TS]
+        return {
+            "address": address,
+            "status": "ok",
+            "balance": basic_info.get('balance', 0),
+            "transaction_count": basic_info.get('transaction_count', 0),
+            "transfers": columns.n,
+            "truncated": bool(wallet_data.get('truncated')),
+            "erc20_transfers": int(columns.erc20.sum()),
+            "eth_in": eth_in,
+            "eth_out": eth_out,
+            "first_seen_ms": int(known_ts.min()) if len(known_ts) else None,
+            "last_seen_ms": int(known_ts.max()) if len(known_ts) else None,
+            "top_tokens": [
+                {"symbol": symbol, "count": count, "incoming": incoming, "outgoing": outgoing}
+                for symbol, count, incoming, outgoing in tokens
+            ],
+            "suspicious": suspicious["suspicious"],
+            "blacklisted_count": suspicious["blacklisted_count"],
+            "suspicious_spam_count": suspicious["suspicious_spam_count"],
+            "flagged_addresses": suspicious["flagged_addresses"],
+        }
@@ -1,3 +1,323 @@
-from django.test import TestCase
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.test import SimpleTestCase
+
+from .services.http_client import get_http_session
+from .services.llm_dispatcher import LLMDispatcher
+from .services.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, deadline
+from .services.semantic_cache import SemanticCache
+from .services.single_flight import SingleFlight
+from .services.transfer_record import Transfer
+from .services.transfer_store import TransferStore
+from .services.wallet_batch import split_addresses
+from .services.wallet_report_cache import WalletReportCache
+from .services.wallet_service import WalletService
+
+ADDRESS = "0x" + "1" * 40
+
+
+def make_transfer(block: int, tag: str = "") -> Transfer:
+    return Transfer(f"0x{block:x}{tag}", None, block, "2024-01-01T00:00:00Z", "external",
+                    ADDRESS, "0x" + "2" * 40, "ETH", "", None, 1.0, 1.0)
+
+
+class TransferStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TransferStore(os.path.join(self.tmp.name, "store.sqlite3"), reorg_depth=2)
+
+    def tearDown(self):
+        self.store._db.close()
+        self.tmp.cleanup()
+
+    def hashes(self, limit: int = 100):
+        return [tx.hash for tx in self.store.load(ADDRESS, "fromAddress", limit)]
+
+    def test_unknown_address_fetches_from_genesis(self):
+        self.assertEqual(self.store.fetch_start(ADDRESS, "fromAddress", 10), 0)
+        self.assertEqual(self.store.load(ADDRESS, "fromAddress", 10), [])
+
+    def test_truncated_fetch_resumes_below_the_mark(self):
+        self.store.save(ADDRESS, "fromAddress", 0, [make_transfer(b) for b in (10, 11, 12)])
+        # Fewer than the limit stored: continue from last_block - reorg_depth
+        self.assertEqual(self.store.fetch_start(ADDRESS, "fromAddress", 10), 10)
+        self.assertEqual(self.hashes(), ["0xa", "0xb", "0xc"])
+
+    def test_overlapping_fetch_replaces_the_reorg_window(self):
+        self.store.save(ADDRESS, "fromAddress", 0, [make_transfer(b) for b in (5, 10, 11, 12)])
+        start = self.store.fetch_start(ADDRESS, "fromAddress", 10)
+        # Block 11 was reorged away, 12 changed, 13 is new
+        self.store.save(ADDRESS, "fromAddress", start, [make_transfer(10), make_transfer(12, "r"), make_transfer(13)])
+        self.assertEqual(self.hashes(), ["0x5", "0xa", "0xcr", "0xd"])
+        self.assertEqual(self.store.fetch_start(ADDRESS, "fromAddress", 10), 11)
+
+    def test_block_cut_in_the_middle_is_completed(self):
+        self.store.save(ADDRESS, "fromAddress", 0, [make_transfer(10, "x")])
+        start = self.store.fetch_start(ADDRESS, "fromAddress", 10)
+        self.store.save(ADDRESS, "fromAddress", start, [make_transfer(10, "x"), make_transfer(10, "y")])
+        self.assertEqual(self.hashes(), ["0xax", "0xay"])
+
+    def test_limit_reached_skips_the_fetch(self):
+        self.store.save(ADDRESS, "fromAddress", 0, [make_transfer(b) for b in range(1, 6)])
+        self.assertIsNone(self.store.fetch_start(ADDRESS, "fromAddress", 5))
+        self.assertEqual(len(self.hashes(3)), 3)
+        self.assertEqual(self.store.fetch_start(ADDRESS, "fromAddress", 6), 3)
+
+    def test_empty_fetch_keeps_the_store(self):
+        self.store.save(ADDRESS, "fromAddress", 0, [make_transfer(7)])
+        self.store.save(ADDRESS, "fromAddress", 5, [])
+        self.assertEqual(self.hashes(), ["0x7"])
+
+    def test_directions_are_separate(self):
+        self.store.save(ADDRESS, "fromAddress", 0, [make_transfer(7)])
+        self.assertEqual(self.store.fetch_start(ADDRESS, "toAddress", 10), 0)
+        self.assertEqual(self.store.load(ADDRESS, "toAddress", 10), [])
+
+    def test_prune_drops_old_and_least_recent_addresses(self):
+        other = "0x" + "3" * 40
+        self.store.save(ADDRESS, "fromAddress", 0, [make_transfer(7)])
+        self.store.save(other, "fromAddress", 0, [make_transfer(8)])
+        self.store.max_addresses = 1
+        self.assertEqual(self.store.prune(), 1)
+        self.assertEqual(self.hashes(), [])
+        self.assertEqual(len(self.store.load(other, "fromAddress", 10)), 1)
+
+        self.store.max_age = 60
+        self.store._db.execute("UPDATE transfer_marks SET updated_at = ?", (time.time() - 120,))
+        self.store.prune()
+        self.assertEqual(self.store.fetch_start(other, "fromAddress", 10), 0)
+        self.assertEqual(self.store.load(other, "fromAddress", 10), [])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def open_breaker(self) -> CircuitBreaker:
+        breaker = CircuitBreaker("upstream", failure_threshold=2, reset_timeout=0)
+        breaker.record(False)
+        breaker.record(False)
+        self.assertEqual(breaker.state, "open")
+        return breaker
+
+    def test_straggler_does_not_end_the_trial(self):
+        breaker = self.open_breaker()
+        trial = breaker.allow()
+        self.assertIsNotNone(trial)
+        # A call admitted before the circuit opened finishes during half-open
+        breaker.record(True)
+        self.assertEqual(breaker.state, "half_open")
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        breaker.record(True, trial)
+        self.assertEqual(breaker.state, "closed")
+
+    def test_failed_trial_reopens(self):
+        breaker = self.open_breaker()
+        breaker.record(False, breaker.allow())
+        self.assertEqual(breaker.state, "open")
+
+
+class HTTPClientTests(SimpleTestCase):
+    def test_read_timeout_stays_a_timeout(self):
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        self.addCleanup(server.close)
+        # Accepts the connection (kernel backlog) and never answers
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            get_http_session("llm").post(f"http://127.0.0.1:{server.getsockname()[1]}/", json={}, timeout=0.2)
+
+
+class LLMDispatcherTests(SimpleTestCase):
+    def test_cancelled_item_is_dropped_from_its_batch(self):
+        dispatcher = LLMDispatcher(max_concurrency=2, max_batch=8, max_wait=0.2)
+        sent = []
+
+        def send_batch(payloads):
+            sent.append([p["prompt"] for p in payloads])
+            return [p["prompt"] + "!" for p in payloads]
+
+        def send_one(payload):
+            return payload["prompt"] + "?"
+
+        cancelled = dispatcher.submit({"prompt": "a"}, send_one, send_batch, "model")
+        kept = dispatcher.submit({"prompt": "b"}, send_one, send_batch, "model")
+        self.assertTrue(cancelled.cancel())
+        self.assertEqual(kept.result(timeout=2), "b!")
+        self.assertEqual(sent, [["b"]])
+
+    def test_concurrent_calls_share_one_batch(self):
+        dispatcher = LLMDispatcher(max_concurrency=2, max_batch=8, max_wait=0.2)
+        sent = []
+
+        def send_batch(payloads):
+            sent.append(sorted(p["prompt"] for p in payloads))
+            return [p["prompt"] + "!" for p in payloads]
+
+        futures = [dispatcher.submit({"prompt": p}, lambda p: None, send_batch, "model") for p in "abc"]
+        self.assertEqual([f.result(timeout=2) for f in futures], ["a!", "b!", "c!"])
+        self.assertEqual(sent, [["a", "b", "c"]])
+
+    def test_caller_past_its_deadline_does_not_break_the_batch(self):
+        dispatcher = LLMDispatcher(max_concurrency=2, max_batch=8, max_wait=0.3)
+
+        def send_batch(payloads):
+            return [p["prompt"] + "!" for p in payloads]
+
+        with deadline(0.05):
+            with self.assertRaises(DeadlineExceeded):
+                dispatcher.call({"prompt": "a"}, lambda p: None, send_batch, "model")
+        started = time.monotonic()
+        self.assertEqual(dispatcher.call({"prompt": "b"}, lambda p: None, send_batch, "model"), "b!")
+        self.assertLess(time.monotonic() - started, 2)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_callers_share_one_execution(self):
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return {"balance": 1}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flights.do("k", fetch)))
+        leader.start()
+        started.wait(2)
+        follower = threading.Thread(target=lambda: results.append(flights.do("k", fetch)))
+        follower.start()
+        while not flights._calls["k"].waiters:
+            time.sleep(0.001)
+        release.set()
+        leader.join(2)
+        follower.join(2)
+        self.assertEqual(len(calls), 1)
+        self.assertIs(results[0], results[1])
+        self.assertEqual(flights.counters, {"executed": 1, "shared": 1})
+
+    def test_waiter_gives_up_at_its_deadline(self):
+        flights = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.5)
+            return "done"
+
+        async def run():
+            leader = asyncio.ensure_future(flights.ado("k", slow))
+            await asyncio.sleep(0)
+            with deadline(0.05):
+                with self.assertRaises(DeadlineExceeded):
+                    await flights.ado("k", slow)
+            # The shared call keeps running for the caller that started it
+            return await leader
+
+        self.assertEqual(asyncio.run(run()), "done")
+
+
+class SemanticCacheTests(SimpleTestCase):
+    def test_paraphrase_hits_and_other_subject_misses(self):
+        cache = SemanticCache(capacity=4, ttl=60, threshold=0.9)
+        cache.store("How do I train a character?", "Use the training tab.")
+        hit = cache.lookup("how can i train my character")
+        self.assertEqual(hit["answer"], "Use the training tab.")
+        self.assertIsNone(cache.lookup("How do I mint an NFT?"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = SemanticCache(capacity=2, ttl=60, threshold=0.9)
+        cache.store("wallet balance", "a")
+        cache.store("token price", "b")
+        cache.lookup("wallet balance")
+        cache.store("gas fees", "c")
+        self.assertIsNone(cache.lookup("token price"))
+        self.assertEqual(cache.lookup("wallet balance")["answer"], "a")
+        self.assertEqual(cache.counters["evictions"], 1)
+
+
+class WalletReportCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = WalletReportCache(max_lag_seconds=60, max_stale_seconds=600, hot_hits=3)
+        self.cache.store(ADDRESS, 1000, "report")
+
+    def test_lag_is_measured_in_chain_time(self):
+        # 100 blocks behind: 25 s on a 0.25 s chain, 1200 s on a 12 s chain
+        self.assertEqual(self.cache.lookup(ADDRESS, 1100, 0.25), ("report", False))
+        self.assertEqual(self.cache.lookup(ADDRESS, 1100, 12.0), (None, False))
+
+    def test_hot_address_gets_the_stale_report_and_one_refresh(self):
+        self.cache.lookup(ADDRESS, 1000, 12.0)
+        self.cache.lookup(ADDRESS, 1000, 12.0)
+        # 20 blocks x 12 s = 240 s: past max_lag_seconds, within max_stale_seconds
+        self.assertEqual(self.cache.lookup(ADDRESS, 1020, 12.0), ("report", True))
+        self.assertEqual(self.cache.lookup(ADDRESS, 1020, 12.0), ("report", False))
+        self.cache.refresh_done(ADDRESS)
+        self.assertEqual(self.cache.lookup(ADDRESS, 1020, 12.0), ("report", True))
+
+    def test_cold_stale_address_is_rebuilt(self):
+        self.assertEqual(self.cache.lookup(ADDRESS, 1020, 12.0), (None, False))
+
+
+class WalletBatchTests(SimpleTestCase):
+    def test_split_addresses_dedups_case_insensitively(self):
+        checksummed = "0x" + "aB" * 20
+        valid, invalid = split_addresses([checksummed.lower(), " " + checksummed.upper().replace("0X", "0x"),
+                                          "0x123", 42, ADDRESS])
+        self.assertEqual(valid, [checksummed.lower(), ADDRESS])
+        self.assertEqual(invalid, ["0x123", 42])
+
+    def make_service(self, delay: float):
+        service = WalletService.__new__(WalletService)
+        state = {"running": 0, "peak": 0, "started": 0}
+
+        async def fetch(address, max_txs=1000):
+            state["started"] += 1
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                state["running"] -= 1
+            return {"address": address}
+
+        service.aget_wallet_analysis = fetch
+        service.wallet_summary = lambda wallet_data, address: {"address": address, "status": "ok"}
+        return service, state
+
+    @mock.patch.dict(os.environ, {"WALLET_BATCH_CONCURRENCY": "3"})
+    def test_concurrent_batches_share_the_limiter(self):
+        service, state = self.make_service(0.01)
+        first = ["0x%040x" % i for i in range(10)]
+        second = ["0x%040x" % i for i in range(10, 20)]
+
+        async def run():
+            return await asyncio.gather(service.abatch_analyze_wallets(first),
+                                        service.abatch_analyze_wallets(second))
+
+        results = asyncio.run(run())
+        self.assertEqual([r["address"] for r in results[0]], first)
+        self.assertEqual([r["address"] for r in results[1]], second)
+        self.assertEqual(state["peak"], 3)
+
+    @mock.patch.dict(os.environ, {"WALLET_BATCH_CONCURRENCY": "2"})
+    def test_closing_the_stream_cancels_pending_wallets(self):
+        service, state = self.make_service(0.05)
+        addresses = ["0x%040x" % i for i in range(10)]
+
+        async def run():
+            stream = service.aanalyze_wallets(addresses)
+            first = await stream.__anext__()
+            await stream.aclose()
+            await asyncio.sleep(0.1)
+            return first
+
+        self.assertEqual(asyncio.run(run())["status"], "ok")
+        self.assertLessEqual(state["started"], 4)
+        self.assertEqual(state["running"], 0)
@@ -6,10 +6,16 @@ from .views import (
     # 기존 뷰
     chat_view, 
     send_message, 
+    send_message_stream,
     upload_training_image, 
     check_training_status,
     fetch_nfts,
+    analyze_wallets,
     twit_view,
+    http_stats_view,
+    llm_cache_stats_view,
+    llm_status_view,
+    debug_latency_view,
     
     # 에이전트 뷰 (views.py 파일에 추가된 새 함수들)
     agent_inference,
@@ -24,9 +30,11 @@ urlpatterns = [
     # 기존 URL 패턴
     path('', chat_view, name='chat'),
     path('api/send_message/', send_message, name='send_message'),
+    path('api/send_message/stream/', send_message_stream, name='send_message_stream'),
     path('api/upload_training_image/', upload_training_image, name='upload_training_image'),
     path('api/check_training_status/', check_training_status, name='check_training_status'),
     path('api/fetch_nfts/', fetch_nfts, name='fetch_nfts'),
+    path('api/wallets/analyze/', analyze_wallets, name='analyze_wallets'),
     
     # Agent API endpoints
     path('agent/<uuid:agent_key>/inference', agent_inference, name='agent_inference'),
@@ -36,6 +44,10 @@ urlpatterns = [
     path('list_models', list_models, name='list_models'),
     path('reload_models', reload_models, name='reload_models'),
     path('twit', twit_view, name='twit_view'),
+    path('api/http_stats/', http_stats_view, name='http_stats'),
+    path('api/llm_cache_stats/', llm_cache_stats_view, name='llm_cache_stats'),
+    path('api/llm_status/', llm_status_view, name='llm_status'),
+    path('api/debug/latency/', debug_latency_view, name='debug_latency'),
 ]
 
 # 정적 파일 서빙 설정
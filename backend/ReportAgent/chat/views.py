@@ -6,7 +6,7 @@ import logging
 import uuid
 import shutil
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 import requests
@@ -16,29 +16,34 @@ import random
 # .env 파일 로드
 load_dotenv()  # 이 라인을 추가하여 .env 파일의 환경 변수를 로드합니다
 
-from .core.orchestrator import CommandOrchestrator
-from .services.trainer_service import TrainerService
-from .services.nft_service import NFTService
 from .models import AgentModel, TrainingJob
-from .services.model_manager import get_model_manager
+from .services.registry import get_service
+from .services.http_client import get_http_session, http_stats
+from .services.llm_cache import get_llm_cache
+from .services.llm_pool import get_llm_pool
+from .services.semantic_cache import get_semantic_cache
+from .services.transfer_store import get_transfer_store
+from .services.wallet_report_cache import get_wallet_report_cache
+from .services.wallet_batch import max_batch_size, split_addresses
+from .services.conversation_store import ConversationStore, get_conversation_store
+from .services.tracing import TRACER
+from .services.resilience import deadline, request_deadline_seconds
 
 logger = logging.getLogger(__name__)
 
-# Orchestrator: LLM 명령 파이프라인
-orchestrator = CommandOrchestrator()
-
-# Services
-trainer_service = TrainerService()
-nft_service = NFTService()
+# Orchestrator (LLM 명령 파이프라인), TrainerService, NFTService, ModelManager는
+# registry에서 첫 요청 시 생성됩니다 (import 시 네트워크/모델 로딩 없음)
 
 def chat_view(request):
     return render(request, 'chat/index.html')
 
-@csrf_exempt
-def send_message(request):
+async def send_message(request):
     """
     단순히 LLM Orchestrator에 메시지를 전달하여 
     응답을 JSON 형태로 반환
+
+    Async view: under wallet_chat.asgi the upstream LLM/RPC/image calls are
+    awaited on the event loop instead of holding a worker thread.
     """
     if request.method == 'OPTIONS':
         response = JsonResponse({})
@@ -51,15 +56,19 @@ def send_message(request):
         try:
             data = json.loads(request.body)
             message = data.get('message', '')
-            
+            session_id = _conversation_session_id(data)
+
             # LLM과의 상호작용
-            response_text = orchestrator.process_input(message)
+            response_text = await get_service("orchestrator").aprocess_input(message, session_id)
 
-            return JsonResponse({
+            result = {
                 'status': 'success',
                 'response': response_text,
                 'length': len(response_text)
-            })
+            }
+            if session_id:
+                result['session_id'] = session_id
+            return JsonResponse(result)
         except Exception as e:
             logger.error(f"Error in send_message: {e}")
             return JsonResponse({
@@ -70,6 +79,123 @@ def send_message(request):
 
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+# Django 4.2's csrf_exempt wraps views in a sync function, which would hide the
+# coroutine from the handler; mark the async view directly instead.
+send_message.csrf_exempt = True
+
+def _conversation_session_id(data: dict):
+    """
+    The client's conversation id (echoed back in the response), or a new one
+    when the conversation store is enabled; None when it is disabled.
+    """
+    if get_conversation_store() is None:
+        return None
+    session_id = data.get('session_id')
+    if isinstance(session_id, str) and 0 < len(session_id) <= 64:
+        return session_id
+    return ConversationStore.new_session_id()
+
+def _sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def send_message_stream(request):
+    """
+    send_message의 스트리밍 버전 (Server-Sent Events)
+
+    Each LLM token is sent as `data: {"type": "chunk", "text": ...}` as soon as
+    it arrives, followed by a final `{"type": "done", "length": ...}` event.
+    """
+    if request.method == 'OPTIONS':
+        response = JsonResponse({})
+        response["Access-Control-Allow-Origin"] = "*"
+        response["Access-Control-Allow-Methods"] = "POST, OPTIONS"
+        response["Access-Control-Allow-Headers"] = "Content-Type"
+        return response
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError as e:
+        return JsonResponse({'status': 'error', 'error': str(e)}, status=400)
+    message = data.get('message', '')
+
+    async def events():
+        length = 0
+        try:
+            # The middleware's deadline ended when the view returned the response
+            with deadline(request_deadline_seconds()):
+                async for chunk in get_service("orchestrator").astream_input(message):
+                    length += len(chunk)
+                    yield _sse_event({'type': 'chunk', 'text': chunk})
+            yield _sse_event({'type': 'done', 'length': length})
+        except Exception as e:
+            logger.error(f"Error in send_message_stream: {e}")
+            yield _sse_event({'type': 'error', 'error': str(e)})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx 버퍼링 비활성화
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+send_message_stream.csrf_exempt = True
+
+async def analyze_wallets(request):
+    """
+    Batch wallet analysis.
+
+    Body: {"addresses": [...], "max_txs": 1000, "include_report": false, "stream": false}
+    Returns {"status": "success", "results": [...], "invalid": [...]} with one
+    structured result per address in input order, or with "stream": true one
+    `data: {"type": "result", ...}` event per address as it finishes, then
+    `{"type": "done", "count": ...}`.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid method'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError as e:
+        return JsonResponse({'status': 'error', 'error': str(e)}, status=400)
+    addresses = data.get('addresses')
+    if not isinstance(addresses, list) or not addresses:
+        return JsonResponse({'status': 'error', 'error': 'Missing addresses'}, status=400)
+    if len(addresses) > max_batch_size():
+        return JsonResponse({'status': 'error', 'error': f'At most {max_batch_size()} addresses per request'}, status=400)
+    try:
+        max_txs = min(max(int(data.get('max_txs', 1000)), 1), 10000)
+    except (TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'error': 'Invalid max_txs'}, status=400)
+    include_report = bool(data.get('include_report', False))
+
+    valid, invalid = split_addresses(addresses)
+    wallet_service = get_service("wallet")
+
+    if not data.get('stream'):
+        results = await wallet_service.abatch_analyze_wallets(valid, max_txs=max_txs, include_report=include_report)
+        return JsonResponse({'status': 'success', 'results': results, 'invalid': invalid})
+
+    async def events():
+        count = 0
+        try:
+            with deadline(request_deadline_seconds()):
+                async for result in wallet_service.aanalyze_wallets(valid, max_txs=max_txs, include_report=include_report):
+                    count += 1
+                    yield _sse_event({'type': 'result', **result})
+            yield _sse_event({'type': 'done', 'count': count, 'invalid': invalid})
+        except Exception as e:
+            logger.error(f"Error in analyze_wallets: {e}")
+            yield _sse_event({'type': 'error', 'error': str(e)})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+analyze_wallets.csrf_exempt = True
+
 @csrf_exempt
 def fetch_nfts(request):
     """
@@ -84,6 +210,7 @@ def fetch_nfts(request):
                 return JsonResponse({'error': 'Missing address'}, status=400)
 
             # ✅ NFT 정보 가져오기
+            nft_service = get_service("nft")
             nft_response = nft_service.get_nfts(address, "arbitrum")
 
             if nft_response["status"] == "success":
@@ -176,7 +303,7 @@ def upload_training_image(request):
             )
 
             # Start the LoRA training job
-            task_id = trainer_service.start_lora_training(character_name, saved_file_path)
+            task_id = get_service("trainer").start_lora_training(character_name, saved_file_path)
             
             # Update job with task ID
             training_job.task_id = task_id
@@ -210,7 +337,7 @@ def check_training_status(request):
     if not task_id:
         return HttpResponseBadRequest("Missing task_id")
     
-    logs_output = trainer_service.get_logs(task_id)
+    logs_output = get_service("trainer").get_logs(task_id)
     
     # DB에서 job status 가져오기
     try:
@@ -270,7 +397,7 @@ def agent_inference(request, agent_key):
             }, status=400)
         
         # Get model manager
-        model_manager = get_model_manager()
+        model_manager = get_service("model_manager")
         
         # Generate image
         result = model_manager.generate_image(agent.model_name, prompt, aspect_ratio, seed)
@@ -307,7 +434,7 @@ def model_inference(request, model_name):
     
     try:
         # Get model manager
-        model_manager = get_model_manager()
+        model_manager = get_service("model_manager")
         
         # Check if model exists
         available_models = model_manager.get_available_models()
@@ -399,7 +526,7 @@ def list_agents(request):
 def list_models(request):
     """List all available models"""
     try:
-        model_manager = get_model_manager()
+        model_manager = get_service("model_manager")
         models = model_manager.get_available_models()
         return JsonResponse({
             "status": "success",
@@ -415,7 +542,7 @@ def list_models(request):
 def reload_models(request):
     """Reload the list of available models"""
     try:
-        model_manager = get_model_manager()
+        model_manager = get_service("model_manager")
         count = model_manager.reload_models()
         return JsonResponse({
             "status": "success",
@@ -428,6 +555,69 @@ def reload_models(request):
             "message": f"Error reloading models: {str(e)}"
         }, status=500)
 
+def _ops_forbidden(request):
+    """403 for the operational endpoints unless DEBUG is on or the user is staff."""
+    if settings.DEBUG or request.user.is_staff:
+        return None
+    return JsonResponse({'error': 'Forbidden'}, status=403)
+
+def http_stats_view(request):
+    """
+    Connection pool counters per upstream (requests vs. new connections), LLM
+    backend pool state and the transfer store's fetch counters.
+    """
+    forbidden = _ops_forbidden(request)
+    if forbidden is not None:
+        return forbidden
+    stats = http_stats()
+    pool = get_llm_pool()
+    if pool is not None:
+        stats["llm_backends"] = pool.stats()
+    store = get_transfer_store()
+    if store is not None:
+        stats["transfer_store"] = store.stats()
+    return JsonResponse(stats)
+
+def llm_cache_stats_view(request):
+    """LLM response cache, semantic (near-duplicate) cache and wallet report cache hit/miss counters."""
+    forbidden = _ops_forbidden(request)
+    if forbidden is not None:
+        return forbidden
+    cache = get_llm_cache()
+    semantic_cache = get_semantic_cache()
+    report_cache = get_wallet_report_cache()
+    stats = {"enabled": False} if cache is None else {"enabled": True, "ttl": cache.ttl, **cache.stats()}
+    stats["semantic"] = {"enabled": False} if semantic_cache is None else {
+        "enabled": True, "ttl": semantic_cache.ttl, **semantic_cache.stats()
+    }
+    stats["wallet_reports"] = {"enabled": False} if report_cache is None else {
+        "enabled": True, "ttl": report_cache.ttl, **report_cache.stats()
+    }
+    return JsonResponse(stats)
+
+def llm_status_view(request):
+    """Whether MODEL_NAME is loaded on each LLM backend (as last checked by the keep-alive loop) and its state."""
+    forbidden = _ops_forbidden(request)
+    if forbidden is not None:
+        return forbidden
+    return JsonResponse(get_service("llm").model_status())
+
+def debug_latency_view(request):
+    """
+    Per-stage latency histograms from the span tracer (process-local).
+    Only with DEBUG on or for staff users; a POST with reset=1 clears them
+    after reading.
+    """
+    forbidden = _ops_forbidden(request)
+    if forbidden is not None:
+        return forbidden
+    if request.method not in ('GET', 'POST'):
+        return JsonResponse({'error': 'Invalid method'}, status=405)
+    stats = TRACER.stats()
+    if request.method == 'POST' and request.POST.get('reset') == '1':
+        TRACER.reset()
+    return JsonResponse(stats)
+
 @csrf_exempt
 def twit_view(request):
     """
@@ -473,8 +663,7 @@ def twit_view(request):
             }, status=404)
         
         # Use LLM to analyze the situation and generate prompt and response
-        from .services.llm_service import LLMService
-        llm_service = LLMService()
+        llm_service = get_service("llm")
         
         # Construct LLM prompt template for situation analysis
         prompt_template = f"""
@@ -541,7 +730,7 @@ def twit_view(request):
         
         # Generate image using ModelManager
         try:
-            model_manager = get_model_manager()
+            model_manager = get_service("model_manager")
             
             # Check if character model is available
             available_models = model_manager.get_available_models()
@@ -612,6 +801,9 @@ def twit_view(request):
                     ACCESS_TOKEN, ACCESS_TOKEN_SECRET
                 )
                 api = tweepy.API(auth)
+                # Reuse the pooled keep-alive connections to the Twitter API
+                client.session = get_http_session("twitter")
+                api.session = get_http_session("twitter")
                 
                 # Upload the image
                 media = api.media_upload(image_path)